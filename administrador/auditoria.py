@@ -0,0 +1,155 @@
+# administrador/auditoria.py
+"""
+Gravação em buffer dos registros de auditoria.
+
+Em vez de um INSERT síncrono por alteração, os registros (instâncias não
+salvas de LogEntry ou ConsultaStatusLog) entram numa fila em memória depois
+do commit da transação da alteração e uma thread os grava com bulk_create
+quando a fila atinge AUDITORIA_TAMANHO_LOTE ou a cada AUDITORIA_INTERVALO
+segundos. O que estiver na fila é gravado ao encerrar o processo (atexit).
+
+Como o bulk_create preenche os campos auto_now_add, a data gravada é a do
+flush, com atraso de no máximo AUDITORIA_INTERVALO segundos.
+
+Quem precisa do registro na mesma transação da alteração (ex.: antes de
+remover o objeto referenciado) usa `registrar(obj, transacional=True)`.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+MODO_BUFFER = 'buffer'
+MODO_TRANSACIONAL = 'transacional'
+
+
+class BufferAuditoria:
+    """
+    Fila de registros de auditoria gravada em lotes.
+    Com `intervalo=None` não há thread: o dono chama `flush()` (usado nos testes).
+    """
+
+    def __init__(self, tamanho_lote=100, intervalo=2.0):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self._fila = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return len(self._fila)
+
+    def adicionar(self, registro):
+        with self._lock:
+            self._fila.append(registro)
+            cheio = len(self._fila) >= self.tamanho_lote
+        if self.intervalo is None:
+            if cheio:
+                self.flush()
+            return
+        self._garantir_thread()
+        if cheio:
+            self._acordar.set()
+
+    def _garantir_thread(self):
+        # Depois de um fork (ex.: workers do gunicorn) a thread não existe no filho
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._executar, name='auditoria-flush', daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        while True:
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Falha ao gravar registros de auditoria.')
+
+    def flush(self):
+        """ Grava tudo o que está na fila, um bulk_create por modelo. Retorna o total gravado. """
+        with self._flush_lock:
+            with self._lock:
+                pendentes, self._fila = self._fila, []
+            if not pendentes:
+                return 0
+
+            por_modelo = defaultdict(list)
+            for registro in pendentes:
+                por_modelo[type(registro)].append(registro)
+
+            gravados = 0
+            for modelo, registros in por_modelo.items():
+                try:
+                    with transaction.atomic():
+                        modelo.objects.bulk_create(registros, batch_size=self.tamanho_lote)
+                    gravados += len(registros)
+                except DatabaseError:
+                    # Um registro inválido (ex.: consulta já removida) não derruba o lote
+                    gravados += self._gravar_um_a_um(registros)
+            return gravados
+
+    @staticmethod
+    def _gravar_um_a_um(registros):
+        gravados = 0
+        for registro in registros:
+            try:
+                with transaction.atomic():
+                    registro.save()
+                gravados += 1
+            except DatabaseError:
+                logger.exception('Registro de auditoria descartado: %r', registro)
+        return gravados
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def buffer_padrao():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = BufferAuditoria(
+                    tamanho_lote=getattr(settings, 'AUDITORIA_TAMANHO_LOTE', 100),
+                    intervalo=getattr(settings, 'AUDITORIA_INTERVALO', 2.0),
+                )
+    return _buffer
+
+
+def registrar(registro, transacional=False):
+    """
+    Registra uma instância não salva de modelo de auditoria.
+    No modo buffer o registro só entra na fila se a transação corrente
+    fizer commit, então alterações desfeitas não deixam log.
+    """
+    if transacional or getattr(settings, 'AUDITORIA_MODO', MODO_BUFFER) != MODO_BUFFER:
+        registro.save()
+        return registro
+    transaction.on_commit(lambda: buffer_padrao().adicionar(registro))
+    return registro
+
+
+def flush():
+    """ Grava imediatamente os registros pendentes do processo. """
+    if _buffer is not None:
+        return _buffer.flush()
+    return 0
+
+
+atexit.register(flush)
@@ -0,0 +1,96 @@
+# administrador/estatisticas.py
+"""
+Estatísticas do painel de administração com cache.
+
+Os números vêm de um único aggregate condicional sobre a tabela de
+utilizadores e ficam no cache até que um User seja criado, alterado ou
+removido (ver administrador.signals). Com o cache partilhado configurado em
+CACHES, a invalidação vale para todos os processos. Com um cache em memória
+(LocMem) cada worker tem a sua cópia e só o que tratou a escrita é
+invalidado: o TTL cai para TEMPO_CACHE_LOCAL.
+
+Os contadores de hit/miss ficam em memória, por processo (como os
+histogramas de administrador.metricas): gravá-los no cache partilhado
+custaria escritas a cada requisição e, no DatabaseCache, várias queries por
+hit. Zeram quando o worker reinicia.
+"""
+import threading
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from medlink_core.cache import cache_partilhado
+from users.models import User
+
+CHAVE_STATS = 'administrador:dashboard_stats'
+# A invalidação é explícita; o TTL só limita dados antigos se um sinal se perder
+TEMPO_CACHE = 60 * 60
+# Sem cache partilhado os outros workers não veem a invalidação
+TEMPO_CACHE_LOCAL = 30
+
+
+def tempo_de_cache():
+    return TEMPO_CACHE if cache_partilhado() else TEMPO_CACHE_LOCAL
+
+
+def calcular_stats():
+    return User.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        doctors=Count('id', filter=Q(user_type=User.UserType.MEDICO)),
+        secretaries=Count('id', filter=Q(user_type=User.UserType.SECRETARIA)),
+        patients=Count('id', filter=Q(user_type=User.UserType.PACIENTE)),
+    )
+
+
+class ContadoresDoCache:
+    """ Hits e misses do cache das estatísticas neste processo. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def registrar(self, acertou):
+        with self._lock:
+            if acertou:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def resumo(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+
+    def limpar(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+contadores = ContadoresDoCache()
+
+
+def obter_stats():
+    stats = cache.get(CHAVE_STATS)
+    if stats is None:
+        contadores.registrar(acertou=False)
+        stats = calcular_stats()
+        cache.set(CHAVE_STATS, stats, tempo_de_cache())
+    else:
+        contadores.registrar(acertou=True)
+    return stats
+
+
+def invalidar_stats():
+    cache.delete(CHAVE_STATS)
+
+
+def contadores_do_cache():
+    return contadores.resumo()
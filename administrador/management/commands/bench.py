@@ -0,0 +1,254 @@
+import json
+import math
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from administrador.estatisticas import invalidar_stats
+from agendamentos.models import Consulta, Pagamento
+from clinicas.models import Estado, Cidade, TipoClinica, Clinica
+from medicos.models import Medico
+from pacientes.models import Paciente
+from secretarias.models import Secretaria
+from users.models import User
+
+TAMANHOS_PADRAO = [1000, 10000, 100000, 1000000]
+MEDICOS = 20
+PACIENTES = 2000
+# Horários por médico por dia (30 min a partir das 8h): a agenda de um dia tem
+# tamanho fixo e um conjunto maior de consultas cobre mais dias no passado.
+HORARIOS_POR_DIA = 16
+TAMANHO_LOTE = 5000
+
+
+class Desfazer(Exception):
+    """ Interrompe o atomic() para descartar os dados do benchmark. """
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência e número de queries dos endpoints da API com conjuntos crescentes '
+        'de consultas e grava o resultado em JSON. Os dados são criados numa transação '
+        'desfeita no fim, então o banco não é alterado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO,
+            help='Quantidades de consultas, em ordem crescente (padrão: 1000 10000 100000 1000000).'
+        )
+        parser.add_argument('--repeticoes', type=int, default=5, help='Requisições medidas por endpoint.')
+        parser.add_argument('--saida', default='bench.json', help='Arquivo JSON de saída.')
+
+    def handle(self, *args, **options):
+        tamanhos = sorted(set(options['tamanhos']))
+        if not tamanhos or tamanhos[0] <= 0:
+            raise CommandError('Informe tamanhos positivos.')
+
+        # Permite o host 'testserver' do APIClient e troca o e-mail por locmem
+        setup_test_environment()
+        try:
+            resultados = self.executar(tamanhos, options['repeticoes'])
+        finally:
+            teardown_test_environment()
+
+        relatorio = {
+            'commit': self.commit_atual(),
+            'banco': connection.vendor,
+            'data': timezone.now().isoformat(),
+            'repeticoes': options['repeticoes'],
+            'tamanhos': tamanhos,
+            'endpoints': self.analisar(resultados, tamanhos),
+        }
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f'Resultados gravados em {options["saida"]}.'))
+
+    def executar(self, tamanhos, repeticoes):
+        resultados = {}
+        try:
+            with transaction.atomic():
+                contexto = self.criar_base()
+                carregadas = 0
+                for tamanho in tamanhos:
+                    inicio = time.perf_counter()
+                    self.carregar_consultas(contexto, carregadas, tamanho)
+                    carregadas = tamanho
+                    self.stdout.write(self.style.HTTP_INFO(
+                        f'{tamanho} consultas carregadas em {time.perf_counter() - inicio:.1f}s.'
+                    ))
+                    if connection.vendor == 'postgresql':
+                        with connection.cursor() as cursor:
+                            cursor.execute('ANALYZE')
+
+                    for nome, medicao in self.medir_endpoints(contexto, repeticoes):
+                        resultados.setdefault(nome, {})[tamanho] = medicao
+                        self.stdout.write(
+                            f'  {nome:<28} p50 {medicao["latencia_ms"]["p50"]:>9.2f} ms   '
+                            f'queries {medicao["queries"]}'
+                        )
+                raise Desfazer()
+        except Desfazer:
+            pass
+        return resultados
+
+    def criar_base(self):
+        sufixo = uuid.uuid4().hex[:8]
+        estado = Estado.objects.create(nome=f'Bench {sufixo}', uf=sufixo[:2])
+        cidade = Cidade.objects.create(nome=f'Bench {sufixo}', estado=estado)
+        tipo = TipoClinica.objects.create(descricao=f'Bench {sufixo}')
+        clinica = Clinica.objects.create(
+            nome_fantasia=f'Bench {sufixo}', cnpj=sufixo.ljust(14, '0')[:14], cidade=cidade, tipo_clinica=tipo,
+        )
+
+        usuarios = User.objects.bulk_create([
+            User(cpf=f'm{sufixo}{indice:02d}', email=f'medico-{indice}-{sufixo}@bench.local', user_type='MEDICO')
+            for indice in range(MEDICOS)
+        ] + [
+            User(cpf=f'p{sufixo[:4]}{indice:06d}', email=f'paciente-{indice}-{sufixo}@bench.local',
+                 user_type='PACIENTE')
+            for indice in range(PACIENTES)
+        ], batch_size=TAMANHO_LOTE)
+        medicos, pacientes = usuarios[:MEDICOS], usuarios[MEDICOS:]
+        if not all(user.pk for user in usuarios):
+            # Bancos sem RETURNING no bulk_create
+            medicos = list(User.objects.filter(email__endswith=f'-{sufixo}@bench.local', user_type='MEDICO'))
+            pacientes = list(User.objects.filter(email__endswith=f'-{sufixo}@bench.local', user_type='PACIENTE'))
+        Medico.objects.bulk_create([
+            Medico(user=medico, crm=f'BENCH-{sufixo}-{indice}', clinica=clinica)
+            for indice, medico in enumerate(medicos)
+        ])
+        Paciente.objects.bulk_create([Paciente(user=paciente) for paciente in pacientes], batch_size=TAMANHO_LOTE)
+
+        secretaria = User.objects.create_user(
+            cpf=f's{sufixo}', email=f'secretaria-{sufixo}@bench.local', user_type='SECRETARIA'
+        )
+        Secretaria.objects.create(user=secretaria, clinica=clinica)
+        admin = User.objects.create_user(
+            cpf=f'a{sufixo}', email=f'admin-{sufixo}@bench.local', user_type='ADMIN',
+            is_staff=True, is_superuser=True,
+        )
+        # O último horário fica daqui a 30 dias; as consultas seguintes vão para o passado
+        ultimo_dia = timezone.localdate() + timedelta(days=30)
+        return {
+            'clinica': clinica, 'medicos': medicos, 'pacientes': pacientes,
+            'secretaria': secretaria, 'admin': admin,
+            'ultimo_dia': ultimo_dia,
+        }
+
+    def data_hora(self, contexto, indice):
+        """ Horário determinístico da consulta `indice`, sem repetir (médico, horário). """
+        por_dia = HORARIOS_POR_DIA * MEDICOS
+        dia = contexto['ultimo_dia'] - timedelta(days=indice // por_dia)
+        horario = (indice % por_dia) // MEDICOS
+        inicio = timezone.make_aware(datetime.combine(dia, datetime.min.time()) + timedelta(hours=8))
+        return inicio + timedelta(minutes=30 * horario)
+
+    def carregar_consultas(self, contexto, de, ate):
+        medicos, pacientes = contexto['medicos'], contexto['pacientes']
+        for inicio in range(de, ate, TAMANHO_LOTE):
+            consultas = Consulta.objects.bulk_create([
+                Consulta(
+                    paciente_id=pacientes[indice % len(pacientes)].pk,
+                    medico_id=medicos[indice % MEDICOS].pk,
+                    clinica=contexto['clinica'],
+                    data_hora=self.data_hora(contexto, indice),
+                    valor=Decimal('150.00'),
+                )
+                for indice in range(inicio, min(inicio + TAMANHO_LOTE, ate))
+            ])
+            Pagamento.objects.bulk_create([
+                Pagamento(consulta_id=consulta.pk, valor_pago=consulta.valor) for consulta in consultas
+            ])
+
+    def endpoints(self, contexto):
+        hoje = timezone.localdate()
+        inicio_mes = hoje.replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        paciente = contexto['pacientes'][0].pk
+        return [
+            ('agendamentos', 'medico', reverse('agendamentos-list-create'), {}, None),
+            ('agendamentos (mês)', 'medico', reverse('agendamentos-list-create'),
+             {'from': inicio_mes.isoformat(), 'to': proximo_mes.isoformat()}, None),
+            ('medicos agenda', 'medico', reverse('medico-agenda'), {'year': hoje.year, 'month': hoje.month}, None),
+            ('pacientes hoje', 'medico', reverse('pacientes-do-dia'), {}, None),
+            ('pacientes historico', 'medico', reverse('paciente-historico', args=[paciente]), {}, None),
+            ('secretarias dashboard', 'secretaria', reverse('dashboard-stats'), {}, None),
+            ('secretarias consultas hoje', 'secretaria', reverse('consultas-hoje'), {}, None),
+            # O cache é invalidado antes de cada requisição para medir o aggregate
+            ('admin stats', 'admin', reverse('admin-dashboard-stats'), {}, invalidar_stats),
+        ]
+
+    def medir_endpoints(self, contexto, repeticoes):
+        clientes = {}
+        for papel in ('medico', 'secretaria', 'admin'):
+            cliente = APIClient()
+            usuario = contexto['medicos'][0] if papel == 'medico' else contexto[papel]
+            cliente.force_authenticate(User.objects.get(pk=usuario.pk))
+            clientes[papel] = cliente
+
+        for nome, papel, url, parametros, preparar in self.endpoints(contexto):
+            cliente = clientes[papel]
+            latencias, queries, status_codes = [], [], set()
+            for repeticao in range(repeticoes + 1):
+                if preparar:
+                    preparar()
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    response = cliente.get(url, parametros)
+                    duracao = (time.perf_counter() - inicio) * 1000
+                status_codes.add(response.status_code)
+                if repeticao:  # a primeira requisição só aquece caches
+                    latencias.append(duracao)
+                    queries.append(len(capturadas))
+            yield nome, {
+                'status': sorted(status_codes),
+                'queries': max(queries),
+                'latencia_ms': {
+                    'p50': round(statistics.median(latencias), 3),
+                    'max': round(max(latencias), 3),
+                    'media': round(statistics.mean(latencias), 3),
+                },
+            }
+
+    def analisar(self, resultados, tamanhos):
+        """
+        Para cada endpoint, indica se o número de queries variou com o tamanho
+        (N+1) e a inclinação log-log da latência mediana entre o menor e o
+        maior conjunto: ~0 é constante, ~1 é linear (O(n)).
+        """
+        analise = {}
+        for nome, por_tamanho in resultados.items():
+            menor, maior = por_tamanho[tamanhos[0]], por_tamanho[tamanhos[-1]]
+            inclinacao = None
+            if len(tamanhos) > 1 and menor['latencia_ms']['p50'] > 0:
+                inclinacao = round(
+                    math.log(maior['latencia_ms']['p50'] / menor['latencia_ms']['p50'])
+                    / math.log(tamanhos[-1] / tamanhos[0]), 3
+                )
+            queries_constantes = len({medicao['queries'] for medicao in por_tamanho.values()}) == 1
+            analise[nome] = {
+                'resultados': {str(tamanho): medicao for tamanho, medicao in por_tamanho.items()},
+                'queries_constantes': queries_constantes,
+                'inclinacao_latencia': inclinacao,
+                'suspeita_on': not queries_constantes or (inclinacao is not None and inclinacao > 0.5),
+            }
+        return analise
+
+    def commit_atual(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
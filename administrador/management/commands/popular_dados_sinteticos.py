@@ -0,0 +1,366 @@
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from administrador.estatisticas import invalidar_stats
+from administrador.models import LogEntry
+from agendamentos.consts import (
+    STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_CANCELADA,
+    STATUS_CONSULTA_CONCLUIDA, STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO,
+    STATUS_PAGAMENTO_PENDENTE, STATUS_PAGAMENTO_PAGO,
+)
+from agendamentos.financeiro import recalcular as recalcular_financeiro
+from agendamentos.models import Consulta, Pagamento, ConsultaStatusLog, AnotacaoConsulta
+from clinicas.cache import invalidar_referencias
+from clinicas.models import Estado, Cidade, TipoClinica, Clinica
+from medicos.models import Medico
+from medlink_core.texto import normalizar_texto
+from pacientes.models import Paciente
+from secretarias.contadores import contadores_ativos, recalcular
+from secretarias.models import Secretaria
+from users.models import User, nome_de_busca
+
+ESTADOS = (
+    ('AC', 'Acre'), ('AL', 'Alagoas'), ('AP', 'Amapá'), ('AM', 'Amazonas'), ('BA', 'Bahia'),
+    ('CE', 'Ceará'), ('DF', 'Distrito Federal'), ('ES', 'Espírito Santo'), ('GO', 'Goiás'),
+    ('MA', 'Maranhão'), ('MT', 'Mato Grosso'), ('MS', 'Mato Grosso do Sul'), ('MG', 'Minas Gerais'),
+    ('PA', 'Pará'), ('PB', 'Paraíba'), ('PR', 'Paraná'), ('PE', 'Pernambuco'), ('PI', 'Piauí'),
+    ('RJ', 'Rio de Janeiro'), ('RN', 'Rio Grande do Norte'), ('RS', 'Rio Grande do Sul'),
+    ('RO', 'Rondônia'), ('RR', 'Roraima'), ('SC', 'Santa Catarina'), ('SP', 'São Paulo'),
+    ('SE', 'Sergipe'), ('TO', 'Tocantins'),
+)
+TIPOS_CLINICA = ('Consultório', 'Clínica Médica', 'Policlínica', 'Centro de Diagnóstico')
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória', 'Wesley',
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+)
+ANOTACOES = (
+    'Paciente estável, manter conduta.', 'Solicitados exames laboratoriais.',
+    'Retorno em 30 dias.', 'Prescrito tratamento por 7 dias.', 'Encaminhado para especialista.',
+)
+# Senha inutilizável (prefixo '!'), sem o custo de gerar uma aleatória por usuário
+SENHA_INUTILIZAVEL = '!sintetico'
+HORARIOS_POR_DIA = 20  # das 8h às 18h, de 30 em 30 minutos
+
+
+class Escritor:
+    """
+    Grava linhas (tuplas) em lotes. No PostgreSQL usa COPY FROM STDIN (formato
+    texto); nos demais bancos, executemany de um INSERT multi-linha.
+    """
+
+    def __init__(self, modelo, campos, lote):
+        self.modelo = modelo
+        self.lote = lote
+        self.campos = [modelo._meta.get_field(nome) for nome in campos]
+        self.tabela = connection.ops.quote_name(modelo._meta.db_table)
+        self.colunas = ', '.join(connection.ops.quote_name(campo.column) for campo in self.campos)
+        self.copy = connection.vendor == 'postgresql'
+        self.pendentes = []
+        self.total = 0
+
+    def adicionar(self, linha):
+        self.pendentes.append(linha)
+        if len(self.pendentes) >= self.lote:
+            self.gravar()
+
+    def gravar(self):
+        if not self.pendentes:
+            return
+        with connection.cursor() as cursor:
+            if self.copy:
+                buffer = io.StringIO()
+                for linha in self.pendentes:
+                    buffer.write('\t'.join(map(_texto_copy, linha)))
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(f'COPY {self.tabela} ({self.colunas}) FROM STDIN', buffer)
+            else:
+                # Só datas/horas precisam de adaptação; o resto vai como está
+                adaptar = connection.ops.adapt_datetimefield_value
+                marcadores = ', '.join(['%s'] * len(self.campos))
+                cursor.executemany(
+                    f'INSERT INTO {self.tabela} ({self.colunas}) VALUES ({marcadores})',
+                    [
+                        [adaptar(valor) if isinstance(valor, datetime) else valor for valor in linha]
+                        for linha in self.pendentes
+                    ]
+                )
+        self.total += len(self.pendentes)
+        self.pendentes = []
+
+
+def _texto_copy(valor):
+    if valor is None:
+        return '\\N'
+    if valor is True:
+        return 't'
+    if valor is False:
+        return 'f'
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return (
+        str(valor).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos em volume (clínicas, médicos, secretárias, pacientes, consultas com '
+        'pagamento, logs de status, anotações e LogEntry). O resultado é determinístico para a mesma '
+        'semente e data de referência num banco vazio. Usa COPY no PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador.')
+        parser.add_argument('--referencia', help='Data de referência AAAA-MM-DD (padrão: hoje).')
+        parser.add_argument('--clinicas', type=int, default=50)
+        parser.add_argument('--cidades-por-estado', type=int, default=5)
+        parser.add_argument('--medicos-por-clinica', type=int, default=10)
+        parser.add_argument('--secretarias-por-clinica', type=int, default=2)
+        parser.add_argument('--pacientes', type=int, default=100000)
+        parser.add_argument('--consultas', type=int, default=1000000)
+        parser.add_argument('--logs', type=int, default=100000, help='Quantidade de LogEntry.')
+        parser.add_argument('--lote', type=int, default=50000, help='Linhas por COPY/INSERT.')
+
+    def handle(self, *args, **options):
+        if options['clinicas'] <= 0 or options['medicos_por_clinica'] <= 0:
+            raise CommandError('São necessárias clínicas e médicos.')
+        if options['pacientes'] <= 0 and options['consultas'] > 0:
+            raise CommandError('Consultas precisam de pacientes.')
+        referencia = timezone.localdate()
+        if options['referencia']:
+            referencia = parse_date(options['referencia'])
+            if referencia is None:
+                raise CommandError('Use o formato AAAA-MM-DD em --referencia.')
+
+        self.rng = random.Random(options['seed'])
+        self.lote = options['lote']
+        self.agora = timezone.make_aware(datetime.combine(referencia, datetime.min.time()))
+        self.stdout.write(self.style.HTTP_INFO(
+            f'Banco: {connection.vendor} ({"COPY" if connection.vendor == "postgresql" else "INSERT em lote"}).'
+        ))
+
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            cidades = self.criar_localidades(options['cidades_por_estado'])
+            clinicas = self.criar_clinicas(cidades, options['clinicas'])
+            medicos, secretarias, pacientes = self.criar_pessoas(
+                clinicas, options['medicos_por_clinica'], options['secretarias_por_clinica'], options['pacientes']
+            )
+            self.criar_consultas(medicos, pacientes, options['consultas'])
+            self.criar_logs(medicos + [user_id for user_id, _ in secretarias], options['logs'])
+            self.reiniciar_sequencias()
+
+        if contadores_ativos():
+            self.stdout.write('Recalculando os contadores do dashboard...')
+            recalcular()
+        self.stdout.write('Recalculando os resumos financeiros...')
+        recalcular_financeiro()
+        invalidar_stats()
+        invalidar_referencias(Estado, Cidade, TipoClinica)
+        self.stdout.write(self.style.SUCCESS(f'Concluído em {time.perf_counter() - inicio:.1f}s.'))
+
+    def relatar(self, nome, total, inicio):
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(f'  {nome:<22} {total:>12,} linhas  {duracao:8.1f}s  ({total / max(duracao, 1e-9):,.0f}/s)')
+
+    def proximo_id(self, modelo):
+        return (modelo.objects.aggregate(maximo=Max('pk'))['maximo'] or 0) + 1
+
+    # --- Referências -------------------------------------------------------
+
+    def criar_localidades(self, por_estado):
+        estados = []
+        for uf, nome in ESTADOS:
+            estado = Estado.objects.filter(uf=uf).first() or Estado.objects.create(uf=uf, nome=nome)
+            estados.append(estado)
+        Cidade.objects.bulk_create([
+            Cidade(
+                nome=f'{estado.nome} {indice:03d}', nome_normalizado=normalizar_texto(f'{estado.nome} {indice:03d}'),
+                estado=estado,
+            )
+            for estado in estados for indice in range(1, por_estado + 1)
+        ], ignore_conflicts=True)
+        nomes = {f'{estado.nome} {indice:03d}' for estado in estados for indice in range(1, por_estado + 1)}
+        return list(Cidade.objects.filter(nome__in=nomes).order_by('pk').values_list('pk', flat=True))
+
+    def criar_clinicas(self, cidades, quantidade):
+        tipos = [TipoClinica.objects.get_or_create(descricao=descricao)[0].pk for descricao in TIPOS_CLINICA]
+        inicio = time.perf_counter()
+        primeiro = self.proximo_id(Clinica)
+        escritor = Escritor(Clinica, (
+            'id', 'nome_fantasia', 'cnpj', 'telefone', 'cidade', 'tipo_clinica', 'data_criacao', 'data_atualizacao',
+        ), self.lote)
+        for clinica_id in range(primeiro, primeiro + quantidade):
+            escritor.adicionar((
+                clinica_id, f'Clínica {self.rng.choice(SOBRENOMES)} {clinica_id}', f'9{clinica_id:013d}',
+                f'6399{self.rng.randrange(10 ** 7):07d}', self.rng.choice(cidades), self.rng.choice(tipos),
+                self.agora, self.agora,
+            ))
+        escritor.gravar()
+        self.relatar('clínicas', escritor.total, inicio)
+        return list(range(primeiro, primeiro + quantidade))
+
+    # --- Pessoas -----------------------------------------------------------
+
+    def criar_pessoas(self, clinicas, medicos_por_clinica, secretarias_por_clinica, total_pacientes):
+        inicio = time.perf_counter()
+        usuarios = Escritor(User, (
+            'id', 'password', 'is_superuser', 'cpf', 'email', 'first_name', 'last_name', 'nome_busca',
+            'user_type', 'is_staff', 'is_active', 'date_joined',
+        ), self.lote)
+        perfis_medico = Escritor(Medico, ('user', 'crm', 'especialidade', 'clinica'), self.lote)
+        perfis_secretaria = Escritor(Secretaria, ('user', 'clinica'), self.lote)
+        perfis_paciente = Escritor(Paciente, ('user', 'telefone', 'data_cadastro', 'dados_clinicos'), self.lote)
+        especialidades = [valor for valor, _ in Medico.EspecialidadeChoices.choices]
+
+        proximo = self.proximo_id(User)
+        medicos, secretarias, pacientes = [], [], []
+
+        def novo_usuario(tipo):
+            nonlocal proximo
+            user_id = proximo
+            proximo += 1
+            nome, sobrenome = self.rng.choice(NOMES), self.rng.choice(SOBRENOMES)
+            usuarios.adicionar((
+                user_id, SENHA_INUTILIZAVEL, False, f'{user_id:011d}', f'sintetico{user_id}@medlink.local',
+                nome, sobrenome, nome_de_busca(nome, sobrenome), tipo, False, True,
+                self.agora - timedelta(days=self.rng.randrange(1, 1500)),
+            ))
+            return user_id
+
+        for clinica_id in clinicas:
+            for _ in range(medicos_por_clinica):
+                user_id = novo_usuario(User.UserType.MEDICO)
+                perfis_medico.adicionar((user_id, f'S{user_id}', self.rng.choice(especialidades), clinica_id))
+                medicos.append(user_id)
+            for _ in range(secretarias_por_clinica):
+                user_id = novo_usuario(User.UserType.SECRETARIA)
+                perfis_secretaria.adicionar((user_id, clinica_id))
+                secretarias.append((user_id, clinica_id))
+        for _ in range(total_pacientes):
+            user_id = novo_usuario(User.UserType.PACIENTE)
+            perfis_paciente.adicionar((user_id, f'6399{self.rng.randrange(10 ** 7):07d}', self.agora, ''))
+            pacientes.append(user_id)
+
+        # Os usuários precisam existir antes dos perfis (chaves estrangeiras)
+        usuarios.gravar()
+        for escritor in (perfis_medico, perfis_secretaria, perfis_paciente):
+            escritor.gravar()
+        self.relatar('usuários e perfis', usuarios.total * 2, inicio)
+
+        self.clinica_do_medico = {}
+        for indice, user_id in enumerate(medicos):
+            self.clinica_do_medico[user_id] = clinicas[indice // medicos_por_clinica]
+        return medicos, secretarias, pacientes
+
+    # --- Consultas ---------------------------------------------------------
+
+    def status_sorteado(self, data_hora):
+        sorteio = self.rng.random()
+        if data_hora < self.agora:
+            if sorteio < 0.80:
+                return STATUS_CONSULTA_CONCLUIDA
+            if sorteio < 0.92:
+                return STATUS_CONSULTA_CANCELADA
+            if sorteio < 0.95:
+                return STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO
+            return STATUS_CONSULTA_CONFIRMADA
+        if sorteio < 0.60:
+            return STATUS_CONSULTA_PENDENTE
+        if sorteio < 0.95:
+            return STATUS_CONSULTA_CONFIRMADA
+        return STATUS_CONSULTA_CANCELADA
+
+    def criar_consultas(self, medicos, pacientes, quantidade):
+        """
+        Cada médico recebe horários consecutivos de 30 minutos, do último dia
+        (referência + 30 dias) para trás, então (médico, horário) nunca se repete.
+        """
+        inicio = time.perf_counter()
+        consultas = Escritor(Consulta, (
+            'id', 'data_hora', 'status_atual', 'valor', 'paciente', 'medico', 'clinica',
+            'data_criacao', 'data_atualizacao',
+        ), self.lote)
+        pagamentos = Escritor(Pagamento, (
+            'consulta', 'valor_pago', 'status', 'data_pagamento', 'data_criacao', 'data_atualizacao',
+        ), self.lote)
+        logs = Escritor(ConsultaStatusLog, ('status_novo', 'data_modificacao', 'consulta', 'pessoa'), self.lote)
+        anotacoes = Escritor(AnotacaoConsulta, ('consulta', 'conteudo', 'data_criacao', 'data_atualizacao'), self.lote)
+        escritores = (consultas, pagamentos, logs, anotacoes)
+
+        ultimo_dia = self.agora + timedelta(days=30, hours=8)
+        valores = [Decimal(valor) for valor in ('120.00', '150.00', '200.00', '250.00', '300.00')]
+        consulta_id = self.proximo_id(Consulta)
+        for indice in range(quantidade):
+            medico_id = medicos[indice % len(medicos)]
+            posicao = indice // len(medicos)
+            dia, horario = divmod(posicao, HORARIOS_POR_DIA)
+            data_hora = ultimo_dia - timedelta(days=dia) + timedelta(minutes=30 * horario)
+            status_atual = self.status_sorteado(data_hora)
+            criada_em = data_hora - timedelta(days=self.rng.randrange(1, 30))
+            atualizada_em = min(data_hora, self.agora) if status_atual != STATUS_CONSULTA_PENDENTE else criada_em
+            valor = self.rng.choice(valores)
+            pago = status_atual == STATUS_CONSULTA_CONCLUIDA
+
+            consultas.adicionar((
+                consulta_id, data_hora, status_atual, valor, self.rng.choice(pacientes), medico_id,
+                self.clinica_do_medico[medico_id], criada_em, atualizada_em,
+            ))
+            pagamentos.adicionar((
+                consulta_id, valor, STATUS_PAGAMENTO_PAGO if pago else STATUS_PAGAMENTO_PENDENTE,
+                data_hora if pago else None, criada_em, atualizada_em,
+            ))
+            logs.adicionar((STATUS_CONSULTA_PENDENTE, criada_em, consulta_id, None))
+            if status_atual != STATUS_CONSULTA_PENDENTE:
+                logs.adicionar((status_atual, atualizada_em, consulta_id, medico_id))
+            if pago:
+                anotacoes.adicionar((consulta_id, self.rng.choice(ANOTACOES), data_hora, data_hora))
+            consulta_id += 1
+
+            # As consultas do lote vão antes das linhas que as referenciam
+            if len(consultas.pendentes) >= self.lote:
+                for escritor in escritores:
+                    escritor.gravar()
+        for escritor in escritores:
+            escritor.gravar()
+        self.relatar('consultas', consultas.total, inicio)
+        self.relatar('  + pagamentos', pagamentos.total, inicio)
+        self.relatar('  + logs de status', logs.total, inicio)
+        self.relatar('  + anotações', anotacoes.total, inicio)
+
+    def criar_logs(self, atores, quantidade):
+        if not atores:
+            return
+        inicio = time.perf_counter()
+        escritor = Escritor(LogEntry, ('actor', 'action_type', 'details', 'timestamp'), self.lote)
+        for _ in range(quantidade):
+            ator = self.rng.choice(atores)
+            escritor.adicionar((
+                ator, LogEntry.ActionType.LOGIN, f'O utilizador {ator} iniciou sessão.',
+                self.agora - timedelta(minutes=self.rng.randrange(60 * 24 * 365)),
+            ))
+        escritor.gravar()
+        self.relatar('LogEntry', escritor.total, inicio)
+
+    def reiniciar_sequencias(self):
+        """ Os ids foram gravados explicitamente: ajusta as sequências do PostgreSQL. """
+        comandos = connection.ops.sequence_reset_sql(no_style(), [User, Clinica, Consulta])
+        if comandos:
+            with connection.cursor() as cursor:
+                for sql in comandos:
+                    cursor.execute(sql)
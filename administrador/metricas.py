@@ -0,0 +1,189 @@
+# administrador/metricas.py
+"""
+Instrumentação por requisição.
+
+O MetricasMiddleware mede, para cada view resolvida (nome da URL), a
+quantidade de queries, o tempo em SQL, o tempo de renderização da resposta
+do DRF (não inclui o `serializer.data`, que corre dentro da view) e a
+latência total. Os valores são agregados em histogramas em memória, por
+processo, expostos em /api/admin/metricas/.
+
+O cabeçalho `Server-Timing` revela detalhes internos (tempo de banco e
+número de queries), então só vai nas respostas a usuários staff, ou a todos
+com METRICAS_SERVER_TIMING ligado (ex.: num ambiente de testes de carga).
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+# Limites superiores dos baldes, em ms (o último balde é aberto)
+LIMITES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+# Limites superiores dos baldes de quantidade de queries
+LIMITES_QUERIES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+PERCENTIS = (50, 95, 99)
+
+
+class Histograma:
+    """ Histograma de baldes fixos; os percentis são estimados por interpolação. """
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, valor):
+        self.baldes[bisect.bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.soma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p):
+        if not self.total:
+            return None
+        alvo = self.total * p / 100
+        acumulado = 0
+        for indice, quantidade in enumerate(self.baldes):
+            if quantidade and acumulado + quantidade >= alvo:
+                inferior = self.limites[indice - 1] if indice else 0
+                superior = self.limites[indice] if indice < len(self.limites) else self.maximo
+                fracao = (alvo - acumulado) / quantidade
+                return round(min(inferior + (superior - inferior) * fracao, self.maximo), 2)
+            acumulado += quantidade
+        return round(self.maximo, 2)
+
+    def resumo(self):
+        resumo = {f'p{p}': self.percentil(p) for p in PERCENTIS}
+        resumo['media'] = round(self.soma / self.total, 2) if self.total else None
+        resumo['max'] = round(self.maximo, 2)
+        return resumo
+
+
+class MetricasDaView:
+    def __init__(self):
+        self.requisicoes = 0
+        self.erros = 0
+        self.latencia = Histograma(LIMITES_MS)
+        self.sql = Histograma(LIMITES_MS)
+        self.renderizacao = Histograma(LIMITES_MS)
+        self.queries = Histograma(LIMITES_QUERIES)
+
+    def registrar(self, medicao, status_code):
+        self.requisicoes += 1
+        if status_code >= 500:
+            self.erros += 1
+        self.latencia.registrar(medicao['total'])
+        self.sql.registrar(medicao['sql'])
+        self.renderizacao.registrar(medicao['renderizacao'])
+        self.queries.registrar(medicao['queries'])
+
+    def resumo(self):
+        return {
+            'requisicoes': self.requisicoes,
+            'erros': self.erros,
+            'latencia_ms': self.latencia.resumo(),
+            'sql_ms': self.sql.resumo(),
+            'renderizacao_ms': self.renderizacao.resumo(),
+            'queries': self.queries.resumo(),
+        }
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_view = {}
+        self.desde = time.time()
+
+    def registrar(self, view, medicao, status_code):
+        with self._lock:
+            if view not in self._por_view:
+                self._por_view[view] = MetricasDaView()
+            self._por_view[view].registrar(medicao, status_code)
+
+    def resumo(self):
+        with self._lock:
+            return {view: metricas.resumo() for view, metricas in sorted(self._por_view.items())}
+
+    def limpar(self):
+        with self._lock:
+            self._por_view = {}
+            self.desde = time.time()
+
+
+registro = RegistroMetricas()
+
+
+class _MedidorSQL:
+    """ execute_wrapper que conta as queries e soma o tempo gasto no banco. """
+
+    def __init__(self):
+        self.queries = 0
+        self.tempo = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo += time.perf_counter() - inicio
+            self.queries += 1
+
+
+class MetricasMiddleware:
+    """
+    Deve ficar no topo de MIDDLEWARE para medir a requisição inteira.
+    Desligado com METRICAS_ATIVAS = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativo = getattr(settings, 'METRICAS_ATIVAS', True)
+        self.server_timing_para_todos = getattr(settings, 'METRICAS_SERVER_TIMING', False)
+
+    def mostrar_server_timing(self, request):
+        # O DRF repassa à requisição do Django o usuário que autenticou
+        user = getattr(request, 'user', None)
+        return self.server_timing_para_todos or bool(user and user.is_staff)
+
+    def __call__(self, request):
+        if not self.ativo:
+            return self.get_response(request)
+
+        inicio = time.perf_counter()
+        medidor = _MedidorSQL()
+        request._metricas_renderizacao = 0.0
+        with connection.execute_wrapper(medidor):
+            response = self.get_response(request)
+        total = (time.perf_counter() - inicio) * 1000
+
+        medicao = {
+            'total': total,
+            'sql': medidor.tempo * 1000,
+            'renderizacao': request._metricas_renderizacao * 1000,
+            'queries': medidor.queries,
+        }
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<nao-resolvida>'
+        registro.registrar(view, medicao, response.status_code)
+
+        if self.mostrar_server_timing(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={medicao["sql"]:.2f};desc="{medicao["queries"]} queries"',
+                f'renderizacao;dur={medicao["renderizacao"]:.2f}',
+                f'total;dur={total:.2f}',
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # As respostas do DRF são renderizadas logo depois deste hook
+        inicio = time.perf_counter()
+
+        def fim_da_renderizacao(response):
+            request._metricas_renderizacao += time.perf_counter() - inicio
+
+        response.add_post_render_callback(fim_da_renderizacao)
+        return response
@@ -1,6 +1,10 @@
 # administrador/signals.py
 from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from users.models import User
+from .auditoria import registrar as registrar_auditoria
+from .estatisticas import invalidar_stats
 from .models import LogEntry
 
 @receiver(user_logged_in) # Ligação ao sinal de início de sessão
@@ -8,8 +12,20 @@ def log_user_login(sender, request, user, **kwargs):
     """
     Cria um registo de log sempre que um administrador inicia sessão.
     """
-    LogEntry.objects.create(
+    registrar_auditoria(LogEntry(
         actor=user,
         action_type=LogEntry.ActionType.LOGIN,
         details=f"O utilizador {user.get_full_name()} (CPF: {user.cpf}) iniciou sessão."
-    )
\ No newline at end of file
+    ))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_stats_do_painel(sender, instance, update_fields=None, **kwargs):
+    """
+    Invalida as estatísticas em cache do painel quando um utilizador muda.
+    O login só atualiza `last_login`, que não entra nas estatísticas.
+    """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_stats()
@@ -1,3 +1,171 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from agendamentos.models import Consulta, Pagamento
+from medlink_core.tests import cache_de_teste
+from users.models import User
+from . import auditoria, estatisticas, metricas
+from .auditoria import BufferAuditoria
+from .models import LogEntry
+
+
+@cache_de_teste()
+class AdminDashboardStatsCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        estatisticas.contadores.limpar()
+        self.admin = User.objects.create_superuser(cpf='99999999999', email='admin@medlink.local', password='x')
+        User.objects.create_user(cpf='11111111111', email='medico@medlink.local', user_type='MEDICO')
+        User.objects.create_user(
+            cpf='22222222222', email='paciente@medlink.local', user_type='PACIENTE', is_active=False
+        )
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('admin-dashboard-stats')
+
+    def test_primeira_chamada_faz_um_aggregate_e_a_segunda_vem_do_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['active'], 2)
+        self.assertEqual(response.data['doctors'], 1)
+        self.assertEqual(response.data['patients'], 1)
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        contadores = self.client.get(reverse('admin-dashboard-stats-cache')).data
+        self.assertEqual((contadores['hits'], contadores['misses']), (1, 1))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'medlink_cache',
+    }})
+    def test_hit_no_cache_padrao_e_uma_unica_leitura(self):
+        self.client.get(self.url)
+        # Só o SELECT do medlink_cache: os contadores não escrevem no cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).data['total'], 3)
+        self.assertEqual(estatisticas.contadores_do_cache()['hits'], 1)
+
+    def test_salvar_ou_remover_usuario_invalida_o_cache(self):
+        self.client.get(self.url)
+        secretaria = User.objects.create_user(
+            cpf='33333333333', email='secretaria@medlink.local', user_type='SECRETARIA'
+        )
+        self.assertEqual(self.client.get(self.url).data['secretaries'], 1)
+
+        secretaria.delete()
+        self.assertEqual(self.client.get(self.url).data['secretaries'], 0)
+
+    def test_cache_por_processo_usa_ttl_curto(self):
+        self.assertEqual(estatisticas.tempo_de_cache(), estatisticas.TEMPO_CACHE)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(estatisticas.tempo_de_cache(), estatisticas.TEMPO_CACHE_LOCAL)
+
+
+class BufferAuditoriaTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(cpf='11111111111', email='medico@medlink.local', user_type='MEDICO')
+
+    def log(self, texto):
+        return LogEntry(actor=self.user, action_type=LogEntry.ActionType.UPDATE, details=texto)
+
+    def test_grava_em_lote_ao_atingir_o_tamanho(self):
+        buffer = BufferAuditoria(tamanho_lote=3, intervalo=None)
+        buffer.adicionar(self.log('1'))
+        buffer.adicionar(self.log('2'))
+        self.assertEqual(LogEntry.objects.count(), 0)
+
+        buffer.adicionar(self.log('3'))
+        self.assertEqual(LogEntry.objects.count(), 3)
+
+        buffer.adicionar(self.log('4'))
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(len(buffer), 0)
+
+    def test_registrar_enfileira_so_depois_do_commit(self):
+        buffer = BufferAuditoria(tamanho_lote=10, intervalo=None)
+        with mock.patch.object(auditoria, '_buffer', buffer):
+            with self.captureOnCommitCallbacks(execute=True):
+                auditoria.registrar(self.log('depois do commit'))
+                self.assertEqual(len(buffer), 0)
+            self.assertEqual(len(buffer), 1)
+            auditoria.flush()
+        self.assertTrue(LogEntry.objects.filter(details='depois do commit').exists())
+
+    @override_settings(AUDITORIA_MODO='transacional')
+    def test_modo_transacional_grava_na_hora(self):
+        auditoria.registrar(self.log('na hora'))
+        self.assertTrue(LogEntry.objects.filter(details='na hora').exists())
+
+
+class MetricasTests(APITestCase):
+    def setUp(self):
+        metricas.registro.limpar()
+        self.admin = User.objects.create_superuser(cpf='99999999999', email='admin@medlink.local', password='x')
+        self.client.force_authenticate(self.admin)
+
+    def test_server_timing_e_histogramas_por_view(self):
+        response = self.client.get(reverse('admin-dashboard-stats'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('renderizacao;dur=', response['Server-Timing'])
+
+        views = self.client.get(reverse('admin-metricas')).data['views']
+        stats = views['admin-dashboard-stats']
+        self.assertEqual(stats['requisicoes'], 1)
+        self.assertGreaterEqual(stats['queries']['max'], 1)
+        self.assertIsNotNone(stats['latencia_ms']['p95'])
+
+    def test_somente_admin(self):
+        self.client.force_authenticate(
+            User.objects.create_user(cpf='11111111111', email='m@medlink.local', user_type='MEDICO')
+        )
+        response = self.client.get(reverse('admin-metricas'))
+        self.assertEqual(response.status_code, 403)
+        # Sem Server-Timing para quem não é staff, mas a requisição entra nos histogramas
+        self.assertNotIn('Server-Timing', response)
+        self.client.force_authenticate(None)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('admin-metricas')))
+        self.assertEqual(metricas.registro.resumo()['admin-metricas']['requisicoes'], 2)
+
+
+class HistogramaTests(TestCase):
+    def test_percentis_estimados_pelos_baldes(self):
+        histograma = metricas.Histograma(metricas.LIMITES_MS)
+        for valor in [3] * 90 + [150] * 10:
+            histograma.registrar(valor)
+        self.assertLessEqual(histograma.percentil(50), 5)
+        self.assertGreater(histograma.percentil(95), 100)
+        self.assertLessEqual(histograma.percentil(99), 150)
+
+
+class PopularDadosSinteticosTests(TestCase):
+    def popular(self):
+        call_command(
+            'popular_dados_sinteticos', seed=7, referencia='2025-03-10', clinicas=2, medicos_por_clinica=2,
+            secretarias_por_clinica=1, pacientes=20, consultas=300, logs=10, lote=64, stdout=StringIO(),
+        )
+        return list(Consulta.objects.order_by('pk').values_list(
+            'data_hora', 'status_atual', 'paciente__user__cpf', 'valor'
+        ))
+
+    def test_gera_volumes_pedidos_de_forma_deterministica(self):
+        primeira = self.popular()
+        self.assertEqual(len(primeira), 300)
+        self.assertEqual(Pagamento.objects.count(), 300)
+        self.assertEqual(User.objects.filter(user_type='MEDICO').count(), 4)
+        self.assertEqual(LogEntry.objects.count(), 10)
+
+        Consulta.objects.all().delete()
+        User.objects.all().delete()
+        LogEntry.objects.all().delete()
+        segunda = self.popular()
+        # Os ids continuam de onde pararam; o conteúdo relativo é o mesmo
+        self.assertEqual(
+            [(d, st, v) for d, st, _, v in primeira], [(d, st, v) for d, st, _, v in segunda]
+        )
@@ -15,4 +15,6 @@ router.register(r'logs', LogEntryViewSet, basename='admin-log')
 urlpatterns = [
     path('', include(router.urls)),
     path('stats/', AdminDashboardStatsAPIView.as_view(), name='admin-dashboard-stats'),
+    path('metricas/', MetricasAPIView.as_view(), name='admin-metricas'),
+    path('stats/cache/', AdminStatsCacheAPIView.as_view(), name='admin-dashboard-stats-cache'),
 ]
\ No newline at end of file
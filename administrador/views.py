@@ -1,16 +1,24 @@
 # administrador/views.py
+import re
+
 from rest_framework import viewsets, filters, status, permissions, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import transaction
+from datetime import datetime, timezone as dt_timezone
 
 # Modelos do projeto
+from medlink_core.streaming import ListaEmStreamingMixin
+from users.busca import buscar, ler_limite
 from users.models import User
 from pacientes.models import Paciente
 from medicos.models import Medico
 from secretarias.models import Secretaria
 from .models import LogEntry
+from . import metricas
+from .auditoria import registrar as registrar_auditoria
+from .estatisticas import obter_stats, contadores_do_cache
 
 # Serializers do app
 from .serializers import (
@@ -22,10 +30,9 @@ from .serializers import (
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
-from django.conf import settings
+from notificacoes.outbox import enfileirar as enfileirar_email
 
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserViewSet(ListaEmStreamingMixin, viewsets.ModelViewSet):
     """
     Endpoint da API para administradores gerirem todos os utilizadores do sistema.
     """
@@ -33,10 +40,22 @@ class AdminUserViewSet(viewsets.ModelViewSet):
     # CORREÇÃO: Usando a permissão padrão do Django REST Framework para administradores.
     permission_classes = [permissions.IsAdminUser]
 
-    # Filtros para a UI (busca e dropdown de tipo)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    # Filtros para a UI (dropdown de tipo); a busca por `?search=` fica em list()
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['user_type', 'is_active']
-    search_fields = ['first_name', 'last_name', 'email', 'cpf']
+
+    def list(self, request, *args, **kwargs):
+        """
+        Com `?search=` devolve os primeiros `?limit=` utilizadores por relevância
+        (nome sem acentos, CPF ou e-mail por prefixo; ver users.busca).
+        """
+        termo = request.query_params.get('search', '').strip()
+        if not termo:
+            return super().list(request, *args, **kwargs)
+        usuarios = buscar(
+            self.filter_queryset(self.get_queryset()), termo, ler_limite(request.query_params.get('limit'))
+        )
+        return Response(self.get_serializer(usuarios, many=True).data)
 
     def get_serializer_class(self):
         # Usa um serializer diferente para ler vs. escrever
@@ -54,7 +73,8 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         try:
             with transaction.atomic():
                 if user.user_type == 'PACIENTE':
-                    telefone = self.request.data.get('telefone', '')
+                    # Só dígitos, como no cadastro do paciente (permite a busca por prefixo)
+                    telefone = re.sub(r'\D', '', self.request.data.get('telefone', '') or '')
                     Paciente.objects.create(user=user, telefone=telefone)
                 
                 elif user.user_type == 'MEDICO':
@@ -83,11 +103,11 @@ class AdminUserViewSet(viewsets.ModelViewSet):
                 if user.user_type in [User.UserType.MEDICO, User.UserType.SECRETARIA]:
                    self.send_creation_email(user)
                 
-                LogEntry.objects.create(
+                registrar_auditoria(LogEntry(
                     actor=self.request.user,
                     action_type=LogEntry.ActionType.CREATE,
                     details=f"Criou o utilizador '{user.get_full_name()}' (CPF: {user.cpf}, Tipo: {user.get_user_type_display()})."
-                )
+                ))
         except Exception as e:
             user.delete()
             raise serializers.ValidationError({"detail": f"Falha ao criar perfil associado: {str(e)}"})
@@ -100,36 +120,31 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         
         create_url = f'http://localhost:3000/criar-senha?uid={uid}&token={token}' 
 
-        try:
-            send_mail(
-                'Bem-vindo(a) à MedLink - Crie sua Senha',
-                f'Olá {user.first_name},\n\nSua conta na MedLink foi criada com sucesso. Por favor, clique no link abaixo para definir sua senha de acesso:\n\n{create_url}\n\nSe você não esperava por isso, ignore este e-mail.',
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-        
-            print(f"Erro ao enviar email de criação de senha: {e}")
-            pass
+        # Gravado na mesma transação da criação: se ela for desfeita, o e-mail não sai
+        enfileirar_email(
+            'Bem-vindo(a) à MedLink - Crie sua Senha',
+            f'Olá {user.first_name},\n\nSua conta na MedLink foi criada com sucesso. Por favor, clique no link abaixo para definir sua senha de acesso:\n\n{create_url}\n\nSe você não esperava por isso, ignore este e-mail.',
+            [user.email],
+        )
+
     def perform_update(self, serializer):
         """ Sobrescreve para adicionar log na atualização. """
         user = serializer.save()
-        LogEntry.objects.create(
+        registrar_auditoria(LogEntry(
             actor=self.request.user,
             action_type=LogEntry.ActionType.UPDATE,
             details=f"Atualizou o utilizador '{user.get_full_name()}' (CPF: {user.cpf})."
-        )
+        ))
 
     def perform_destroy(self, instance):
         """ Sobrescreve para adicionar log na remoção. """
         details = f"Removeu o utilizador '{instance.get_full_name()}' (CPF: {instance.cpf})."
         instance.delete()
-        LogEntry.objects.create(
+        registrar_auditoria(LogEntry(
             actor=self.request.user,
             action_type=LogEntry.ActionType.DELETE,
             details=details
-        )
+        ))
 
 
 class AdminDashboardStatsAPIView(APIView):
@@ -140,30 +155,49 @@ class AdminDashboardStatsAPIView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request, *args, **kwargs):
-        total_users = User.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        
-        total_doctors = User.objects.filter(user_type='MEDICO').count()
-        total_secretaries = User.objects.filter(user_type='SECRETARIA').count()
-        total_patients = User.objects.filter(user_type='PACIENTE').count()
-
-        stats = {
-            'total': total_users,
-            'active': active_users,
-            'doctors': total_doctors,
-            'secretaries': total_secretaries,
-            'patients': total_patients,
-        }
-        
+        # Um único aggregate condicional, servido do cache enquanto nenhum User mudar
+        stats = obter_stats()
         return Response(stats, status=status.HTTP_200_OK)
 
 
-class LogEntryViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminStatsCacheAPIView(APIView):
+    """
+    Expõe os contadores de hit/miss do cache das estatísticas do painel,
+    acumulados neste processo desde o arranque.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(contadores_do_cache(), status=status.HTTP_200_OK)
+
+
+class MetricasAPIView(APIView):
+    """
+    Histogramas de latência, tempo de SQL, tempo de renderização da resposta
+    (`renderizacao_ms`) e queries por view, acumulados neste processo desde o
+    arranque (ou o último DELETE).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'desde': datetime.fromtimestamp(metricas.registro.desde, tz=dt_timezone.utc),
+            'views': metricas.registro.resumo(),
+        }, status=status.HTTP_200_OK)
+
+    def delete(self, request, *args, **kwargs):
+        metricas.registro.limpar()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class LogEntryViewSet(ListaEmStreamingMixin, viewsets.ReadOnlyModelViewSet):
     """
     Endpoint para visualizar os registos de log (auditoria).
-    Apenas permite a leitura (listagem e detalhe).
+    Apenas permite a leitura (listagem e detalhe); `?stream=1` devolve
+    todos os registos filtrados em streaming.
     """
-    queryset = LogEntry.objects.all()
+    # actor_name lê o utilizador: um JOIN em vez de uma query por registo
+    queryset = LogEntry.objects.select_related('actor')
     serializer_class = LogEntrySerializer
     # CORREÇÃO: Usando a permissão padrão do Django REST Framework.
     permission_classes = [permissions.IsAdminUser]
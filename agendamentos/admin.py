@@ -1,6 +1,6 @@
 # agendamentos/admin.py
 from django.contrib import admin
-from .models import Consulta, Pagamento, ConsultaStatusLog
+from .models import Consulta, Pagamento, ConsultaStatusLog, JornadaTrabalho, BloqueioAgenda
 
 class ConsultaStatusLogInline(admin.TabularInline):
     model = ConsultaStatusLog
@@ -36,4 +36,17 @@ class ConsultaAdmin(admin.ModelAdmin):
     def get_inline_instances(self, request, obj=None):
         if not obj:
             return []
-        return super().get_inline_instances(request, obj)
\ No newline at end of file
+        return super().get_inline_instances(request, obj)
+
+@admin.register(JornadaTrabalho)
+class JornadaTrabalhoAdmin(admin.ModelAdmin):
+    list_display = ('medico', 'clinica', 'dia_semana', 'hora_inicio', 'hora_fim', 'duracao_consulta')
+    list_filter = ('dia_semana', 'clinica')
+    list_select_related = ('medico', 'clinica')
+
+
+@admin.register(BloqueioAgenda)
+class BloqueioAgendaAdmin(admin.ModelAdmin):
+    list_display = ('medico', 'clinica', 'inicio', 'fim', 'motivo')
+    list_filter = ('clinica',)
+    list_select_related = ('medico', 'clinica')
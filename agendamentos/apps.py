@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AgendamentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'agendamentos'
+
+    def ready(self):
+        # Importa os sinais que mantêm a grade de horários sincronizada
+        import agendamentos.signals
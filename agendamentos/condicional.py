@@ -0,0 +1,61 @@
+# agendamentos/condicional.py
+"""
+GET condicional (ETag) para as leituras de agenda.
+
+O ETag vem de um único aggregate sobre o queryset já filtrado: quantidade
+de linhas e maior `data_atualizacao` (da consulta e, se pedido, das relações
+serializadas junto). Inserções e remoções mudam a contagem e qualquer save()
+muda a data, então uma agenda inalterada responde 304 sem carregar nem
+serializar as consultas.
+
+Não há Last-Modified: a maior `data_atualizacao` não muda quando uma
+consulta que não é a mais recente sai do queryset, e um If-Modified-Since
+responderia 304 com a agenda desatualizada. Só o ETag, que inclui a
+contagem, decide.
+
+Atenção: `QuerySet.update()` não atualiza campos `auto_now`; quem alterar
+consultas em massa deve definir `data_atualizacao=timezone.now()`.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+
+
+def calcular_validadores(queryset, relacoes=(), chave=''):
+    """
+    Retorna o ETag do queryset com uma única query.
+    `relacoes` são caminhos para modelos com `data_atualizacao` cujo conteúdo
+    também aparece na resposta; `chave` diferencia respostas com formato
+    diferente (ex.: o usuário ou a página pedida).
+    """
+    agregados = {'total': Count('pk'), 'ultima': Max('data_atualizacao')}
+    for indice, relacao in enumerate(relacoes):
+        agregados[f'ultima_{indice}'] = Max(f'{relacao}__data_atualizacao')
+    resultado = queryset.order_by().aggregate(**agregados)
+
+    datas = [valor for nome, valor in resultado.items() if nome.startswith('ultima') and valor]
+    ultima = max(datas) if datas else None
+    conteudo = f"{chave}|{resultado['total']}|{ultima.isoformat() if ultima else ''}"
+    return quote_etag(hashlib.md5(conteudo.encode('utf-8')).hexdigest())
+
+
+def resposta_condicional(request, etag):
+    """
+    Devolve um 304 se o cliente já tem a versão atual, ou None para seguir
+    com a resposta completa.
+    """
+    nao_modificada = get_conditional_response(
+        request._request if hasattr(request, '_request') else request,
+        etag=etag,
+    )
+    if nao_modificada is not None:
+        nao_modificada['ETag'] = etag
+    return nao_modificada
+
+
+def aplicar_validadores(response, etag):
+    response['ETag'] = etag
+    # Força o cliente a revalidar em vez de reutilizar uma agenda antiga
+    response['Cache-Control'] = 'private, no-cache'
+    return response
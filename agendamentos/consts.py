@@ -8,6 +8,9 @@ STATUS_CONSULTA_CANCELADA = 'CANCELADA'
 STATUS_CONSULTA_CONCLUIDA = 'CONCLUIDA'
 STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO = 'REAGENDAMENTO_SOLICITADO'
 
+# Consultas que recebem lembrete por e-mail
+STATUS_CONSULTA_LEMBRETE = (STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA)
+
 STATUS_CONSULTA_CHOICES = (
     (STATUS_CONSULTA_PENDENTE, _('Pendente')),
     (STATUS_CONSULTA_CONFIRMADA, _('Confirmada')),
@@ -17,6 +20,34 @@ STATUS_CONSULTA_CHOICES = (
     ('REAGENDADA', 'Reagendada'),
 )
 
+# Transições de status permitidas: {status atual: status para os quais pode ir}.
+# Mudar para o mesmo status não é uma transição (nada é gravado).
+# CANCELADA e CONCLUIDA são finais: um horário cancelado pode já ter sido
+# ocupado por outra consulta.
+TRANSICOES_STATUS_CONSULTA = {
+    STATUS_CONSULTA_PENDENTE: {
+        STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_CANCELADA,
+        STATUS_CONSULTA_CONCLUIDA, STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO,
+    },
+    STATUS_CONSULTA_CONFIRMADA: {
+        STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CANCELADA,
+        STATUS_CONSULTA_CONCLUIDA, STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO,
+    },
+    STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO: {
+        STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_CANCELADA,
+    },
+    STATUS_CONSULTA_CANCELADA: set(),
+    STATUS_CONSULTA_CONCLUIDA: set(),
+    # Valores antigos ainda presentes nas choices
+    'SOLICITANDO_REAGENDAMENTO': {
+        STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_CANCELADA,
+    },
+    'REAGENDADA': {
+        STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA,
+        STATUS_CONSULTA_CANCELADA, STATUS_CONSULTA_CONCLUIDA,
+    },
+}
+
 # Opções simplificadas para o status do pagamento
 STATUS_PAGAMENTO_PENDENTE = 'PENDENTE'
 STATUS_PAGAMENTO_PAGO = 'PAGO'
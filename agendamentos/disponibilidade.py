@@ -0,0 +1,180 @@
+# agendamentos/disponibilidade.py
+"""
+Motor de disponibilidade da agenda.
+
+As jornadas de trabalho geram uma grade materializada de horários
+(SlotAgenda) para os próximos HORIZONTE_DIAS. Consultas e bloqueios apenas
+marcam os slots como ocupados, com UPDATEs set-based, e a busca de horários
+livres vira uma leitura ordenada de um índice parcial com LIMIT.
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from .consts import STATUS_CONSULTA_CANCELADA
+from .models import Consulta, JornadaTrabalho, BloqueioAgenda, SlotAgenda
+
+# Quantos dias à frente a grade de horários é mantida
+HORIZONTE_DIAS = 60
+TAMANHO_LOTE = 1000
+
+
+def gerar_slots(medico_ids=None, inicio=None, dias=HORIZONTE_DIAS):
+    """
+    Materializa os slots das jornadas no intervalo `[inicio, inicio + dias)`.
+    Slots já existentes são preservados (ignore_conflicts), então o comando
+    pode ser executado diariamente para estender o horizonte.
+    Retorna o número de slots enviados ao banco.
+    """
+    inicio = inicio or timezone.localdate()
+    jornadas = JornadaTrabalho.objects.all()
+    if medico_ids is not None:
+        jornadas = jornadas.filter(medico_id__in=medico_ids)
+
+    por_dia_semana = {}
+    for jornada in jornadas:
+        por_dia_semana.setdefault(jornada.dia_semana, []).append(jornada)
+
+    agora = timezone.now()
+    fuso = timezone.get_current_timezone()
+    novos = []
+    total = 0
+    for deslocamento in range(dias):
+        dia = inicio + timedelta(days=deslocamento)
+        for jornada in por_dia_semana.get(dia.weekday(), []):
+            duracao = timedelta(minutes=jornada.duracao_consulta)
+            atual = timezone.make_aware(datetime.combine(dia, jornada.hora_inicio), fuso)
+            fim_jornada = timezone.make_aware(datetime.combine(dia, jornada.hora_fim), fuso)
+            while atual + duracao <= fim_jornada:
+                if atual >= agora:
+                    novos.append(SlotAgenda(
+                        medico_id=jornada.medico_id, clinica_id=jornada.clinica_id,
+                        inicio=atual, fim=atual + duracao,
+                    ))
+                atual += duracao
+            if len(novos) >= TAMANHO_LOTE:
+                SlotAgenda.objects.bulk_create(novos, ignore_conflicts=True)
+                total += len(novos)
+                novos = []
+    if novos:
+        SlotAgenda.objects.bulk_create(novos, ignore_conflicts=True)
+        total += len(novos)
+
+    if total:
+        fim = timezone.make_aware(datetime.combine(inicio + timedelta(days=dias), datetime.min.time()), fuso)
+        ocupar_slots_no_intervalo(agora, fim, medico_ids)
+        aplicar_bloqueios(agora, fim, medico_ids)
+    return total
+
+
+def regenerar_slots_do_medico(medico_id):
+    """
+    Refaz a grade futura de um médico depois de mudar a sua jornada.
+    Slots já ocupados por consultas são mantidos.
+    """
+    SlotAgenda.objects.filter(
+        medico_id=medico_id, inicio__gte=timezone.now(), consulta__isnull=True
+    ).delete()
+    return gerar_slots(medico_ids=[medico_id])
+
+
+def _consultas_que_ocupam_o_slot():
+    return Consulta.objects.filter(
+        medico_id=OuterRef('medico_id'),
+        data_hora__gte=OuterRef('inicio'),
+        data_hora__lt=OuterRef('fim'),
+    ).exclude(status_atual=STATUS_CONSULTA_CANCELADA)
+
+
+def ocupar_slots_no_intervalo(inicio, fim, medico_ids=None):
+    """ Liga aos slots livres do intervalo as consultas que caem neles (um UPDATE). """
+    slots = SlotAgenda.objects.filter(consulta__isnull=True, inicio__gte=inicio, inicio__lt=fim)
+    if medico_ids is not None:
+        slots = slots.filter(medico_id__in=medico_ids)
+    ocupantes = _consultas_que_ocupam_o_slot()
+    return slots.filter(Exists(ocupantes)).update(consulta=Subquery(ocupantes.values('pk')[:1]))
+
+
+def sincronizar_slots(consultas):
+    """
+    Atualiza a grade depois de criar, remarcar ou cancelar consultas:
+    libera os slots que elas ocupavam e ocupa os novos horários.
+    Custa dois UPDATEs, independentemente do número de consultas.
+    """
+    consultas = list(consultas)
+    if not consultas:
+        return
+    ids = [consulta.pk for consulta in consultas]
+    SlotAgenda.objects.filter(consulta_id__in=ids).update(consulta=None)
+
+    ocupantes = _consultas_que_ocupam_o_slot().filter(pk__in=ids)
+    SlotAgenda.objects.filter(
+        Exists(ocupantes),
+        consulta__isnull=True,
+        medico_id__in={consulta.medico_id for consulta in consultas},
+        inicio__lte=max(consulta.data_hora for consulta in consultas),
+        fim__gt=min(consulta.data_hora for consulta in consultas),
+    ).update(consulta=Subquery(ocupantes.values('pk')[:1]))
+
+
+def _filtro_bloqueio(bloqueio):
+    filtro = Q(inicio__lt=bloqueio.fim, fim__gt=bloqueio.inicio)
+    if bloqueio.medico_id:
+        filtro &= Q(medico_id=bloqueio.medico_id)
+    if bloqueio.clinica_id:
+        filtro &= Q(clinica_id=bloqueio.clinica_id)
+    return filtro
+
+
+def aplicar_bloqueios(inicio, fim, medico_ids=None):
+    """ Marca como bloqueados os slots do intervalo cobertos por algum bloqueio. """
+    bloqueios = BloqueioAgenda.objects.filter(inicio__lt=fim, fim__gt=inicio)
+    if medico_ids is not None:
+        bloqueios = bloqueios.filter(Q(medico_id__in=medico_ids) | Q(medico__isnull=True))
+    filtro = Q()
+    for bloqueio in bloqueios:
+        filtro |= _filtro_bloqueio(bloqueio)
+    if not filtro:
+        return 0
+    slots = SlotAgenda.objects.filter(filtro, bloqueado=False)
+    if medico_ids is not None:
+        slots = slots.filter(medico_id__in=medico_ids)
+    return slots.update(bloqueado=True)
+
+
+def bloquear_periodo(bloqueio):
+    """ Marca os slots cobertos por um bloqueio recém-criado ou alterado. """
+    return SlotAgenda.objects.filter(_filtro_bloqueio(bloqueio), bloqueado=False).update(bloqueado=True)
+
+
+def liberar_periodo(bloqueio):
+    """
+    Libera os slots de um bloqueio removido (ou do período antigo de um
+    bloqueio alterado) e reaplica os outros bloqueios que cobrem o período.
+    """
+    SlotAgenda.objects.filter(_filtro_bloqueio(bloqueio), bloqueado=True).update(bloqueado=False)
+    restantes = BloqueioAgenda.objects.filter(inicio__lt=bloqueio.fim, fim__gt=bloqueio.inicio)
+    filtro = Q()
+    for outro in restantes:
+        filtro |= _filtro_bloqueio(outro)
+    if filtro:
+        SlotAgenda.objects.filter(filtro & _filtro_bloqueio(bloqueio)).update(bloqueado=True)
+
+
+def horarios_livres(inicio, fim, limite, medico_id=None, clinica_id=None, especialidade=None):
+    """
+    Primeiros `limite` horários livres em `[inicio, fim)`, em ordem cronológica.
+    Sem médico, busca em todos os médicos (opcionalmente de uma especialidade).
+    """
+    slots = SlotAgenda.objects.filter(
+        consulta__isnull=True, bloqueado=False,
+        inicio__gte=max(inicio, timezone.now()), inicio__lt=fim,
+    )
+    if medico_id:
+        slots = slots.filter(medico_id=medico_id)
+    if clinica_id:
+        slots = slots.filter(clinica_id=clinica_id)
+    if especialidade:
+        slots = slots.filter(medico__perfil_medico__especialidade=especialidade)
+    return slots.select_related('medico__perfil_medico', 'clinica').order_by('inicio', 'medico_id')[:limite]
@@ -0,0 +1,116 @@
+# agendamentos/exportacao.py
+"""
+Exportação de consultas com pagamento, paciente e médico em CSV ou NDJSON.
+
+As linhas saem de `values_list(...).iterator(chunk_size)`, que no
+PostgreSQL usa um cursor do lado do servidor: nenhum modelo é instanciado
+e só um lote fica em memória. O cabeçalho é emitido antes da query, então
+o primeiro byte chega ao cliente imediatamente.
+"""
+import csv
+import io
+from datetime import datetime
+
+from django.utils import timezone
+
+from medlink_core.renderers import dumps
+
+TAMANHO_LOTE = 2000
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+CAMPOS = (
+    'id', 'data_hora', 'status_atual', 'valor',
+    'clinica_id', 'clinica__nome_fantasia',
+    'paciente_id', 'paciente__user__first_name', 'paciente__user__last_name', 'paciente__user__cpf',
+    'medico_id', 'medico__first_name', 'medico__last_name', 'medico__perfil_medico__crm',
+    'pagamento__status', 'pagamento__valor_pago', 'pagamento__data_pagamento',
+)
+CABECALHO = (
+    'consulta_id', 'data_hora', 'status', 'valor',
+    'clinica_id', 'clinica',
+    'paciente_id', 'paciente', 'paciente_cpf',
+    'medico_id', 'medico', 'medico_crm',
+    'pagamento_status', 'pagamento_valor', 'pagamento_data',
+)
+
+
+def intervalo_do_mes(texto):
+    """ `AAAA-MM` -> `[início do mês, início do mês seguinte)`; ValueError se inválido. """
+    ano, mes = (int(parte) for parte in texto.split('-'))
+    inicio = timezone.make_aware(datetime(ano, mes, 1))
+    fim = timezone.make_aware(datetime(ano + 1, 1, 1) if mes == 12 else datetime(ano, mes + 1, 1))
+    return inicio, fim
+
+
+def _data(valor):
+    return timezone.localtime(valor).isoformat() if valor else None
+
+
+def _texto(valor):
+    # Valores monetários como texto, para não perder precisão no NDJSON
+    return None if valor is None else str(valor)
+
+
+def _linha(valores):
+    (
+        pk, data_hora, status_atual, valor, clinica_id, clinica,
+        paciente_id, paciente_nome, paciente_sobrenome, paciente_cpf,
+        medico_id, medico_nome, medico_sobrenome, crm,
+        pagamento_status, pagamento_valor, pagamento_data,
+    ) = valores
+    return (
+        pk, _data(data_hora), status_atual, _texto(valor), clinica_id, clinica,
+        paciente_id, f'{paciente_nome or ""} {paciente_sobrenome or ""}'.strip(), paciente_cpf,
+        medico_id, f'{medico_nome} {medico_sobrenome}'.strip(), crm,
+        pagamento_status, _texto(pagamento_valor), _data(pagamento_data),
+    )
+
+
+def _linhas(queryset, tamanho_lote):
+    consultas = queryset.order_by('data_hora', 'id').values_list(*CAMPOS)
+    for valores in consultas.iterator(chunk_size=tamanho_lote):
+        yield _linha(valores)
+
+
+def _csv(linhas, tamanho_lote):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(CABECALHO)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    pendentes = 0
+    for linha in linhas:
+        escritor.writerow(linha)
+        pendentes += 1
+        if pendentes >= tamanho_lote:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    if pendentes:
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson(linhas, tamanho_lote):
+    # Sem cabeçalho: a primeira linha sai sozinha, sem esperar o lote
+    lote = []
+    primeira = True
+    for linha in linhas:
+        lote.append(dumps(dict(zip(CABECALHO, linha))))
+        if primeira or len(lote) >= tamanho_lote:
+            yield b'\n'.join(lote) + b'\n'
+            lote = []
+            primeira = False
+    if lote:
+        yield b'\n'.join(lote) + b'\n'
+
+
+def exportar(queryset, formato, tamanho_lote=TAMANHO_LOTE):
+    """ Gera os bytes da exportação de `queryset` no `formato` ('csv' ou 'ndjson'). """
+    gerador = _csv if formato == 'csv' else _ndjson
+    return gerador(_linhas(queryset, tamanho_lote), tamanho_lote)
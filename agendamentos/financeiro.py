@@ -0,0 +1,169 @@
+# agendamentos/financeiro.py
+"""
+Manutenção incremental dos resumos financeiros (ResumoFinanceiroDiario).
+
+Cada pagamento contribui para a linha (dia local da consulta, clínica,
+médico): o valor entra em `valor_faturado`, também em `valor_recebido`
+quando está pago, e conta como pendente ou pago. Os sinais em
+agendamentos.signals movem essa contribuição quando o pagamento muda de
+status, quando a consulta muda de dia/clínica/médico e quando é removida;
+caminhos em lote (bulk_create) chamam `registrar_pagamentos_criados`.
+Para reconstruir tudo: `manage.py recalcular_financeiro`.
+"""
+import operator
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Concat, TruncDate, TruncMonth
+from django.utils import timezone
+
+from .consts import STATUS_PAGAMENTO_PENDENTE, STATUS_PAGAMENTO_PAGO
+from .models import Pagamento, ResumoFinanceiroDiario
+
+# Coluna de contagem incrementada para cada status do pagamento
+COLUNA_POR_STATUS = {
+    STATUS_PAGAMENTO_PENDENTE: 'pagamentos_pendentes',
+    STATUS_PAGAMENTO_PAGO: 'pagamentos_pagos',
+}
+COLUNAS_SOMADAS = ('valor_faturado', 'valor_recebido', 'pagamentos_pendentes', 'pagamentos_pagos')
+AGRUPAMENTOS = ('dia', 'mes', 'clinica', 'medico')
+
+
+def _contribuir(deltas, estado, sinal):
+    """
+    Soma (ou subtrai, com sinal -1) a contribuição de um pagamento.
+    `estado` é `(clinica_id, medico_id, data_hora, status, valor)`.
+    """
+    clinica_id, medico_id, data_hora, status_pagamento, valor = estado
+    valor = (valor or Decimal('0')) * sinal
+    colunas = deltas[(timezone.localtime(data_hora).date(), clinica_id, medico_id)]
+    colunas['valor_faturado'] += valor
+    if status_pagamento == STATUS_PAGAMENTO_PAGO:
+        colunas['valor_recebido'] += valor
+    coluna = COLUNA_POR_STATUS.get(status_pagamento)
+    if coluna:
+        colunas[coluna] += sinal
+
+
+def aplicar_deltas(deltas):
+    """
+    Aplica `{(dia, clinica_id, medico_id): {coluna: delta}}` com um INSERT
+    das linhas que faltam e um único UPDATE atômico (F() + CASE), então o
+    custo não depende de quantos dias/médicos o lote atinge.
+    """
+    linhas = {}
+    for chave, colunas in deltas.items():
+        colunas = {coluna: delta for coluna, delta in colunas.items() if delta}
+        if colunas:
+            linhas[chave] = colunas
+    if not linhas:
+        return
+
+    filtros = {
+        chave: Q(dia=chave[0], clinica_id=chave[1], medico_id=chave[2]) for chave in linhas
+    }
+    atualizacoes = {}
+    for coluna in COLUNAS_SOMADAS:
+        casos = [
+            When(filtros[chave], then=Value(colunas[coluna]))
+            for chave, colunas in linhas.items() if coluna in colunas
+        ]
+        if casos:
+            campo = ResumoFinanceiroDiario._meta.get_field(coluna)
+            atualizacoes[coluna] = F(coluna) + Case(*casos, default=Value(0), output_field=campo)
+
+    with transaction.atomic():
+        ResumoFinanceiroDiario.objects.bulk_create(
+            [ResumoFinanceiroDiario(dia=dia, clinica_id=clinica_id, medico_id=medico_id)
+             for dia, clinica_id, medico_id in linhas],
+            ignore_conflicts=True,
+        )
+        ResumoFinanceiroDiario.objects.filter(reduce(operator.or_, filtros.values())).update(**atualizacoes)
+
+
+def registrar_mudanca(anterior, atual):
+    """ Move a contribuição de um pagamento; None representa criação/remoção. """
+    deltas = defaultdict(lambda: defaultdict(int))
+    if anterior:
+        _contribuir(deltas, anterior, -1)
+    if atual:
+        _contribuir(deltas, atual, 1)
+    aplicar_deltas(deltas)
+
+
+def registrar_pagamentos_criados(pagamentos):
+    """ Conta pagamentos criados fora do post_save (ex.: bulk_create), com a consulta carregada. """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for pagamento in pagamentos:
+        consulta = pagamento.consulta
+        _contribuir(deltas, (
+            consulta.clinica_id, consulta.medico_id, consulta.data_hora, pagamento.status, pagamento.valor_pago
+        ), 1)
+    aplicar_deltas(deltas)
+
+
+def recalcular(clinica_id=None):
+    """ Reconstrói os resumos a partir dos pagamentos (um GROUP BY). """
+    pagamentos = Pagamento.objects.all()
+    resumos = ResumoFinanceiroDiario.objects.all()
+    if clinica_id is not None:
+        pagamentos = pagamentos.filter(consulta__clinica_id=clinica_id)
+        resumos = resumos.filter(clinica_id=clinica_id)
+
+    zero = Value(Decimal('0'))
+    linhas = (
+        pagamentos.annotate(dia=TruncDate('consulta__data_hora', tzinfo=timezone.get_current_timezone()))
+        .values('dia', clinica_id=F('consulta__clinica_id'), medico_id=F('consulta__medico_id'))
+        .annotate(
+            valor_faturado=Coalesce(Sum('valor_pago'), zero),
+            valor_recebido=Coalesce(Sum('valor_pago', filter=Q(status=STATUS_PAGAMENTO_PAGO)), zero),
+            **{
+                coluna: Count('pk', filter=Q(status=status_pagamento))
+                for status_pagamento, coluna in COLUNA_POR_STATUS.items()
+            },
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        resumos.delete()
+        ResumoFinanceiroDiario.objects.bulk_create(
+            [ResumoFinanceiroDiario(**linha) for linha in linhas],
+            batch_size=1000,
+        )
+
+
+def relatorio(resumos, inicio, fim, agrupar):
+    """
+    Soma os resumos de `[inicio, fim)` (datas) agrupados por 'dia', 'mes',
+    'clinica' ou 'medico'. O custo depende do número de linhas de resumo do
+    período (dias x médicos), não do número de pagamentos.
+    """
+    resumos = resumos.filter(dia__gte=inicio, dia__lt=fim)
+    somas = {coluna: Sum(coluna) for coluna in COLUNAS_SOMADAS}
+
+    if agrupar == 'mes':
+        grupos = resumos.annotate(mes=TruncMonth('dia')).values('mes').order_by('mes')
+    elif agrupar == 'clinica':
+        grupos = resumos.values('clinica_id', clinica_nome=F('clinica__nome_fantasia')).order_by('clinica_id')
+    elif agrupar == 'medico':
+        grupos = resumos.values(
+            'medico_id', medico_nome=Concat('medico__first_name', Value(' '), 'medico__last_name')
+        ).order_by('medico_id')
+    else:
+        grupos = resumos.values('dia').order_by('dia')
+
+    totais = resumos.aggregate(**somas)
+    return (
+        _formatar({coluna: totais[coluna] or 0 for coluna in COLUNAS_SOMADAS}),
+        [_formatar(grupo) for grupo in grupos.annotate(**somas)],
+    )
+
+
+def _formatar(linha):
+    # Valores monetários como texto, como nos serializers (COERCE_DECIMAL_TO_STRING)
+    for coluna in ('valor_faturado', 'valor_recebido'):
+        linha[coluna] = str(Decimal(linha[coluna]).quantize(Decimal('0.01')))
+    return linha
@@ -0,0 +1,95 @@
+# agendamentos/lembretes.py
+"""
+Lembretes de consulta por e-mail.
+
+Uma consulta entra na janela quando faltam até
+`SystemSettings.reminder_hours_before` horas para ela. A busca lê só o
+índice parcial `consulta_lembrete_pendente_idx` (consultas ativas ainda sem
+lembrete) no intervalo `(agora, agora + janela]`, e a marca d'água
+`lembrete_enviado_em` tira a consulta do índice assim que o lembrete é
+enfileirado.
+
+Vários workers podem rodar ao mesmo tempo: cada lote é reservado com
+SELECT ... FOR UPDATE SKIP LOCKED (no PostgreSQL), a marca é gravada só nas
+consultas que ainda não a tinham e a chave do e-mail na caixa de saída
+impede um segundo envio para a mesma consulta e horário.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from configuracoes import cache as configuracoes
+from notificacoes.outbox import enfileirar_em_lote
+from .consts import STATUS_CONSULTA_LEMBRETE
+from .models import Consulta
+
+TAMANHO_LOTE = 500
+
+
+def consultas_na_janela(agora, horas):
+    return Consulta.objects.filter(
+        lembrete_enviado_em__isnull=True,
+        status_atual__in=STATUS_CONSULTA_LEMBRETE,
+        data_hora__gt=agora,
+        data_hora__lte=agora + timedelta(hours=horas),
+    )
+
+
+def chave_do_lembrete(consulta_id, data_hora):
+    # O horário entra na chave: uma consulta remarcada recebe um novo lembrete
+    return f'lembrete:{consulta_id}:{data_hora.isoformat()}'
+
+
+def mensagem_do_lembrete(consulta_id, data_hora, email, nome, medico_nome, medico_sobrenome, clinica):
+    medico = f'{medico_nome} {medico_sobrenome}'.strip()
+    quando = timezone.localtime(data_hora)
+    corpo = (
+        f'Olá, {nome}!\n\n'
+        f'Lembramos que você tem uma consulta com Dr(a). {medico} '
+        f'em {quando:%d/%m/%Y} às {quando:%H:%M}, na clínica {clinica}.\n\n'
+        f'Se não puder comparecer, entre em contato com a clínica.\n\n'
+        f'Atenciosamente,\nEquipe MedLink'
+    )
+    return 'Lembrete de Consulta - MedLink', corpo, [email], chave_do_lembrete(consulta_id, data_hora)
+
+
+def processar_lote(agora, horas, tamanho_lote=TAMANHO_LOTE):
+    """
+    Reserva, marca e enfileira um lote de consultas da janela.
+    Custa um número fixo de queries. Retorna quantos lembretes foram enfileirados.
+    """
+    with transaction.atomic():
+        pendentes = consultas_na_janela(agora, horas).order_by('data_hora', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        ids = list(pendentes.values_list('pk', flat=True)[:tamanho_lote])
+        if not ids:
+            return 0
+
+        linhas = list(
+            Consulta.objects.filter(pk__in=ids).values_list(
+                'pk', 'data_hora', 'paciente__user__email', 'paciente__user__first_name',
+                'medico__first_name', 'medico__last_name', 'clinica__nome_fantasia',
+            )
+        )
+        Consulta.objects.filter(pk__in=ids, lembrete_enviado_em__isnull=True).update(lembrete_enviado_em=agora)
+        enfileirar_em_lote(mensagem_do_lembrete(*linha) for linha in linhas if linha[2])
+    return len(ids)
+
+
+def agendar_lembretes(agora=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Enfileira os lembretes de todas as consultas que entraram na janela.
+    Não faz nada com as notificações por e-mail desligadas.
+    """
+    if not configuracoes.email_notifications():
+        return 0
+    horas = configuracoes.reminder_hours_before()
+    agora = agora or timezone.now()
+    total = 0
+    while True:
+        enfileirados = processar_lote(agora, horas, tamanho_lote)
+        total += enfileirados
+        if enfileirados < tamanho_lote:
+            return total
@@ -0,0 +1,158 @@
+import statistics
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from agendamentos.models import Consulta
+from agendamentos.services import HorarioIndisponivel, agendar_consulta, bloquear_agenda_do_medico
+from clinicas.models import Estado, Cidade, TipoClinica, Clinica
+from medicos.models import Medico
+from pacientes.models import Paciente
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Dispara N reservas concorrentes para o mesmo horário do mesmo médico e mede '
+        'throughput, espera pelo lock da agenda e quantos conflitos foram rejeitados. '
+        'Os dados de teste são criados e removidos pelo próprio comando.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Reservas simultâneas por rodada.')
+        parser.add_argument('--rodadas', type=int, default=5, help='Quantidade de horários disputados.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        rodadas = options['rodadas']
+        self.stdout.write(self.style.HTTP_INFO(
+            f'Banco: {connection.vendor}. {rodadas} rodada(s) com {threads} reservas simultâneas...'
+        ))
+
+        fixture = self.criar_fixture(threads)
+        try:
+            resultados = []
+            inicio = time.perf_counter()
+            for rodada in range(rodadas):
+                data_hora = fixture['data_hora'] + timedelta(hours=rodada)
+                resultados.extend(self.disputar_horario(fixture, data_hora, threads))
+            duracao = time.perf_counter() - inicio
+            self.relatar(resultados, duracao, fixture['medico'], rodadas)
+        finally:
+            self.remover_fixture(fixture)
+
+    def disputar_horario(self, fixture, data_hora, threads):
+        barreira = threading.Barrier(threads)
+        resultados = []
+        lock = threading.Lock()
+
+        def reservar(paciente):
+            barreira.wait()
+            resultado = {'espera_lock': 0.0}
+            inicio = time.perf_counter()
+            try:
+                # Toma o lock antes só para medir a espera; agendar_consulta o
+                # readquire na mesma transação sem bloquear de novo.
+                with transaction.atomic():
+                    antes_do_lock = time.perf_counter()
+                    bloquear_agenda_do_medico(fixture['medico'].pk)
+                    resultado['espera_lock'] = time.perf_counter() - antes_do_lock
+                    agendar_consulta({
+                        'paciente': paciente, 'medico': fixture['medico'], 'clinica': fixture['clinica'],
+                        'data_hora': data_hora, 'valor': Decimal('100.00'),
+                    }, None)
+                resultado['status'] = 'agendada'
+            except HorarioIndisponivel:
+                resultado['status'] = 'conflito'
+            except DatabaseError:
+                resultado['status'] = 'erro'
+            finally:
+                resultado['latencia'] = time.perf_counter() - inicio
+                connection.close()
+            with lock:
+                resultados.append(resultado)
+
+        workers = [
+            threading.Thread(target=reservar, args=(paciente,))
+            for paciente in fixture['pacientes'][:threads]
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        agendadas = Consulta.objects.filter(medico=fixture['medico'], data_hora=data_hora).count()
+        if agendadas > 1:
+            self.stdout.write(self.style.ERROR(f'  {data_hora}: {agendadas} consultas no mesmo horário!'))
+        return resultados
+
+    def relatar(self, resultados, duracao, medico, rodadas):
+        contagem = {}
+        for resultado in resultados:
+            contagem[resultado['status']] = contagem.get(resultado['status'], 0) + 1
+        esperas = sorted(r['espera_lock'] * 1000 for r in resultados)
+        latencias = sorted(r['latencia'] * 1000 for r in resultados)
+
+        def p95(valores):
+            return valores[min(len(valores) - 1, int(len(valores) * 0.95))]
+
+        self.stdout.write(f'Tentativas:                 {len(resultados)}')
+        self.stdout.write(f'Agendadas:                  {contagem.get("agendada", 0)} (esperado: {rodadas})')
+        self.stdout.write(f'Conflitos rejeitados:       {contagem.get("conflito", 0)}')
+        self.stdout.write(f'Erros:                      {contagem.get("erro", 0)}')
+        self.stdout.write(f'Throughput:                 {len(resultados) / duracao:.1f} reservas/s')
+        self.stdout.write(
+            f'Espera pelo lock (ms):      média {statistics.mean(esperas):.2f} | '
+            f'p95 {p95(esperas):.2f} | máx {esperas[-1]:.2f}'
+        )
+        self.stdout.write(
+            f'Latência da reserva (ms):   média {statistics.mean(latencias):.2f} | '
+            f'p95 {p95(latencias):.2f} | máx {latencias[-1]:.2f}'
+        )
+
+        horarios = Consulta.objects.filter(medico=medico).values('data_hora').distinct().count()
+        if contagem.get('agendada', 0) == rodadas == horarios:
+            self.stdout.write(self.style.SUCCESS('Nenhuma reserva duplicada.'))
+        else:
+            self.stdout.write(self.style.ERROR('Foram encontradas reservas duplicadas ou perdidas.'))
+
+    def criar_fixture(self, threads):
+        sufixo = uuid.uuid4().hex[:8]
+        estado = Estado.objects.create(nome=f'Benchmark {sufixo}', uf=sufixo[:2])
+        cidade = Cidade.objects.create(nome=f'Benchmark {sufixo}', estado=estado)
+        tipo = TipoClinica.objects.create(descricao=f'Benchmark {sufixo}')
+        clinica = Clinica.objects.create(
+            nome_fantasia=f'Benchmark {sufixo}', cnpj=sufixo.ljust(14, '0')[:14],
+            cidade=cidade, tipo_clinica=tipo,
+        )
+        medico = User.objects.create_user(
+            cpf=f'b{sufixo}'[:11], email=f'medico-{sufixo}@benchmark.local', user_type='MEDICO',
+        )
+        Medico.objects.create(user=medico, crm=f'BENCH-{sufixo}', clinica=clinica)
+        pacientes = []
+        for indice in range(threads):
+            user = User.objects.create_user(
+                cpf=f'{sufixo[:5]}{indice:06d}', email=f'paciente-{indice}-{sufixo}@benchmark.local',
+                user_type='PACIENTE',
+            )
+            pacientes.append(Paciente.objects.create(user=user))
+        data_hora = (timezone.now() + timedelta(days=365)).replace(minute=0, second=0, microsecond=0)
+        return {
+            'estado': estado, 'cidade': cidade, 'tipo': tipo, 'clinica': clinica,
+            'medico': medico, 'pacientes': pacientes, 'data_hora': data_hora,
+        }
+
+    def remover_fixture(self, fixture):
+        Consulta.objects.filter(medico=fixture['medico']).delete()
+        User.objects.filter(pk__in=[p.pk for p in fixture['pacientes']]).delete()
+        fixture['medico'].delete()
+        fixture['clinica'].delete()
+        fixture['tipo'].delete()
+        fixture['cidade'].delete()
+        fixture['estado'].delete()
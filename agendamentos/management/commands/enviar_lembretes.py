@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from agendamentos.lembretes import TAMANHO_LOTE, agendar_lembretes
+from notificacoes import outbox
+
+
+class Command(BaseCommand):
+    help = (
+        'Enfileira lembretes por e-mail das consultas que entraram na janela de '
+        'SystemSettings.reminder_hours_before. Pode rodar em vários processos ao mesmo tempo; '
+        'a entrega fica com o comando enviar_emails, ou com este mesmo comando quando '
+        'NOTIFICACOES_ENVIO_IMEDIATO está ligado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Consultas por transação.')
+        parser.add_argument('--continuo', action='store_true', help='Repete a varredura a cada --intervalo.')
+        parser.add_argument('--intervalo', type=float, default=60.0, help='Segundos entre varreduras.')
+
+    def handle(self, *args, **options):
+        while True:
+            total = agendar_lembretes(tamanho_lote=options['lote'])
+            if total or not options['continuo']:
+                self.stdout.write(f'{total} lembretes enfileirados.')
+            if total and settings.NOTIFICACOES_ENVIO_IMEDIATO:
+                # Sem o worker de e-mails, o próprio comando entrega o que enfileirou
+                enviados, falhas = outbox.esvaziar()
+                self.stdout.write(f'{enviados} e-mails enviados, {falhas} com falha.')
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamentos.exportacao import FORMATOS, TAMANHO_LOTE, exportar, intervalo_do_mes
+from agendamentos.models import Consulta
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta consultas com pagamento, paciente e médico em CSV ou NDJSON, '
+        'lendo o banco em lotes (memória constante).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--mes', help='Mês no formato AAAA-MM (padrão: todas as consultas).')
+        parser.add_argument('--clinica', type=int, action='append', help='Limita a uma clínica (id).')
+        parser.add_argument('--saida', help='Arquivo de destino (padrão: saída padrão).')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas lidas do banco por vez.')
+
+    def handle(self, *args, **options):
+        consultas = Consulta.objects.all()
+        if options['clinica']:
+            consultas = consultas.filter(clinica_id__in=options['clinica'])
+        if options['mes']:
+            try:
+                inicio, fim = intervalo_do_mes(options['mes'])
+            except ValueError:
+                raise CommandError("--mes deve estar no formato AAAA-MM.")
+            consultas = consultas.filter(data_hora__gte=inicio, data_hora__lt=fim)
+
+        partes = exportar(consultas, options['formato'], options['lote'])
+        if options['saida']:
+            with open(options['saida'], 'wb') as arquivo:
+                for parte in partes:
+                    arquivo.write(parte)
+            self.stderr.write(self.style.SUCCESS(f"Exportação gravada em {options['saida']}."))
+        else:
+            saida = getattr(self.stdout._out, 'buffer', None)
+            for parte in partes:
+                if saida is not None:
+                    saida.write(parte)
+                else:
+                    self.stdout.write(parte.decode('utf-8'), ending='')
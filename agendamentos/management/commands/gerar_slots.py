@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from agendamentos.disponibilidade import HORIZONTE_DIAS, gerar_slots
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera a grade de horários (SlotAgenda) a partir das jornadas de trabalho. '
+        'Deve ser executado diariamente para manter o horizonte de disponibilidade.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=HORIZONTE_DIAS, help='Quantos dias à frente gerar.')
+        parser.add_argument('--medico', type=int, action='append', help='Limita a geração a um médico (id do User).')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.HTTP_INFO(f"Gerando horários para os próximos {options['dias']} dias..."))
+        total = gerar_slots(medico_ids=options['medico'], dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{total} horários processados.'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from agendamentos.financeiro import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os resumos financeiros diários (por clínica e médico) a partir dos pagamentos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinica', type=int, help='Recalcula apenas uma clínica.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.HTTP_INFO('Recalculando resumos financeiros...'))
+        recalcular(clinica_id=options['clinica'])
+        self.stdout.write(self.style.SUCCESS('Resumos financeiros recalculados com sucesso!'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0003_initial'),
+        ('clinicas', '0002_initial'),
+        ('pacientes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['medico', 'data_hora', 'id'], name='consulta_medico_agenda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['clinica', 'data_hora', 'id'], name='consulta_clinica_agenda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(fields=['paciente', 'data_hora', 'id'], name='consulta_paciente_hist_idx'),
+        ),
+    ]
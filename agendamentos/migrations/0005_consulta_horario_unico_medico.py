@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+CANCELADA = 'CANCELADA'
+
+
+def cancelar_horarios_duplicados(apps, schema_editor):
+    """
+    A restrição abaixo falharia se já houvesse duas consultas ativas do mesmo
+    médico no mesmo horário. Em cada grupo a consulta mais antiga (menor id)
+    é mantida e as demais são canceladas, com registro no histórico de status.
+    """
+    Consulta = apps.get_model('agendamentos', 'Consulta')
+    ConsultaStatusLog = apps.get_model('agendamentos', 'ConsultaStatusLog')
+    ativas = Consulta.objects.exclude(status_atual=CANCELADA)
+    grupos = (
+        ativas.values('medico_id', 'data_hora')
+        .annotate(quantidade=Count('pk'))
+        .filter(quantidade__gt=1)
+        .order_by()
+    )
+    canceladas = []
+    for grupo in grupos:
+        ids = list(
+            ativas.filter(medico_id=grupo['medico_id'], data_hora=grupo['data_hora'])
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        canceladas.extend(ids[1:])
+    if not canceladas:
+        return
+
+    Consulta.objects.filter(pk__in=canceladas).update(status_atual=CANCELADA, data_atualizacao=timezone.now())
+    ConsultaStatusLog.objects.bulk_create(
+        [ConsultaStatusLog(consulta_id=pk, status_novo=CANCELADA) for pk in canceladas], batch_size=1000
+    )
+    print(
+        f'\n  {len(canceladas)} consulta(s) em horário duplicado do mesmo médico foram canceladas '
+        f'(mantida a mais antiga de cada horário): ids {sorted(canceladas)}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0004_consulta_keyset_indexes'),
+        ('clinicas', '0002_initial'),
+        ('pacientes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(cancelar_horarios_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='consulta',
+            constraint=models.UniqueConstraint(condition=models.Q(('status_atual', 'CANCELADA'), _negated=True), fields=('medico', 'data_hora'), name='consulta_horario_unico_medico'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0005_consulta_horario_unico_medico'),
+        ('clinicas', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BloqueioAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField(verbose_name='Início')),
+                ('fim', models.DateTimeField(verbose_name='Fim')),
+                ('motivo', models.CharField(blank=True, max_length=255, verbose_name='Motivo')),
+                ('clinica', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bloqueios_agenda', to='clinicas.clinica', verbose_name='Clínica')),
+                ('medico', models.ForeignKey(blank=True, limit_choices_to={'user_type': 'MEDICO'}, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bloqueios_agenda', to=settings.AUTH_USER_MODEL, verbose_name='Médico')),
+            ],
+            options={
+                'verbose_name': 'Bloqueio de Agenda',
+                'verbose_name_plural': 'Bloqueios de Agenda',
+                'ordering': ['inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='JornadaTrabalho',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Segunda-feira'), (1, 'Terça-feira'), (2, 'Quarta-feira'), (3, 'Quinta-feira'), (4, 'Sexta-feira'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Dia da Semana')),
+                ('hora_inicio', models.TimeField(verbose_name='Início do Atendimento')),
+                ('hora_fim', models.TimeField(verbose_name='Fim do Atendimento')),
+                ('duracao_consulta', models.PositiveSmallIntegerField(default=30, verbose_name='Duração da Consulta (minutos)')),
+                ('clinica', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jornadas', to='clinicas.clinica', verbose_name='Clínica')),
+                ('medico', models.ForeignKey(limit_choices_to={'user_type': 'MEDICO'}, on_delete=django.db.models.deletion.CASCADE, related_name='jornadas', to=settings.AUTH_USER_MODEL, verbose_name='Médico')),
+            ],
+            options={
+                'verbose_name': 'Jornada de Trabalho',
+                'verbose_name_plural': 'Jornadas de Trabalho',
+                'ordering': ['medico', 'dia_semana', 'hora_inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotAgenda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateTimeField(verbose_name='Início')),
+                ('fim', models.DateTimeField(verbose_name='Fim')),
+                ('bloqueado', models.BooleanField(default=False, verbose_name='Bloqueado')),
+                ('clinica', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots_agenda', to='clinicas.clinica', verbose_name='Clínica')),
+                ('consulta', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='slots', to='agendamentos.consulta', verbose_name='Consulta')),
+                ('medico', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots_agenda', to=settings.AUTH_USER_MODEL, verbose_name='Médico')),
+            ],
+            options={
+                'verbose_name': 'Horário da Agenda',
+                'verbose_name_plural': 'Horários da Agenda',
+                'ordering': ['inicio'],
+                'indexes': [models.Index(condition=models.Q(('bloqueado', False), ('consulta__isnull', True)), fields=['medico', 'inicio'], name='slot_livre_medico_idx'), models.Index(condition=models.Q(('bloqueado', False), ('consulta__isnull', True)), fields=['inicio'], name='slot_livre_inicio_idx')],
+                'constraints': [models.UniqueConstraint(fields=('medico', 'inicio'), name='slot_unico_medico_inicio')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0006_disponibilidade'),
+        ('clinicas', '0003_cidade_nome_normalizado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoFinanceiroDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('valor_faturado', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Faturado')),
+                ('valor_recebido', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor Recebido')),
+                ('pagamentos_pendentes', models.IntegerField(default=0)),
+                ('pagamentos_pagos', models.IntegerField(default=0)),
+                ('clinica', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_financeiros', to='clinicas.clinica', verbose_name='Clínica')),
+                ('medico', models.ForeignKey(limit_choices_to={'user_type': 'MEDICO'}, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_financeiros', to=settings.AUTH_USER_MODEL, verbose_name='Médico')),
+            ],
+            options={
+                'verbose_name': 'Resumo Financeiro Diário',
+                'verbose_name_plural': 'Resumos Financeiros Diários',
+                'indexes': [models.Index(fields=['clinica', 'dia'], name='resumo_financeiro_clinica_idx'), models.Index(fields=['medico', 'dia'], name='resumo_financeiro_medico_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'clinica', 'medico'), name='resumo_financeiro_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0007_resumo_financeiro_diario'),
+        ('clinicas', '0003_cidade_nome_normalizado'),
+        ('pacientes', '0002_paciente_telefone_busca_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consulta',
+            name='lembrete_enviado_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Lembrete Enviado em'),
+        ),
+        migrations.AddIndex(
+            model_name='consulta',
+            index=models.Index(condition=models.Q(('lembrete_enviado_em__isnull', True), ('status_atual__in', ('PENDENTE', 'CONFIRMADA'))), fields=['data_hora', 'id'], name='consulta_lembrete_pendente_idx'),
+        ),
+    ]
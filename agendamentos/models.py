@@ -4,7 +4,8 @@ from users.models import User
 from pacientes.models import Paciente
 from clinicas.models import Clinica # Importa o modelo Clinica
 from .consts import (
-    STATUS_CONSULTA_CHOICES, STATUS_CONSULTA_PENDENTE,
+    STATUS_CONSULTA_CHOICES, STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CANCELADA,
+    STATUS_CONSULTA_LEMBRETE,
     STATUS_PAGAMENTO_CHOICES, STATUS_PAGAMENTO_PENDENTE,
 )
 
@@ -63,11 +64,38 @@ class Consulta(models.Model):
         auto_now=True,
         verbose_name=_('Data de Atualização')
     )
+    # Marca d'água do lembrete: preenchida quando o lembrete é enfileirado
+    # e zerada se a consulta for remarcada (ver agendamentos.lembretes)
+    lembrete_enviado_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Lembrete Enviado em')
+    )
     
     class Meta:
         verbose_name = _("Consulta")
         verbose_name_plural = _("Consultas")
         ordering = ['data_hora']
+        # Índices das chaves de paginação por cursor (data_hora, id) em cada escopo
+        indexes = [
+            models.Index(fields=['medico', 'data_hora', 'id'], name='consulta_medico_agenda_idx'),
+            models.Index(fields=['clinica', 'data_hora', 'id'], name='consulta_clinica_agenda_idx'),
+            models.Index(fields=['paciente', 'data_hora', 'id'], name='consulta_paciente_hist_idx'),
+            # Só as consultas que ainda aguardam lembrete: a janela vira um range scan
+            models.Index(
+                fields=['data_hora', 'id'], name='consulta_lembrete_pendente_idx',
+                condition=models.Q(lembrete_enviado_em__isnull=True, status_atual__in=STATUS_CONSULTA_LEMBRETE),
+            ),
+        ]
+        # O banco garante que um médico não tenha duas consultas ativas no mesmo horário
+        constraints = [
+            models.UniqueConstraint(
+                fields=['medico', 'data_hora'],
+                condition=~models.Q(status_atual=STATUS_CONSULTA_CANCELADA),
+                name='consulta_horario_unico_medico',
+            ),
+        ]
         
     def __str__(self):
         return f"Consulta de {self.paciente.nome_completo} em {self.data_hora}"
@@ -178,4 +206,191 @@ class AnotacaoConsulta(models.Model):
         verbose_name_plural = _("Anotações de Consulta")
 
     def __str__(self):
-        return f"Anotação para a Consulta ID {self.consulta.id}"
\ No newline at end of file
+        return f"Anotação para a Consulta ID {self.consulta.id}"
+
+class JornadaTrabalho(models.Model):
+    """
+    Horário de atendimento semanal de um médico numa clínica.
+    É a base para gerar a grade de horários (SlotAgenda) de cada dia.
+    """
+    class DiaSemana(models.IntegerChoices):
+        SEGUNDA = 0, _('Segunda-feira')
+        TERCA = 1, _('Terça-feira')
+        QUARTA = 2, _('Quarta-feira')
+        QUINTA = 3, _('Quinta-feira')
+        SEXTA = 4, _('Sexta-feira')
+        SABADO = 5, _('Sábado')
+        DOMINGO = 6, _('Domingo')
+
+    medico = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        limit_choices_to={'user_type': 'MEDICO'},
+        related_name='jornadas',
+        verbose_name=_('Médico')
+    )
+    clinica = models.ForeignKey(
+        Clinica,
+        on_delete=models.CASCADE,
+        related_name='jornadas',
+        verbose_name=_('Clínica')
+    )
+    dia_semana = models.PositiveSmallIntegerField(choices=DiaSemana.choices, verbose_name=_('Dia da Semana'))
+    hora_inicio = models.TimeField(verbose_name=_('Início do Atendimento'))
+    hora_fim = models.TimeField(verbose_name=_('Fim do Atendimento'))
+    duracao_consulta = models.PositiveSmallIntegerField(
+        default=30,
+        verbose_name=_('Duração da Consulta (minutos)')
+    )
+
+    class Meta:
+        verbose_name = _("Jornada de Trabalho")
+        verbose_name_plural = _("Jornadas de Trabalho")
+        ordering = ['medico', 'dia_semana', 'hora_inicio']
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if self.hora_inicio >= self.hora_fim:
+            raise ValidationError({'hora_fim': _('O fim do atendimento deve ser depois do início.')})
+        if not self.duracao_consulta:
+            raise ValidationError({'duracao_consulta': _('Informe a duração da consulta.')})
+
+    def __str__(self):
+        return f"{self.medico} - {self.get_dia_semana_display()} {self.hora_inicio:%H:%M}-{self.hora_fim:%H:%M}"
+
+
+class BloqueioAgenda(models.Model):
+    """
+    Período em que não há atendimento (férias, feriado, reunião).
+    Sem médico, o bloqueio vale para todos os médicos da clínica.
+    """
+    medico = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        limit_choices_to={'user_type': 'MEDICO'},
+        related_name='bloqueios_agenda',
+        verbose_name=_('Médico')
+    )
+    clinica = models.ForeignKey(
+        Clinica,
+        on_delete=models.CASCADE,
+        null=True, blank=True,
+        related_name='bloqueios_agenda',
+        verbose_name=_('Clínica')
+    )
+    inicio = models.DateTimeField(verbose_name=_('Início'))
+    fim = models.DateTimeField(verbose_name=_('Fim'))
+    motivo = models.CharField(max_length=255, blank=True, verbose_name=_('Motivo'))
+
+    class Meta:
+        verbose_name = _("Bloqueio de Agenda")
+        verbose_name_plural = _("Bloqueios de Agenda")
+        ordering = ['inicio']
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+        if not self.medico_id and not self.clinica_id:
+            raise ValidationError(_('Informe o médico ou a clínica do bloqueio.'))
+        if self.inicio >= self.fim:
+            raise ValidationError({'fim': _('O fim do bloqueio deve ser depois do início.')})
+
+    def __str__(self):
+        alvo = self.medico or self.clinica
+        return f"Bloqueio de {alvo}: {self.inicio:%d/%m/%Y %H:%M} - {self.fim:%d/%m/%Y %H:%M}"
+
+
+class SlotAgenda(models.Model):
+    """
+    Grade materializada de horários de atendimento, gerada a partir das
+    jornadas. Um slot está livre quando não tem consulta nem bloqueio, e os
+    índices parciais sobre os slots livres permitem buscar os próximos
+    horários disponíveis sem carregar a agenda de cada médico.
+    """
+    medico = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='slots_agenda',
+        verbose_name=_('Médico')
+    )
+    clinica = models.ForeignKey(
+        Clinica,
+        on_delete=models.CASCADE,
+        related_name='slots_agenda',
+        verbose_name=_('Clínica')
+    )
+    inicio = models.DateTimeField(verbose_name=_('Início'))
+    fim = models.DateTimeField(verbose_name=_('Fim'))
+    consulta = models.ForeignKey(
+        Consulta,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='slots',
+        verbose_name=_('Consulta')
+    )
+    bloqueado = models.BooleanField(default=False, verbose_name=_('Bloqueado'))
+
+    class Meta:
+        verbose_name = _("Horário da Agenda")
+        verbose_name_plural = _("Horários da Agenda")
+        ordering = ['inicio']
+        constraints = [
+            models.UniqueConstraint(fields=['medico', 'inicio'], name='slot_unico_medico_inicio'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['medico', 'inicio'], name='slot_livre_medico_idx',
+                condition=models.Q(consulta__isnull=True, bloqueado=False),
+            ),
+            models.Index(
+                fields=['inicio'], name='slot_livre_inicio_idx',
+                condition=models.Q(consulta__isnull=True, bloqueado=False),
+            ),
+        ]
+
+    @property
+    def livre(self):
+        return self.consulta_id is None and not self.bloqueado
+
+    def __str__(self):
+        return f"{self.medico} - {self.inicio:%d/%m/%Y %H:%M}"
+
+
+class ResumoFinanceiroDiario(models.Model):
+    """
+    Totais dos pagamentos por dia da consulta, clínica e médico, mantidos
+    de forma incremental (ver agendamentos.financeiro). Os relatórios
+    somam estas linhas em vez de varrer a tabela de pagamentos.
+    """
+    dia = models.DateField(_("Dia"))
+    clinica = models.ForeignKey(
+        Clinica,
+        on_delete=models.CASCADE,
+        related_name='resumos_financeiros',
+        verbose_name=_('Clínica')
+    )
+    medico = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='resumos_financeiros',
+        limit_choices_to={'user_type': 'MEDICO'},
+        verbose_name=_('Médico')
+    )
+    valor_faturado = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_('Valor Faturado'))
+    valor_recebido = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name=_('Valor Recebido'))
+    pagamentos_pendentes = models.IntegerField(default=0)
+    pagamentos_pagos = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Resumo Financeiro Diário")
+        verbose_name_plural = _("Resumos Financeiros Diários")
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'clinica', 'medico'], name='resumo_financeiro_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['clinica', 'dia'], name='resumo_financeiro_clinica_idx'),
+            models.Index(fields=['medico', 'dia'], name='resumo_financeiro_medico_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.clinica} - {self.medico} - {self.dia:%d/%m/%Y}: {self.valor_recebido}"
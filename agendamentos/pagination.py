@@ -0,0 +1,168 @@
+# agendamentos/pagination.py
+
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) sobre uma chave ordenada e única.
+
+    Em vez de OFFSET, cada página filtra a partir da última linha da anterior
+    (ex.: `(data_hora, id) > (ultima_data_hora, ultimo_id)`), então a página N
+    custa o mesmo que a primeira desde que exista um índice sobre a chave.
+    Todos os campos de `ordering` devem ter a mesma direção.
+    """
+    ordering = ('data_hora', 'id')
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.descendente = self.ordering[0].startswith('-')
+        self.campos = [campo.lstrip('-') for campo in self.ordering]
+
+        posicao = self.decode_cursor(request)
+        if posicao is not None:
+            try:
+                queryset = queryset.filter(self.filtro_apos(posicao))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        resultados = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        self.has_next = len(resultados) > self.page_size
+        self.page = resultados[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def filtro_apos(self, posicao):
+        """
+        Expande a comparação de tuplas `(a, b) > (x, y)` em
+        `a > x OR (a = x AND b > y)`, que o planner resolve com o índice.
+        """
+        operador = 'lt' if self.descendente else 'gt'
+        filtro = Q()
+        for indice, campo in enumerate(self.campos):
+            condicao = {c: v for c, v in zip(self.campos[:indice], posicao[:indice])}
+            condicao[f'{campo}__{operador}'] = posicao[indice]
+            filtro |= Q(**condicao)
+        return filtro
+
+    def valores_da_linha(self, obj):
+        valores = []
+        for campo in self.campos:
+            valor = obj
+            for parte in campo.split('__'):
+                valor = getattr(valor, parte)
+            valores.append(valor.isoformat() if isinstance(valor, datetime) else valor)
+        return valores
+
+    def encode_cursor(self, obj):
+        conteudo = json.dumps(self.valores_da_linha(obj), default=str)
+        return base64.urlsafe_b64encode(conteudo.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            posicao = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        if not isinstance(posicao, list) or len(posicao) != len(self.campos):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        return posicao
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ConsultaKeysetPagination(KeysetPagination):
+    """ Agenda em ordem cronológica, chaveada em `(data_hora, id)`. """
+    ordering = ('data_hora', 'id')
+
+
+class HistoricoKeysetPagination(KeysetPagination):
+    """ Histórico do mais recente para o mais antigo. """
+    ordering = ('-data_hora', '-id')
+
+
+def interpretar_limite(valor, nome):
+    """
+    Aceita uma data (`2025-10-01`) ou data/hora ISO 8601.
+    Retorna `(data_hora, somente_data)`.
+    """
+    try:
+        data = parse_date(valor)
+        data_hora = None if data else parse_datetime(valor)
+    except ValueError:
+        data, data_hora = None, None
+    if data is None and data_hora is None:
+        raise ValidationError({nome: "Use o formato AAAA-MM-DD ou data/hora ISO 8601."})
+    if data is not None:
+        data_hora = datetime.combine(data, time.min)
+    if timezone.is_naive(data_hora):
+        data_hora = timezone.make_aware(data_hora)
+    return data_hora, data is not None
+
+
+def filtrar_janela_de_datas(queryset, request, campo='data_hora'):
+    """
+    Restringe o queryset aos parâmetros `from`/`to` da query string.
+    `from` é inclusivo e `to` é exclusivo (ou inclui o dia inteiro, se for só
+    uma data), sempre como intervalo sobre a coluna para aproveitar o índice.
+    """
+    inicio = request.query_params.get('from')
+    fim = request.query_params.get('to')
+    if inicio:
+        inicio, _ = interpretar_limite(inicio, 'from')
+        queryset = queryset.filter(**{f'{campo}__gte': inicio})
+    if fim:
+        fim, somente_data = interpretar_limite(fim, 'to')
+        if somente_data:
+            fim += timedelta(days=1)
+        queryset = queryset.filter(**{f'{campo}__lt': fim})
+    return queryset
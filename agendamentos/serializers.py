@@ -1,10 +1,10 @@
 # agendamentos/serializers.py
 
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Consulta, Pagamento, AnotacaoConsulta 
+from .models import Consulta, Pagamento, AnotacaoConsulta, ConsultaStatusLog, SlotAgenda
 from users.models import User
 from pacientes.models import Paciente
-from clinicas.models import Clinica
 from medicos.models import Medico
 
 class PagamentoSerializer(serializers.ModelSerializer):
@@ -27,6 +27,78 @@ class ConsultaSerializer(serializers.ModelSerializer):
             'anotacao_conteudo'
         ]
         read_only_fields = ['pagamento']
+        # O conflito de horário é verificado sob lock em agendamentos.services
+        # (e garantido pela constraint do banco), não pelo validator automático.
+        validators = []
+
+    # Campos aninhados, pedidos com ?expand=<nome>, e as relações que cada um
+    # lê. Todas são FK ou OneToOne, então cabem num único JOIN: a listagem
+    # custa uma query independentemente do número de linhas.
+    EXPANSOES = {
+        'paciente': ('paciente_detalhes', ('paciente__user',)),
+        'medico': ('medico_detalhes', ('medico__perfil_medico',)),
+        'clinica': ('clinica_detalhes', ('clinica',)),
+        'pagamento': ('pagamento', ('pagamento',)),
+        'anotacao': ('anotacao_conteudo', ('anotacao',)),
+    }
+    RELACOES_SELECIONADAS = tuple(
+        relacao for _, relacoes in EXPANSOES.values() for relacao in relacoes
+    )
+
+    def __init__(self, *args, campos=None, **kwargs):
+        """ `campos` restringe a representação (ver campos_da_requisicao). """
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nome in set(self.fields) - set(campos):
+                self.fields.pop(nome)
+
+    @classmethod
+    def campos_da_requisicao(cls, request):
+        """
+        Lê `?fields=` (campos da consulta) e `?expand=` (campos aninhados) da
+        requisição. Sem nenhum dos dois devolve None, ou seja, a representação
+        completa de sempre. Com `?fields=` e sem `?expand=`, nada aninhado é
+        incluído a não ser que o próprio campo seja pedido pelo nome.
+        Levanta ValueError com nomes desconhecidos.
+        """
+        def lista(parametro):
+            valor = request.query_params.get(parametro)
+            if valor is None:
+                return None
+            return [nome.strip() for nome in valor.split(',') if nome.strip()]
+
+        fields, expand = lista('fields'), lista('expand')
+        if fields is None and expand is None:
+            return None
+
+        aninhados = {campo for campo, _ in cls.EXPANSOES.values()}
+        if fields is None:
+            fields = [nome for nome in cls.Meta.fields if nome not in aninhados]
+        desconhecidos = [nome for nome in fields if nome not in cls.Meta.fields]
+        desconhecidos += [nome for nome in expand or () if nome not in cls.EXPANSOES]
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos: {', '.join(desconhecidos)}.")
+        return set(fields) | {cls.EXPANSOES[nome][0] for nome in expand or ()}
+
+    @classmethod
+    def relacoes_para(cls, campos=None):
+        """ Relações a carregar para serializar `campos` (None: todas). """
+        if campos is None:
+            return cls.RELACOES_SELECIONADAS
+        return tuple(
+            relacao for campo, relacoes in cls.EXPANSOES.values() if campo in campos for relacao in relacoes
+        )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, campos=None):
+        """
+        Aplica ao queryset os JOINs de que o serializer precisa para `campos`;
+        relações de campos não pedidos não são consultadas.
+        As views devem sempre passar o queryset por aqui antes de serializar.
+        """
+        relacoes = cls.relacoes_para(campos)
+        # select_related() sem argumentos seguiria todas as FKs
+        return queryset.select_related(*relacoes) if relacoes else queryset
 
     # --- MÉTODO CORRIGIDO (ADICIONADO) ---
     def get_paciente_detalhes(self, obj):
@@ -75,18 +147,92 @@ class ConsultaSerializer(serializers.ModelSerializer):
         return None
 
     def get_clinica_detalhes(self, obj):
-        try:
-            clinica = Clinica.objects.get(id=obj.clinica.id)
+        # Usa a clínica já carregada pelo select_related em vez de uma nova query
+        clinica = obj.clinica
+        if clinica:
             return {
                 'id': clinica.id,
                 'nome_fantasia': clinica.nome_fantasia,
                 'cnpj': clinica.cnpj,
             }
-        except Clinica.DoesNotExist:
+        return None
+
+class EventoStatusSerializer(serializers.ModelSerializer):
+    """ Uma mudança de status na linha do tempo da consulta. """
+    pessoa_nome = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ConsultaStatusLog
+        fields = ['status_novo', 'data_modificacao', 'pessoa', 'pessoa_nome']
+
+    def get_pessoa_nome(self, obj):
+        return obj.pessoa.get_full_name() if obj.pessoa else None
+
+
+class ConsultaTimelineSerializer(serializers.ModelSerializer):
+    """
+    Consulta na linha do tempo do paciente: anotação, pagamento e os
+    eventos de status juntos. Use setup_eager_loading: cada página custa
+    uma query com JOINs mais uma para os eventos de todas as consultas.
+    """
+    clinica_nome = serializers.CharField(source='clinica.nome_fantasia', read_only=True)
+    medico_nome = serializers.CharField(source='medico.get_full_name', read_only=True)
+    pagamento = PagamentoSerializer(read_only=True)
+    anotacao = serializers.SerializerMethodField()
+    eventos = EventoStatusSerializer(source='historico_status', many=True, read_only=True)
+
+    class Meta:
+        model = Consulta
+        fields = [
+            'id', 'data_hora', 'status_atual', 'valor', 'clinica', 'clinica_nome',
+            'medico', 'medico_nome', 'pagamento', 'anotacao', 'eventos',
+        ]
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        eventos = ConsultaStatusLog.objects.select_related('pessoa').order_by('data_modificacao', 'id')
+        return queryset.select_related('clinica', 'medico', 'pagamento', 'anotacao').prefetch_related(
+            Prefetch('historico_status', queryset=eventos)
+        )
+
+    def get_anotacao(self, obj):
+        try:
+            anotacao = obj.anotacao
+        except AnotacaoConsulta.DoesNotExist:
             return None
+        return {'conteudo': anotacao.conteudo, 'data_atualizacao': anotacao.data_atualizacao}
+
+
+class ConsultaLoteItemSerializer(serializers.Serializer):
+    """
+    Item do agendamento em lote. As relações chegam como ids e são
+    resolvidas em conjunto pelo serviço, em vez de uma query por item.
+    """
+    paciente = serializers.IntegerField()
+    medico = serializers.IntegerField()
+    clinica = serializers.IntegerField()
+    data_hora = serializers.DateTimeField()
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2)
+
 
 class AnotacaoConsultaSerializer(serializers.ModelSerializer):
     class Meta:
         model = AnotacaoConsulta
         fields = ['consulta', 'conteudo', 'data_atualizacao']
-        read_only_fields = ['consulta', 'data_atualizacao']
\ No newline at end of file
+        read_only_fields = ['consulta', 'data_atualizacao']
+
+class SlotDisponivelSerializer(serializers.ModelSerializer):
+    """ Horário livre na agenda, com os dados mínimos para o agendamento. """
+    medico_nome = serializers.CharField(source='medico.get_full_name', read_only=True)
+    especialidade = serializers.SerializerMethodField()
+    clinica_nome = serializers.CharField(source='clinica.nome_fantasia', read_only=True)
+
+    class Meta:
+        model = SlotAgenda
+        fields = ['medico', 'medico_nome', 'especialidade', 'clinica', 'clinica_nome', 'inicio', 'fim']
+
+    def get_especialidade(self, obj):
+        try:
+            return obj.medico.perfil_medico.get_especialidade_display()
+        except Medico.DoesNotExist:
+            return None
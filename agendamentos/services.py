@@ -0,0 +1,266 @@
+# agendamentos/services.py
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from administrador.auditoria import registrar as registrar_auditoria
+from clinicas.models import Clinica
+from medicos.models import Medico
+from pacientes.models import Paciente
+from secretarias.contadores import registrar_consultas_criadas, registrar_mudancas_de_status
+from users.models import User
+from .models import Consulta, Pagamento, ConsultaStatusLog
+from .disponibilidade import sincronizar_slots
+from .financeiro import registrar_pagamentos_criados
+from .consts import STATUS_CONSULTA_CANCELADA, STATUS_PAGAMENTO_PENDENTE, TRANSICOES_STATUS_CONSULTA
+
+
+class HorarioIndisponivel(Exception):
+    """ O médico já tem uma consulta ativa neste horário. """
+
+
+class TransicaoInvalida(Exception):
+    """ A consulta não pode passar do status atual para o status pedido. """
+
+    def __init__(self, status_atual, status_novo):
+        self.status_atual = status_atual
+        self.status_novo = status_novo
+        super().__init__(f"Não é possível mudar o status de {status_atual} para {status_novo}.")
+
+
+# Namespace dos advisory locks do PostgreSQL usados para a agenda dos médicos
+LOCK_NAMESPACE_AGENDA = 7301
+
+
+def bloquear_agenda_do_medico(medico_id):
+    """
+    Serializa as reservas de um mesmo médico até o fim da transação corrente.
+    Deve ser chamada dentro de `transaction.atomic()`.
+    """
+    bloquear_agendas_dos_medicos([medico_id])
+
+
+def bloquear_agendas_dos_medicos(medico_ids):
+    """
+    Trava a agenda de vários médicos, sempre em ordem crescente de id para
+    que dois lotes concorrentes não entrem em deadlock. No PostgreSQL usa
+    advisory locks transacionais (não trava nenhuma linha); nos demais bancos
+    trava os perfis dos médicos com SELECT ... FOR UPDATE.
+    """
+    medico_ids = sorted(set(medico_ids))
+    if not medico_ids:
+        return
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, m.id) '
+                'FROM (SELECT unnest(%s::integer[]) AS id ORDER BY 1) AS m',
+                [LOCK_NAMESPACE_AGENDA, medico_ids]
+            )
+    else:
+        list(
+            Medico.objects.select_for_update().filter(user_id__in=medico_ids)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+
+
+def consultas_ativas_no_horario(medico_id, data_hora):
+    """ Consultas que ocupam o horário (as canceladas liberam a vaga). """
+    return Consulta.objects.filter(medico_id=medico_id, data_hora=data_hora).exclude(
+        status_atual=STATUS_CONSULTA_CANCELADA
+    )
+
+
+def agendar_consulta(dados, pessoa):
+    """
+    Cria a consulta com o seu pagamento pendente e o primeiro log de status.
+
+    A verificação de conflito corre sob o lock da agenda do médico e a
+    constraint `consulta_horario_unico_medico` é a garantia final: se duas
+    reservas passarem ao mesmo tempo, a segunda falha com HorarioIndisponivel.
+    """
+    medico = dados['medico']
+    with transaction.atomic():
+        bloquear_agenda_do_medico(medico.pk)
+        if consultas_ativas_no_horario(medico.pk, dados['data_hora']).exists():
+            raise HorarioIndisponivel()
+        try:
+            with transaction.atomic():
+                consulta = Consulta.objects.create(**dados)
+        except IntegrityError:
+            raise HorarioIndisponivel()
+
+        Pagamento.objects.create(
+            consulta=consulta,
+            status=STATUS_PAGAMENTO_PENDENTE,
+            valor_pago=consulta.valor,
+        )
+        registrar_auditoria(ConsultaStatusLog(
+            consulta=consulta,
+            status_novo=consulta.status_atual,
+            pessoa=pessoa
+        ))
+    return consulta
+
+
+def agendar_consultas_em_lote(itens, pessoa):
+    """
+    Agenda várias consultas de uma vez com um número fixo de queries.
+
+    `itens` é uma lista de `(indice, dados)` já validados, com `paciente`,
+    `medico` e `clinica` como ids. Referências inexistentes e conflitos de
+    horário (com a agenda ou dentro do próprio lote) são rejeitados por item;
+    os demais são gravados com bulk inserts numa única transação.
+    Retorna `(criadas, erros)`, onde `criadas` é uma lista de
+    `(indice, consulta)` e `erros` um dicionário `{indice: mensagem}`.
+    """
+    erros = {}
+    pacientes = set(Paciente.objects.filter(
+        pk__in={dados['paciente'] for _, dados in itens}
+    ).values_list('pk', flat=True))
+    medicos = set(User.objects.filter(
+        pk__in={dados['medico'] for _, dados in itens}, user_type=User.UserType.MEDICO
+    ).values_list('pk', flat=True))
+    clinicas = set(Clinica.objects.filter(
+        pk__in={dados['clinica'] for _, dados in itens}
+    ).values_list('pk', flat=True))
+
+    candidatos = []
+    for indice, dados in itens:
+        if dados['paciente'] not in pacientes:
+            erros[indice] = "Paciente não encontrado."
+        elif dados['medico'] not in medicos:
+            erros[indice] = "Médico não encontrado."
+        elif dados['clinica'] not in clinicas:
+            erros[indice] = "Clínica não encontrada."
+        else:
+            candidatos.append((indice, dados))
+
+    with transaction.atomic():
+        bloquear_agendas_dos_medicos(dados['medico'] for _, dados in candidatos)
+
+        # Uma única query traz todos os horários já ocupados dos médicos do lote
+        ocupados = set(
+            Consulta.objects.filter(
+                medico_id__in={dados['medico'] for _, dados in candidatos},
+                data_hora__in={dados['data_hora'] for _, dados in candidatos},
+            ).exclude(status_atual=STATUS_CONSULTA_CANCELADA).values_list('medico_id', 'data_hora')
+        )
+
+        novos = []
+        for indice, dados in candidatos:
+            chave = (dados['medico'], dados['data_hora'])
+            if chave in ocupados:
+                erros[indice] = "Médico já tem uma consulta agendada para este horário."
+                continue
+            ocupados.add(chave)
+            novos.append((indice, Consulta(
+                paciente_id=dados['paciente'],
+                medico_id=dados['medico'],
+                clinica_id=dados['clinica'],
+                data_hora=dados['data_hora'],
+                valor=dados['valor'],
+            )))
+
+        consultas = Consulta.objects.bulk_create([consulta for _, consulta in novos])
+        pagamentos = Pagamento.objects.bulk_create([
+            Pagamento(consulta=consulta, status=STATUS_PAGAMENTO_PENDENTE, valor_pago=consulta.valor)
+            for consulta in consultas
+        ])
+        ConsultaStatusLog.objects.bulk_create([
+            ConsultaStatusLog(consulta=consulta, status_novo=consulta.status_atual, pessoa=pessoa)
+            for consulta in consultas
+        ])
+        # bulk_create não dispara post_save: atualiza a grade, os contadores e o financeiro de uma vez
+        sincronizar_slots(consultas)
+        registrar_consultas_criadas(consultas)
+        registrar_pagamentos_criados(pagamentos)
+    return novos, erros
+
+
+def status_valido(status_novo):
+    return status_novo in TRANSICOES_STATUS_CONSULTA
+
+
+def transicao_permitida(status_atual, status_novo):
+    return status_novo in TRANSICOES_STATUS_CONSULTA.get(status_atual, ())
+
+
+def _texto_do_log(status_novo, descricao):
+    # status_novo do log tem no máximo 50 caracteres
+    return (descricao or status_novo)[:ConsultaStatusLog._meta.get_field('status_novo').max_length]
+
+
+def mudar_status(consulta, status_novo, pessoa, descricao=None):
+    """
+    Aplica uma transição de status a uma consulta e grava o log.
+    `descricao` substitui o texto do log (ex.: status com o motivo).
+    Retorna False se a consulta já estava no status pedido; levanta
+    TransicaoInvalida se a tabela de transições não permitir a mudança.
+    """
+    if consulta.status_atual == status_novo:
+        return False
+    if not transicao_permitida(consulta.status_atual, status_novo):
+        raise TransicaoInvalida(consulta.status_atual, status_novo)
+
+    with transaction.atomic():
+        consulta.status_atual = status_novo
+        consulta.save(update_fields=['status_atual', 'data_atualizacao'])
+        registrar_auditoria(ConsultaStatusLog(
+            consulta=consulta,
+            status_novo=_texto_do_log(status_novo, descricao),
+            pessoa=pessoa
+        ))
+    return True
+
+
+def mudar_status_em_lote(queryset, ids, status_novo, pessoa, descricao=None):
+    """
+    Aplica a mesma transição a várias consultas com um UPDATE e um bulk
+    insert de logs, independentemente do tamanho do lote.
+
+    `queryset` limita as consultas que a pessoa pode alterar. Retorna
+    `(alteradas, inalteradas, erros)`: listas de ids e `{id: mensagem}`.
+    """
+    erros = {}
+    with transaction.atomic():
+        # Trava as linhas para que a verificação e o UPDATE vejam o mesmo status
+        linhas = {
+            pk: (status_atual, medico_id, clinica_id, data_hora)
+            for pk, status_atual, medico_id, clinica_id, data_hora in (
+                queryset.select_for_update().filter(pk__in=ids).order_by('pk')
+                .values_list('pk', 'status_atual', 'medico_id', 'clinica_id', 'data_hora')
+            )
+        }
+
+        alteradas, inalteradas = [], []
+        for pk in ids:
+            if pk not in linhas:
+                erros[pk] = "Consulta não encontrada."
+            elif linhas[pk][0] == status_novo:
+                inalteradas.append(pk)
+            elif not transicao_permitida(linhas[pk][0], status_novo):
+                erros[pk] = str(TransicaoInvalida(linhas[pk][0], status_novo))
+            else:
+                alteradas.append(pk)
+        if not alteradas:
+            return alteradas, inalteradas, erros
+
+        # update() não atualiza auto_now: a data entra explicitamente para o ETag
+        Consulta.objects.filter(pk__in=alteradas).update(
+            status_atual=status_novo, data_atualizacao=timezone.now()
+        )
+        texto = _texto_do_log(status_novo, descricao)
+        ConsultaStatusLog.objects.bulk_create([
+            ConsultaStatusLog(consulta_id=pk, status_novo=texto, pessoa=pessoa)
+            for pk in alteradas
+        ])
+
+        # update() também não dispara post_save: grade e contadores de uma vez
+        sincronizar_slots([
+            Consulta(pk=pk, medico_id=linhas[pk][1], data_hora=linhas[pk][3]) for pk in alteradas
+        ])
+        registrar_mudancas_de_status(
+            [(linhas[pk][2], linhas[pk][3], linhas[pk][0]) for pk in alteradas], status_novo
+        )
+    return alteradas, inalteradas, erros
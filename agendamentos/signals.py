@@ -0,0 +1,127 @@
+# agendamentos/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import financeiro
+from .disponibilidade import bloquear_periodo, liberar_periodo, regenerar_slots_do_medico, sincronizar_slots
+from .models import Consulta, Pagamento, JornadaTrabalho, BloqueioAgenda
+
+# Campos da consulta que decidem em que linha do resumo financeiro o pagamento entra
+CAMPOS_FINANCEIROS_DA_CONSULTA = {'clinica', 'clinica_id', 'medico', 'medico_id', 'data_hora'}
+
+
+@receiver(post_save, sender=Consulta)
+def atualizar_slot_da_consulta(sender, instance, raw=False, **kwargs):
+    """
+    Mantém a grade de horários em dia quando uma consulta é criada,
+    remarcada ou cancelada. A remoção já libera o slot via SET_NULL.
+    """
+    if raw:
+        return
+    sincronizar_slots([instance])
+
+
+@receiver(post_save, sender=JornadaTrabalho)
+@receiver(post_delete, sender=JornadaTrabalho)
+def regenerar_grade_do_medico(sender, instance, raw=False, **kwargs):
+    """ Refaz os horários futuros do médico quando a sua jornada muda. """
+    if raw:
+        return
+    regenerar_slots_do_medico(instance.medico_id)
+
+
+@receiver(pre_save, sender=BloqueioAgenda)
+def guardar_periodo_anterior(sender, instance, raw=False, **kwargs):
+    """ Guarda o período antigo para liberá-lo caso o bloqueio seja alterado. """
+    instance._periodo_anterior = None
+    if instance.pk and not raw:
+        instance._periodo_anterior = BloqueioAgenda.objects.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=BloqueioAgenda)
+def aplicar_bloqueio(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_periodo_anterior', None):
+        liberar_periodo(instance._periodo_anterior)
+    bloquear_periodo(instance)
+
+
+@receiver(post_delete, sender=BloqueioAgenda)
+def remover_bloqueio(sender, instance, **kwargs):
+    liberar_periodo(instance)
+
+
+# --- Resumos financeiros (ver agendamentos.financeiro) ---
+
+def _estado_financeiro(consulta, pagamento):
+    return consulta.clinica_id, consulta.medico_id, consulta.data_hora, pagamento.status, pagamento.valor_pago
+
+
+@receiver(pre_save, sender=Pagamento)
+def guardar_pagamento_anterior(sender, instance, raw=False, **kwargs):
+    instance._estado_financeiro = None
+    if raw or instance._state.adding:
+        return
+    instance._estado_financeiro = (
+        Pagamento.objects.filter(pk=instance.pk)
+        .values_list('consulta__clinica_id', 'consulta__medico_id', 'consulta__data_hora', 'status', 'valor_pago')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Pagamento)
+def atualizar_resumo_do_pagamento(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anterior = None if created else getattr(instance, '_estado_financeiro', None)
+    atual = _estado_financeiro(instance.consulta, instance)
+    if anterior != atual:
+        financeiro.registrar_mudanca(anterior, atual)
+
+
+@receiver(post_delete, sender=Pagamento)
+def descontar_pagamento_removido(sender, instance, **kwargs):
+    # Na remoção em cascata a consulta ainda existe: é apagada depois do pagamento
+    consulta = Consulta.objects.filter(pk=instance.pk).only('clinica_id', 'medico_id', 'data_hora').first()
+    if consulta is not None:
+        financeiro.registrar_mudanca(_estado_financeiro(consulta, instance), None)
+
+
+@receiver(pre_save, sender=Consulta)
+def guardar_posicao_financeira(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ Remarcações mudam o dia (ou o médico) em que o pagamento é contabilizado. """
+    instance._estado_financeiro = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not CAMPOS_FINANCEIROS_DA_CONSULTA & set(update_fields):
+        return
+    instance._estado_financeiro = (
+        Consulta.objects.filter(pk=instance.pk, pagamento__isnull=False)
+        .values_list('clinica_id', 'medico_id', 'data_hora', 'pagamento__status', 'pagamento__valor_pago')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Consulta)
+def mover_pagamento_da_consulta(sender, instance, created, raw=False, **kwargs):
+    anterior = getattr(instance, '_estado_financeiro', None)
+    if raw or created or anterior is None:
+        return
+    atual = (instance.clinica_id, instance.medico_id, instance.data_hora) + anterior[3:]
+    if anterior != atual:
+        financeiro.registrar_mudanca(anterior, atual)
+
+
+@receiver(pre_save, sender=Consulta)
+def rearmar_lembrete(sender, instance, raw=False, update_fields=None, **kwargs):
+    """ Consulta remarcada depois do lembrete: volta para a fila de lembretes. """
+    if raw or instance._state.adding or instance.lembrete_enviado_em is None:
+        return
+    if update_fields is not None and 'data_hora' not in update_fields:
+        return
+    anterior = Consulta.objects.filter(pk=instance.pk).values_list('data_hora', flat=True).first()
+    if anterior is not None and anterior != instance.data_hora:
+        instance.lembrete_enviado_em = None
+        # Com update_fields o campo não seria gravado pelo save()
+        Consulta.objects.filter(pk=instance.pk).update(lembrete_enviado_em=None)
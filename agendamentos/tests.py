@@ -1,3 +1,657 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import time as time_module
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from clinicas.models import Estado, Cidade, TipoClinica, Clinica
+from configuracoes import cache as configuracoes_em_cache
+from configuracoes.models import SystemSettings
+from medicos.models import Medico
+from medlink_core.tests import cache_de_teste
+from notificacoes.models import EmailPendente
+from pacientes.models import Paciente
+from secretarias.models import Secretaria
+from users.models import User
+from .disponibilidade import gerar_slots
+from .lembretes import agendar_lembretes
+from .financeiro import recalcular as recalcular_financeiro
+from .models import (
+    Consulta, Pagamento, ConsultaStatusLog, AnotacaoConsulta, JornadaTrabalho, BloqueioAgenda, ResumoFinanceiroDiario,
+)
+
+
+class AgendamentosTestMixin:
+    """
+    Cria uma clínica com médico, secretária e pacientes para os testes da API.
+    """
+
+    def criar_base(self):
+        estado = Estado.objects.create(nome='Tocantins', uf='TO')
+        cidade = Cidade.objects.create(nome='Palmas', estado=estado)
+        tipo = TipoClinica.objects.create(descricao='Consultório')
+        self.clinica = Clinica.objects.create(
+            nome_fantasia='Clínica Central', cnpj='11222333000181',
+            cidade=cidade, tipo_clinica=tipo,
+        )
+        self.medico = User.objects.create_user(
+            cpf='11111111111', email='medico@medlink.com', password='senha-forte-123',
+            first_name='Ana', last_name='Souza', user_type='MEDICO',
+        )
+        Medico.objects.create(user=self.medico, crm='12345-TO', clinica=self.clinica)
+        self.secretaria = User.objects.create_user(
+            cpf='22222222222', email='secretaria@medlink.com', password='senha-forte-123',
+            first_name='Bia', last_name='Lima', user_type='SECRETARIA',
+        )
+        Secretaria.objects.create(user=self.secretaria, clinica=self.clinica)
+        self.inicio = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def criar_paciente(self, indice):
+        user = User.objects.create_user(
+            cpf=f'9{indice:010d}', email=f'paciente{indice}@medlink.com',
+            first_name='Paciente', last_name=str(indice), user_type='PACIENTE',
+        )
+        return Paciente.objects.create(user=user, telefone='63999999999')
+
+    def criar_consultas(self, quantidade, com_extras=True):
+        consultas = []
+        for indice in range(quantidade):
+            consulta = Consulta.objects.create(
+                paciente=self.criar_paciente(Consulta.objects.count()),
+                medico=self.medico,
+                clinica=self.clinica,
+                data_hora=self.inicio + timedelta(minutes=30 * Consulta.objects.count()),
+                valor=Decimal('150.00'),
+            )
+            if com_extras:
+                Pagamento.objects.create(consulta=consulta, valor_pago=consulta.valor)
+                AnotacaoConsulta.objects.create(consulta=consulta, conteudo=f'Anotação {indice}')
+            consultas.append(consulta)
+        return consultas
+
+
+class ConsultaListQueryBudgetTests(AgendamentosTestMixin, TestCase):
+    """
+    A listagem de consultas deve custar um número fixo de queries,
+    independentemente da quantidade de linhas retornadas.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.url = reverse('agendamentos-list-create')
+
+    def listar(self, user, queries):
+        # Recarrega o utilizador para não herdar perfis já cacheados no setUp
+        self.client.force_authenticate(user=User.objects.get(pk=user.pk))
+        with self.assertNumQueries(queries):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_medico_lista_com_duas_queries(self):
+        # Uma query para os validadores (ETag) e outra para as consultas
+        self.criar_consultas(3)
+        self.listar(self.medico, 2)
+        self.criar_consultas(20)
+        self.listar(self.medico, 2)
+
+    def test_secretaria_lista_com_tres_queries(self):
+        # Mais uma query para o perfil da secretária
+        self.criar_consultas(3)
+        self.listar(self.secretaria, 3)
+        self.criar_consultas(20)
+        self.listar(self.secretaria, 3)
+
+    def test_relacoes_ausentes_nao_geram_queries(self):
+        self.criar_consultas(5, com_extras=False)
+        response = self.listar(self.medico, 2)
+        primeira = response.json()['results'][0]
+        self.assertIsNone(primeira['pagamento'])
+        self.assertIsNone(primeira['anotacao_conteudo'])
+
+    def test_detalhes_aninhados_preenchidos(self):
+        self.criar_consultas(1)
+        consulta = self.listar(self.medico, 2).json()['results'][0]
+        self.assertEqual(consulta['clinica_detalhes']['cnpj'], self.clinica.cnpj)
+        self.assertEqual(consulta['medico_detalhes']['crm'], '12345-TO')
+        self.assertEqual(consulta['paciente_detalhes']['nome_completo'], 'Paciente 0')
+        self.assertEqual(consulta['pagamento']['status'], 'PENDENTE')
+        self.assertEqual(consulta['anotacao_conteudo'], 'Anotação 0')
+
+
+class ConsultaGetCondicionalTests(AgendamentosTestMixin, TestCase):
+    """
+    Agenda e listagem respondem 304 enquanto as consultas não mudam.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.medico)
+        self.consulta = self.criar_consultas(2)[0]
+        self.agenda_url = reverse('medico-agenda')
+        self.parametros = {'year': self.inicio.year, 'month': self.inicio.month}
+
+    def test_agenda_inalterada_responde_304_com_uma_query(self):
+        response = self.client.get(self.agenda_url, self.parametros)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.agenda_url, self.parametros, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.consulta.valor = Decimal('180.00')
+        self.consulta.save()
+        response = self.client.get(self.agenda_url, self.parametros, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_mes_invalido(self):
+        response = self.client.get(self.agenda_url, {'year': 2025, 'month': 13})
+        self.assertEqual(response.status_code, 400)
+
+    def test_listagem_muda_de_etag_com_novas_consultas_e_anotacoes(self):
+        url = reverse('agendamentos-list-create')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.consulta.anotacao.conteudo = 'Nova anotação'
+        self.consulta.anotacao.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.criar_consultas(1)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_remocao_de_consulta_antiga_nao_responde_304(self):
+        response = self.client.get(self.agenda_url, self.parametros)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+
+        # A consulta removida não é a mais recente: max(data_atualizacao) não muda
+        self.consulta.delete()
+        depois = http_date(time_module.time() + 60)
+        response = self.client.get(self.agenda_url, self.parametros, HTTP_IF_MODIFIED_SINCE=depois)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.agenda_url, self.parametros, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class ConsultaCamposTests(AgendamentosTestMixin, TestCase):
+    """
+    ?fields= e ?expand= limitam o que é consultado e serializado.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.medico)
+        self.url = reverse('agendamentos-list-create')
+        self.criar_consultas(3)
+
+    def test_fields_sem_expand_nao_junta_relacoes(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,data_hora,status_atual'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'data_hora', 'status_atual'})
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('JOIN', sql)
+
+    def test_expand_inclui_so_os_aninhados_pedidos(self):
+        response = self.client.get(self.url, {'fields': 'id', 'expand': 'paciente'})
+        consulta = response.json()['results'][0]
+        self.assertEqual(set(consulta), {'id', 'paciente_detalhes'})
+        self.assertEqual(consulta['paciente_detalhes']['nome_completo'], 'Paciente 0')
+
+        # Sem ?fields=, os campos simples continuam todos presentes
+        consulta = self.client.get(self.url, {'expand': 'pagamento'}).json()['results'][0]
+        self.assertIn('valor', consulta)
+        self.assertIn('pagamento', consulta)
+        self.assertNotIn('medico_detalhes', consulta)
+
+    def test_streaming_devolve_a_janela_inteira_sem_paginar(self):
+        self.criar_consultas(4)
+        response = self.client.get(self.url, {'stream': '1', 'fields': 'id,data_hora'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('ETag', response)
+        consultas = json.loads(b''.join(response.streaming_content))
+        paginada = self.client.get(self.url, {'page_size': 100, 'fields': 'id,data_hora'}).json()['results']
+        self.assertEqual(consultas, paginada)
+
+    def test_campo_desconhecido(self):
+        response = self.client.get(self.url, {'fields': 'id,senha'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(self.url, {'expand': 'prontuario'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConsultaExportacaoTests(AgendamentosTestMixin, TestCase):
+    """
+    Exportação em streaming (CSV/NDJSON) pela API e pelo comando.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.url = reverse('agendamentos-exportar')
+        self.consultas = self.criar_consultas(3)
+
+    def test_csv_em_streaming_com_pagamento_paciente_e_medico(self):
+        response = self.client.get(self.url, {'formato': 'csv', 'from': self.inicio.date().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        linhas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(linhas[0][:3], ['consulta_id', 'data_hora', 'status'])
+        self.assertEqual(len(linhas), 4)
+        primeira = dict(zip(linhas[0], linhas[1]))
+        self.assertEqual(primeira['consulta_id'], str(self.consultas[0].pk))
+        self.assertEqual(primeira['paciente'], 'Paciente 0')
+        self.assertEqual(primeira['medico_crm'], '12345-TO')
+        self.assertEqual(primeira['pagamento_valor'], '150.00')
+
+    def test_ndjson_e_parametros_invalidos(self):
+        response = self.client.get(self.url, {'formato': 'ndjson'})
+        linhas = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(linha)['consulta_id'] for linha in linhas], [c.pk for c in self.consultas])
+
+        self.assertEqual(self.client.get(self.url, {'formato': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'mes': '2025-13'}).status_code, 400)
+
+    def test_comando_grava_o_arquivo(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            destino = Path(pasta) / 'consultas.csv'
+            call_command(
+                'exportar_consultas', clinica=[self.clinica.pk], saida=str(destino),
+                lote=2, stderr=io.StringIO(),
+            )
+            self.assertEqual(len(destino.read_text().splitlines()), 4)
+
+
+class ResumoFinanceiroTests(AgendamentosTestMixin, TestCase):
+    """
+    Resumos financeiros mantidos pelos sinais e relatório lido deles.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.consultas = self.criar_consultas(3)
+
+    def resumos(self):
+        return sorted(ResumoFinanceiroDiario.objects.values_list(
+            'dia', 'clinica_id', 'medico_id', 'valor_faturado', 'valor_recebido',
+            'pagamentos_pendentes', 'pagamentos_pagos',
+        ))
+
+    def test_pagamento_pago_e_consulta_removida_atualizam_o_resumo(self):
+        url = reverse('agendamentos-pagamento-update', args=[self.consultas[0].pk])
+        self.assertEqual(self.client.put(url).status_code, 200)
+        self.consultas[1].delete()
+
+        totais = ResumoFinanceiroDiario.objects.aggregate(
+            faturado=Sum('valor_faturado'), recebido=Sum('valor_recebido'),
+            pendentes=Sum('pagamentos_pendentes'), pagos=Sum('pagamentos_pagos'),
+        )
+        self.assertEqual(totais, {
+            'faturado': Decimal('300.00'), 'recebido': Decimal('150.00'), 'pendentes': 1, 'pagos': 1,
+        })
+
+        # Remarcar para outro dia move o pagamento de linha
+        self.consultas[2].data_hora += timedelta(days=2)
+        self.consultas[2].save()
+        incremental = self.resumos()
+        recalcular_financeiro()
+        self.assertEqual(
+            [linha for linha in incremental if linha[3] or linha[5] or linha[6]], self.resumos()
+        )
+
+    def test_relatorio_do_mes_e_do_ano(self):
+        dia = timezone.localtime(self.consultas[0].data_hora).date()
+        url = reverse('agendamentos-financeiro')
+        response = self.client.get(url, {'ano': dia.year, 'mes': dia.month})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['totais']['valor_faturado'], '450.00')
+        self.assertEqual(response.data['totais']['pagamentos_pendentes'], 3)
+
+        response = self.client.get(url, {'ano': dia.year, 'agrupar': 'medico'})
+        self.assertEqual(response.data['grupos'][0]['medico_nome'], 'Ana Souza')
+        self.assertEqual(response.data['grupos'][0]['valor_recebido'], '0.00')
+
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ano': dia.year, 'agrupar': 'semana'}).status_code, 400)
+
+
+@cache_de_teste()
+class LembretesTests(AgendamentosTestMixin, TestCase):
+    def setUp(self):
+        configuracoes_em_cache.limpar()
+        self.criar_base()
+        self.consultas = self.criar_consultas(4, com_extras=False)
+        SystemSettings.objects.create(reminder_hours_before=24)
+        # Janela de 24h que alcança as duas primeiras consultas (inicio e inicio + 30min)
+        self.agora = self.inicio - timedelta(hours=24) + timedelta(minutes=30)
+
+    def test_enfileira_so_a_janela_uma_vez(self):
+        Consulta.objects.filter(pk=self.consultas[1].pk).update(status_atual='CANCELADA')
+        with self.assertNumQueries(7):
+            self.assertEqual(agendar_lembretes(agora=self.agora, tamanho_lote=10), 1)
+        email = EmailPendente.objects.get()
+        self.assertEqual(email.destinatarios, [self.consultas[0].paciente.user.email])
+        self.assertIn('Ana Souza', email.corpo)
+
+        # Segunda varredura (ou outro worker): a marca d'água tira a consulta da janela
+        self.assertEqual(agendar_lembretes(agora=self.agora), 0)
+        self.assertEqual(EmailPendente.objects.count(), 1)
+
+    def test_lotes_e_remarcacao(self):
+        self.assertEqual(agendar_lembretes(agora=self.agora, tamanho_lote=1), 2)
+        self.assertEqual(EmailPendente.objects.count(), 2)
+
+        consulta = Consulta.objects.get(pk=self.consultas[0].pk)
+        consulta.data_hora -= timedelta(minutes=15)
+        consulta.save()
+        self.assertIsNone(Consulta.objects.get(pk=consulta.pk).lembrete_enviado_em)
+        self.assertEqual(agendar_lembretes(agora=self.agora), 1)
+        self.assertEqual(EmailPendente.objects.count(), 3)
+
+    def test_notificacoes_desligadas(self):
+        configuracoes = SystemSettings.objects.get(pk=1)
+        configuracoes.email_notifications = False
+        configuracoes.save()
+        self.assertEqual(agendar_lembretes(agora=self.agora), 0)
+        self.assertFalse(Consulta.objects.filter(lembrete_enviado_em__isnull=False).exists())
+
+    def test_comando_entrega_sem_worker_de_emails(self):
+        # O comando usa o relógio real: uma janela de 48h alcança as quatro consultas
+        configuracoes = SystemSettings.objects.get(pk=1)
+        configuracoes.reminder_hours_before = 48
+        configuracoes.save()
+        with override_settings(NOTIFICACOES_ENVIO_IMEDIATO=False):
+            call_command('enviar_lembretes', stdout=io.StringIO())
+        self.assertEqual(EmailPendente.objects.filter(status=EmailPendente.Status.PENDENTE).count(), 4)
+        self.assertEqual(len(mail.outbox), 0)
+
+        Consulta.objects.update(lembrete_enviado_em=None)
+        EmailPendente.objects.all().delete()
+        with override_settings(NOTIFICACOES_ENVIO_IMEDIATO=True):
+            call_command('enviar_lembretes', stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(EmailPendente.objects.exclude(status=EmailPendente.Status.ENVIADO).exists())
+
+
+class ConsultaKeysetPaginationTests(AgendamentosTestMixin, TestCase):
+    """
+    Paginação por cursor em (data_hora, id) e janela de datas ?from=&to=.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.medico)
+        self.url = reverse('agendamentos-list-create')
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        consultas = self.criar_consultas(7, com_extras=False)
+        # Duas consultas no mesmo horário (uma cancelada): o desempate é feito pelo id
+        Consulta.objects.filter(pk=consultas[4].pk).update(
+            data_hora=consultas[3].data_hora, status_atual='CANCELADA'
+        )
+
+        ids, url = [], f'{self.url}?page_size=3'
+        while url:
+            # Validadores do GET condicional + página
+            with self.assertNumQueries(2):
+                body = self.client.get(url).json()
+            self.assertLessEqual(len(body['results']), 3)
+            ids.extend(item['id'] for item in body['results'])
+            url = body['next']
+        self.assertEqual(sorted(ids), sorted(c.pk for c in consultas))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_janela_de_datas(self):
+        self.criar_consultas(4, com_extras=False)
+        dia = self.inicio.date().isoformat()
+        body = self.client.get(self.url, {'from': dia, 'to': dia}).json()
+        self.assertEqual(len(body['results']), 4)
+        body = self.client.get(self.url, {'to': (self.inicio - timedelta(days=1)).date().isoformat()}).json()
+        self.assertEqual(body['results'], [])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'lixo'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'from': 'ontem'}).status_code, 400)
+
+
+class AgendamentoConcorrenteTests(AgendamentosTestMixin, TestCase):
+    """
+    O conflito de horário é garantido pelo banco, não só pela verificação prévia.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.url = reverse('agendamentos-list-create')
+
+    def payload(self, paciente):
+        return {
+            'paciente': paciente.pk, 'medico': self.medico.pk, 'clinica': self.clinica.pk,
+            'data_hora': self.inicio.isoformat(), 'valor': '150.00',
+        }
+
+    def test_segunda_reserva_no_mesmo_horario_e_rejeitada(self):
+        response = self.client.post(self.url, self.payload(self.criar_paciente(1)), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Pagamento.objects.filter(consulta_id=response.json()['id']).exists())
+
+        response = self.client.post(self.url, self.payload(self.criar_paciente(2)), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+        self.assertEqual(Consulta.objects.count(), 1)
+
+    def test_constraint_barra_insercao_que_ignora_a_verificacao(self):
+        from django.db import IntegrityError, transaction
+        self.criar_consultas(1, com_extras=False)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Consulta.objects.create(
+                paciente=self.criar_paciente(5), medico=self.medico, clinica=self.clinica,
+                data_hora=self.inicio, valor=Decimal('150.00'),
+            )
+
+    def test_horario_cancelado_fica_livre(self):
+        consulta = self.criar_consultas(1, com_extras=False)[0]
+        Consulta.objects.filter(pk=consulta.pk).update(status_atual='CANCELADA')
+        response = self.client.post(self.url, self.payload(self.criar_paciente(3)), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class ConsultaLoteTests(AgendamentosTestMixin, TestCase):
+    """
+    Agendamento em lote: erros por item e custo fixo de queries.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.url = reverse('agendamentos-lote')
+
+    def item(self, paciente, minutos):
+        return {
+            'paciente': paciente.pk, 'medico': self.medico.pk, 'clinica': self.clinica.pk,
+            'data_hora': (self.inicio + timedelta(minutes=minutos)).isoformat(), 'valor': '120.00',
+        }
+
+    def test_erros_reportados_por_item(self):
+        ocupada = self.criar_consultas(1, com_extras=False)[0]
+        paciente = self.criar_paciente(50)
+        itens = [
+            self.item(paciente, 60),
+            self.item(paciente, 0),                 # conflito com a agenda
+            self.item(paciente, 60),                # conflito dentro do lote
+            {**self.item(paciente, 90), 'clinica': 999},
+            {'paciente': paciente.pk},              # inválido
+        ]
+        response = self.client.post(self.url, {'consultas': itens}, format='json')
+        self.assertEqual(response.status_code, 207)
+        resultados = response.json()['resultados']
+        self.assertEqual(resultados[0]['status'], 'criada')
+        self.assertEqual([r['index'] for r in resultados], list(range(5)))
+        for resultado in resultados[1:]:
+            self.assertIn('errors', resultado)
+        self.assertEqual(Consulta.objects.exclude(pk=ocupada.pk).count(), 1)
+        self.assertEqual(Pagamento.objects.count(), 1)
+
+    def test_numero_de_queries_nao_depende_do_tamanho_do_lote(self):
+        pacientes = [self.criar_paciente(100 + i) for i in range(30)]
+        with CaptureQueriesContext(connection) as pequeno:
+            self.client.post(self.url, {'consultas': [self.item(pacientes[0], 0)]}, format='json')
+        itens = [self.item(p, 30 * (i + 1)) for i, p in enumerate(pacientes)]
+        with CaptureQueriesContext(connection) as grande:
+            response = self.client.post(self.url, {'consultas': itens}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(pequeno), len(grande))
+        self.assertEqual(ConsultaStatusLog.objects.count(), 31)
+
+
+class DisponibilidadeTests(AgendamentosTestMixin, TestCase):
+    """
+    Grade materializada de horários: jornadas, consultas e bloqueios.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.url = reverse('agendamentos-disponibilidade')
+        self.dia = (timezone.now() + timedelta(days=2)).date()
+        JornadaTrabalho.objects.create(
+            medico=self.medico, clinica=self.clinica, dia_semana=self.dia.weekday(),
+            hora_inicio=time(8, 0), hora_fim=time(10, 0), duracao_consulta=30,
+        )
+        gerar_slots(dias=7)
+
+    def horario(self, hora, minuto=0):
+        return timezone.make_aware(datetime.combine(self.dia, time(hora, minuto)))
+
+    def livres(self, **params):
+        params.setdefault('from', self.dia.isoformat())
+        params.setdefault('to', self.dia.isoformat())
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [item['inicio'] for item in response.json()]
+
+    def test_consultas_e_bloqueios_ocupam_a_grade(self):
+        self.assertEqual(len(self.livres()), 4)
+        consulta = Consulta.objects.create(
+            paciente=self.criar_paciente(1), medico=self.medico, clinica=self.clinica,
+            data_hora=self.horario(8, 30), valor=Decimal('100.00'),
+        )
+        bloqueio = BloqueioAgenda.objects.create(
+            clinica=self.clinica, inicio=self.horario(9), fim=self.horario(9, 30),
+        )
+        livres = self.livres()
+        self.assertEqual(len(livres), 2)
+        self.assertTrue(livres[0].startswith(f'{self.dia.isoformat()}T08:00'))
+
+        consulta.status_atual = 'CANCELADA'
+        consulta.save()
+        bloqueio.delete()
+        self.assertEqual(len(self.livres()), 4)
+
+    def test_limite_e_especialidade(self):
+        self.assertEqual(len(self.livres(limit=2)), 2)
+        self.assertEqual(self.livres(especialidade='PEDIATRIA'), [])
+        self.assertEqual(len(self.livres(especialidade='CLINICA_GERAL')), 4)
+
+    def test_lote_ocupa_a_grade(self):
+        paciente = self.criar_paciente(2)
+        itens = [{
+            'paciente': paciente.pk, 'medico': self.medico.pk, 'clinica': self.clinica.pk,
+            'data_hora': self.horario(hora).isoformat(), 'valor': '100.00',
+        } for hora in (8, 9)]
+        response = self.client.post(reverse('agendamentos-lote'), {'consultas': itens}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(self.livres()), 2)
+
+
+class ConsultaStatusLoteTests(AgendamentosTestMixin, TestCase):
+    """
+    Mudança de status em lote com um UPDATE e um bulk insert de logs,
+    respeitando a tabela de transições.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.secretaria)
+        self.url = reverse('agendamentos-status-lote')
+
+    def test_confirma_varias_consultas_e_rejeita_transicoes_invalidas(self):
+        consultas = self.criar_consultas(4, com_extras=False)
+        Consulta.objects.filter(pk=consultas[3].pk).update(status_atual='CONCLUIDA')
+        ids = [c.pk for c in consultas] + [999999]
+
+        response = self.client.post(self.url, {'ids': ids, 'status_atual': 'CONFIRMADA'}, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(response.data['alteradas'], 3)
+        self.assertEqual(
+            [r.get('status', 'erro') for r in response.data['resultados']],
+            ['alterada', 'alterada', 'alterada', 'erro', 'erro']
+        )
+        self.assertEqual(Consulta.objects.filter(status_atual='CONFIRMADA').count(), 3)
+        self.assertEqual(ConsultaStatusLog.objects.filter(status_novo='CONFIRMADA').count(), 3)
+
+        # Repetir o pedido não grava nada de novo
+        response = self.client.post(self.url, {'ids': ids[:3], 'status_atual': 'CONFIRMADA'}, format='json')
+        self.assertEqual(response.data['alteradas'], 0)
+        self.assertEqual(ConsultaStatusLog.objects.count(), 3)
+
+    def test_numero_de_queries_nao_depende_do_tamanho_do_lote(self):
+        def cancelar(consultas):
+            ids = [c.pk for c in consultas]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    self.url, {'ids': ids, 'status_atual': 'CANCELADA', 'motivo': 'Feriado'}, format='json'
+                )
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(cancelar(self.criar_consultas(2, com_extras=False)),
+                         cancelar(self.criar_consultas(15, com_extras=False)))
+        self.assertEqual(ConsultaStatusLog.objects.filter(status_novo='CANCELADA - Motivo: Feriado').count(), 17)
+
+    def test_status_invalido_e_consultas_de_outra_clinica(self):
+        consulta = self.criar_consultas(1, com_extras=False)[0]
+        response = self.client.post(self.url, {'ids': [consulta.pk], 'status_atual': 'XPTO'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.force_authenticate(user=self.criar_paciente(50).user)
+        response = self.client.post(self.url, {'ids': [consulta.pk], 'status_atual': 'CANCELADA'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_status_individual_usa_as_transicoes(self):
+        consulta = self.criar_consultas(1, com_extras=False)[0]
+        url = reverse('agendamentos-status-update', args=[consulta.pk])
+        self.assertEqual(self.client.put(url, {'status_atual': 'CANCELADA'}, format='json').status_code, 200)
+        self.assertEqual(self.client.put(url, {'status_atual': 'CONFIRMADA'}, format='json').status_code, 400)
@@ -1,8 +1,13 @@
 from django.urls import path
-from .views import ConsultaAPIView, ConsultaStatusUpdateView, PagamentoUpdateView, AnotacaoConsultaView, FinalizarConsultaAPIView
+from .views import ConsultaAPIView, ConsultaLoteAPIView, DisponibilidadeAPIView, ConsultaStatusUpdateView, ConsultaStatusLoteAPIView, PagamentoUpdateView, AnotacaoConsultaView, FinalizarConsultaAPIView, ConsultaExportacaoAPIView, RelatorioFinanceiroAPIView
 
 urlpatterns = [
     path('', ConsultaAPIView.as_view(), name='agendamentos-list-create'),
+    path('lote/', ConsultaLoteAPIView.as_view(), name='agendamentos-lote'),
+    path('status/lote/', ConsultaStatusLoteAPIView.as_view(), name='agendamentos-status-lote'),
+    path('disponibilidade/', DisponibilidadeAPIView.as_view(), name='agendamentos-disponibilidade'),
+    path('exportar/', ConsultaExportacaoAPIView.as_view(), name='agendamentos-exportar'),
+    path('financeiro/', RelatorioFinanceiroAPIView.as_view(), name='agendamentos-financeiro'),
     
     # CORREÇÃO: Deve ser <int:pk>
     path('<int:pk>/', ConsultaAPIView.as_view(), name='agendamentos-detail-delete'),
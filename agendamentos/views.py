@@ -3,19 +3,51 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import transaction
+from rest_framework.permissions import IsAuthenticated
+from django.db import IntegrityError, transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 
 # --- CORREÇÃO: ADICIONADAS AS IMPORTAÇÕES QUE FALTAVAM ---
-from .models import Consulta, Pagamento, ConsultaStatusLog, AnotacaoConsulta
-from .serializers import ConsultaSerializer, AnotacaoConsultaSerializer
+from .models import Consulta, Pagamento, ConsultaStatusLog, AnotacaoConsulta, ResumoFinanceiroDiario
+from .serializers import (
+    ConsultaSerializer, ConsultaLoteItemSerializer, AnotacaoConsultaSerializer, SlotDisponivelSerializer,
+)
+from .condicional import aplicar_validadores, calcular_validadores, resposta_condicional
+from .disponibilidade import horarios_livres
+from .exportacao import FORMATOS, exportar, intervalo_do_mes
+from .financeiro import AGRUPAMENTOS, relatorio
+from .pagination import ConsultaKeysetPagination, filtrar_janela_de_datas, interpretar_limite
+from .services import (
+    HorarioIndisponivel, TransicaoInvalida, agendar_consulta, agendar_consultas_em_lote,
+    bloquear_agenda_do_medico, consultas_ativas_no_horario, mudar_status, mudar_status_em_lote,
+    status_valido, transicao_permitida,
+)
+from administrador.auditoria import registrar as registrar_auditoria
+from medlink_core.streaming import resposta_em_streaming, streaming_pedido
 from users.permissions import IsMedicoOrSecretaria
 from .consts import STATUS_CONSULTA_CONCLUIDA
 from users.permissions import IsMedicoUser
 
 
+def consultas_do_usuario(user):
+    """ Consultas que o usuário pode ver e alterar: as suas ou as da sua clínica. """
+    if user.user_type == 'MEDICO':
+        return Consulta.objects.filter(medico=user)
+    if user.user_type == 'SECRETARIA':
+        # Na autenticação JWT o escopo vem do token (users.autenticacao)
+        clinica_id = getattr(user, 'clinica_escopo', None)
+        if clinica_id is None:
+            try:
+                clinica_id = user.perfil_secretaria.clinica_id
+            except AttributeError:
+                return Consulta.objects.none()
+        return Consulta.objects.filter(clinica_id=clinica_id)
+    return Consulta.objects.none()
+
+
 class ConsultaAPIView(APIView):
     """
     API para gerenciar o CRUD completo de agendamentos.
@@ -23,53 +55,63 @@ class ConsultaAPIView(APIView):
     """
     permission_classes = [IsMedicoOrSecretaria]
 
-    def get_queryset(self):
-        user = self.request.user
-        if user.user_type == 'MEDICO':
-            return Consulta.objects.filter(medico=user).order_by('data_hora')
-        elif user.user_type == 'SECRETARIA':
-            try:
-                clinica = user.perfil_secretaria.clinica 
-                return Consulta.objects.filter(clinica=clinica).order_by('data_hora')
-            except AttributeError:
-                return Consulta.objects.none()
-        return Consulta.objects.none()
+    def get_queryset(self, campos=None):
+        # Os JOINs declarados pelo serializer garantem um número fixo de queries
+        return ConsultaSerializer.setup_eager_loading(
+            consultas_do_usuario(self.request.user), campos
+        ).order_by('data_hora')
 
     def get(self, request, pk=None):
+        # ?fields=&expand= limitam o que é consultado e serializado
+        try:
+            campos = ConsultaSerializer.campos_da_requisicao(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         if pk:
-            consulta = get_object_or_404(self.get_queryset(), pk=pk)
-            serializer = ConsultaSerializer(consulta)
+            consulta = get_object_or_404(self.get_queryset(campos), pk=pk)
+            serializer = ConsultaSerializer(consulta, campos=campos)
             return Response(serializer.data)
         
-        consultas = self.get_queryset()
-        serializer = ConsultaSerializer(consultas, many=True)
-        return Response(serializer.data)
+        # Listagem paginada por cursor em (data_hora, id), com janela opcional ?from=&to=
+        consultas = filtrar_janela_de_datas(self.get_queryset(campos), request)
+
+        # GET condicional: uma agenda que não mudou responde 304 sem serializar nada.
+        # Pagamento e anotação só entram no ETag quando fazem parte da resposta.
+        relacoes = tuple(
+            relacao for relacao in ('pagamento', 'anotacao')
+            if relacao in ConsultaSerializer.relacoes_para(campos)
+        )
+        chave = request.user.pk if campos is None else f"{request.user.pk}|{','.join(sorted(campos))}"
+        etag = calcular_validadores(consultas, relacoes=relacoes, chave=chave)
+        nao_modificada = resposta_condicional(request, etag)
+        if nao_modificada is not None:
+            return nao_modificada
+
+        if streaming_pedido(request):
+            # ?stream=1: a janela inteira como um array JSON, lida em lotes
+            return aplicar_validadores(
+                resposta_em_streaming(consultas.order_by('data_hora', 'id'), ConsultaSerializer, campos=campos),
+                etag
+            )
+
+        paginator = ConsultaKeysetPagination()
+        pagina = paginator.paginate_queryset(consultas, request, view=self)
+        serializer = ConsultaSerializer(pagina, many=True, campos=campos)
+        return aplicar_validadores(paginator.get_paginated_response(serializer.data), etag)
 
     def post(self, request):
         serializer = ConsultaSerializer(data=request.data)
         if serializer.is_valid(raise_exception=True):
-            data_hora = serializer.validated_data['data_hora']
-            medico = serializer.validated_data['medico']
-            
-            if Consulta.objects.filter(medico=medico, data_hora=data_hora).exists():
+            # Verificação de conflito e inserção sob o lock da agenda do médico;
+            # a constraint única do banco cobre qualquer corrida restante.
+            try:
+                serializer.instance = agendar_consulta(serializer.validated_data, request.user)
+            except HorarioIndisponivel:
                 return Response(
                     {"error": "Médico já tem uma consulta agendada para este horário."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            
-            try:
-                with transaction.atomic():
-                    consulta = serializer.save()
-                    Pagamento.objects.create(
-                        consulta=consulta,
-                        status='PENDENTE',
-                        valor_pago=consulta.valor,
-                    )
-                    ConsultaStatusLog.objects.create(
-                        consulta=consulta,
-                        status_novo=consulta.status_atual,
-                        pessoa=self.request.user
-                    )
             except Exception as e:
                 return Response(
                     {"error": str(e)},
@@ -91,31 +133,37 @@ class ConsultaAPIView(APIView):
 
         if serializer.is_valid(raise_exception=True):
             data_hora_nova = serializer.validated_data.get('data_hora', consulta.data_hora)
-            medico = consulta.medico
-
-            if 'data_hora' in serializer.validated_data:
-                conflitos = Consulta.objects.filter(
-                    medico=medico,
-                    data_hora=data_hora_nova
-                ).exclude(pk=pk)
+            medico_id = serializer.validated_data.get('medico', consulta.medico).pk
+            conflito = Response(
+                {"error": "Médico já tem outra consulta agendada para este novo horário."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                if conflitos.exists():
-                    return Response(
-                        {"error": "Médico já tem outra consulta agendada para este novo horário."},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
+            novo_status = serializer.validated_data.get('status_atual', consulta.status_atual)
+            if novo_status != consulta.status_atual and not transicao_permitida(consulta.status_atual, novo_status):
+                return Response(
+                    {"error": str(TransicaoInvalida(consulta.status_atual, novo_status))},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
             try:
                 with transaction.atomic():
+                    if 'data_hora' in serializer.validated_data or 'medico' in serializer.validated_data:
+                        bloquear_agenda_do_medico(medico_id)
+                        if consultas_ativas_no_horario(medico_id, data_hora_nova).exclude(pk=pk).exists():
+                            return conflito
+
                     status_anterior = consulta.status_atual
                     consulta_atualizada = serializer.save()
 
                     if consulta_atualizada.status_atual != status_anterior:
-                        ConsultaStatusLog.objects.create(
+                        registrar_auditoria(ConsultaStatusLog(
                             consulta=consulta_atualizada,
                             status_novo=consulta_atualizada.status_atual,
                             pessoa=self.request.user
-                        )
+                        ))
+            except IntegrityError:
+                return conflito
             except Exception as e:
                 return Response(
                     {"error": str(e)},
@@ -134,11 +182,12 @@ class ConsultaAPIView(APIView):
         consulta = get_object_or_404(self.get_queryset(), pk=pk)
         try:
             with transaction.atomic():
-                ConsultaStatusLog.objects.create(
+                # Gravado na hora: depois do delete a consulta já não existe
+                registrar_auditoria(ConsultaStatusLog(
                     consulta=consulta,
                     status_novo='CANCELADA',
                     pessoa=self.request.user
-                )
+                ), transacional=True)
                 consulta.delete()
         except Exception as e:
             return Response(
@@ -147,6 +196,99 @@ class ConsultaAPIView(APIView):
             )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+class ConsultaLoteAPIView(APIView):
+    """
+    Agenda várias consultas numa única requisição.
+    Recebe `{"consultas": [...]}` com até LIMITE_LOTE itens e responde com o
+    resultado de cada item, na mesma ordem do envio.
+    """
+    permission_classes = [IsMedicoOrSecretaria]
+    LIMITE_LOTE = 500
+
+    def post(self, request):
+        itens = request.data.get('consultas') if isinstance(request.data, dict) else None
+        if not isinstance(itens, list) or not itens:
+            return Response(
+                {"error": "Envie a lista de consultas no campo 'consultas'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(itens) > self.LIMITE_LOTE:
+            return Response(
+                {"error": f"O lote aceita no máximo {self.LIMITE_LOTE} consultas."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        resultados = [None] * len(itens)
+        validos = []
+        for indice, item in enumerate(itens):
+            serializer = ConsultaLoteItemSerializer(data=item)
+            if serializer.is_valid():
+                validos.append((indice, serializer.validated_data))
+            else:
+                resultados[indice] = {'index': indice, 'errors': serializer.errors}
+
+        try:
+            criadas, erros = agendar_consultas_em_lote(validos, request.user)
+        except Exception as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        for indice, consulta in criadas:
+            resultados[indice] = {'index': indice, 'id': consulta.id, 'status': 'criada'}
+        for indice, mensagem in erros.items():
+            resultados[indice] = {'index': indice, 'errors': {'non_field_errors': [mensagem]}}
+
+        if len(criadas) == len(itens):
+            codigo = status.HTTP_201_CREATED
+        elif criadas:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response({'criadas': len(criadas), 'resultados': resultados}, status=codigo)
+
+class DisponibilidadeAPIView(APIView):
+    """
+    Retorna os próximos horários livres da grade de atendimento.
+    Parâmetros: `medico`, `clinica`, `especialidade`, `from`, `to` e `limit`.
+    Sem `medico`, a busca cobre todos os médicos (da especialidade, se informada).
+    """
+    permission_classes = [IsAuthenticated]
+    LIMITE_PADRAO = 10
+    LIMITE_MAXIMO = 100
+    JANELA_PADRAO = timedelta(days=30)
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            limite = min(int(params.get('limit', self.LIMITE_PADRAO)), self.LIMITE_MAXIMO)
+            medico_id = int(params['medico']) if params.get('medico') else None
+            clinica_id = int(params['clinica']) if params.get('clinica') else None
+        except ValueError:
+            return Response(
+                {"error": "Os parâmetros 'limit', 'medico' e 'clinica' devem ser números."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        inicio = timezone.now()
+        if params.get('from'):
+            inicio, _ = interpretar_limite(params['from'], 'from')
+        if params.get('to'):
+            fim, somente_data = interpretar_limite(params['to'], 'to')
+            if somente_data:
+                fim += timedelta(days=1)
+        else:
+            fim = max(inicio, timezone.now()) + self.JANELA_PADRAO
+
+        slots = horarios_livres(
+            inicio, fim, max(limite, 1),
+            medico_id=medico_id,
+            clinica_id=clinica_id,
+            especialidade=params.get('especialidade'),
+        )
+        return Response(SlotDisponivelSerializer(slots, many=True).data, status=status.HTTP_200_OK)
+
 # -----------------------------------------------------------------------------
 # Views para a atualização de status e pagamento
 # -----------------------------------------------------------------------------
@@ -158,25 +300,16 @@ class ConsultaStatusUpdateView(APIView):
         consulta = get_object_or_404(Consulta.objects.all(), pk=pk)
         novo_status = request.data.get('status_atual')
 
-        if not novo_status or novo_status not in [choice[0] for choice in Consulta.STATUS_CONSULTA_CHOICES]:
+        if not novo_status or not status_valido(novo_status):
             return Response(
                 {"error": "O campo 'status_atual' com um valor válido é obrigatório."},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         try:
-            with transaction.atomic():
-                status_anterior = consulta.status_atual
-                if consulta.status_atual != novo_status:
-                    consulta.status_atual = novo_status
-                    consulta.save()
-
-                    ConsultaStatusLog.objects.create(
-                        consulta=consulta,
-                        status_novo=consulta.status_atual,
-                        pessoa=self.request.user
-                    )
-                
+            mudar_status(consulta, novo_status, request.user)
+        except TransicaoInvalida as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -184,12 +317,74 @@ class ConsultaStatusUpdateView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class ConsultaStatusLoteAPIView(APIView):
+    """
+    Muda o status de várias consultas numa única requisição.
+    Recebe `{"ids": [...], "status_atual": "CONFIRMADA", "motivo": "..."}`
+    (o motivo é opcional e vai para o log) e responde com o resultado de
+    cada consulta, na ordem do envio.
+    """
+    permission_classes = [IsMedicoOrSecretaria]
+    LIMITE_LOTE = 500
+
+    def post(self, request):
+        dados = request.data if isinstance(request.data, dict) else {}
+        ids = dados.get('ids')
+        novo_status = dados.get('status_atual')
+
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+            return Response(
+                {"error": "Envie a lista de ids das consultas no campo 'ids'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ids) > self.LIMITE_LOTE:
+            return Response(
+                {"error": f"O lote aceita no máximo {self.LIMITE_LOTE} consultas."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not novo_status or not status_valido(novo_status):
+            return Response(
+                {"error": "O campo 'status_atual' com um valor válido é obrigatório."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        motivo = dados.get('motivo')
+        descricao = f"{novo_status} - Motivo: {motivo}" if motivo else None
+        ids = list(dict.fromkeys(ids))
+        try:
+            alteradas, inalteradas, erros = mudar_status_em_lote(
+                consultas_do_usuario(request.user), ids, novo_status, request.user, descricao
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        alteradas, inalteradas = set(alteradas), set(inalteradas)
+        resultados = []
+        for pk in ids:
+            if pk in alteradas:
+                resultados.append({'id': pk, 'status': 'alterada'})
+            elif pk in inalteradas:
+                resultados.append({'id': pk, 'status': 'inalterada'})
+            else:
+                resultados.append({'id': pk, 'error': erros[pk]})
+
+        if not erros:
+            codigo = status.HTTP_200_OK
+        elif alteradas or inalteradas:
+            codigo = status.HTTP_207_MULTI_STATUS
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response({'alteradas': len(alteradas), 'resultados': resultados}, status=codigo)
+
+
 class PagamentoUpdateView(APIView):
     permission_classes = [IsMedicoOrSecretaria]
 
     def put(self, request, pk):
         consulta = get_object_or_404(Consulta.objects.all(), pk=pk)
         pagamento = get_object_or_404(Pagamento.objects.all(), consulta=consulta)
+        # O resumo financeiro (sinal do pagamento) lê a clínica, o médico e o dia da consulta
+        pagamento.consulta = consulta
 
         if pagamento.status == 'PAGO':
             return Response(
@@ -252,24 +447,110 @@ class FinalizarConsultaAPIView(APIView):
                     defaults={'conteudo': conteudo_anotacao}
                 )
 
-                # 2. Atualiza o status da consulta
-                if consulta.status_atual != STATUS_CONSULTA_CONCLUIDA:
-                    status_anterior = consulta.status_atual
-                    consulta.status_atual = STATUS_CONSULTA_CONCLUIDA
-                    consulta.save()
-
-                    # 3. Cria um log da mudança de status
-                    ConsultaStatusLog.objects.create(
-                        consulta=consulta,
-                        status_novo=STATUS_CONSULTA_CONCLUIDA,
-                        pessoa=request.user
-                    )
+                # 2. Atualiza o status da consulta e cria o log da mudança
+                mudar_status(consulta, STATUS_CONSULTA_CONCLUIDA, request.user)
             
             serializer = ConsultaSerializer(consulta)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+        except TransicaoInvalida as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"error": f"Ocorreu um erro ao finalizar a consulta: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+class ConsultaExportacaoAPIView(APIView):
+    """
+    Exporta as consultas visíveis ao usuário, com pagamento, paciente e
+    médico, em CSV ou NDJSON: `?formato=csv|ndjson&mes=2025-03` (ou `from`/`to`).
+    A resposta é transmitida em streaming a partir de um cursor no banco.
+    """
+    permission_classes = [IsMedicoOrSecretaria]
+
+    def get(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response(
+                {"error": f"Formato inválido. Use um de: {', '.join(FORMATOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        consultas = filtrar_janela_de_datas(consultas_do_usuario(request.user), request)
+        mes = request.query_params.get('mes')
+        if mes:
+            try:
+                inicio, fim = intervalo_do_mes(mes)
+            except ValueError:
+                return Response(
+                    {"error": "O parâmetro 'mes' deve estar no formato AAAA-MM."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            consultas = consultas.filter(data_hora__gte=inicio, data_hora__lt=fim)
+
+        content_type, extensao = FORMATOS[formato]
+        response = StreamingHttpResponse(exportar(consultas, formato), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="consultas-{mes or "periodo"}.{extensao}"'
+        return response
+
+
+class RelatorioFinanceiroAPIView(APIView):
+    """
+    Faturamento e recebimento de um mês (`?ano=2025&mes=3`) ou de um ano
+    (`?ano=2025`), lidos dos resumos financeiros diários. `?agrupar=` aceita
+    dia, mes, clinica ou medico (padrão: dia para um mês, mes para um ano).
+    Médicos veem os seus números, secretárias os da sua clínica e
+    administradores todos, com filtros opcionais `?clinica=` e `?medico=`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        resumos = ResumoFinanceiroDiario.objects.all()
+        if user.user_type == 'MEDICO':
+            resumos = resumos.filter(medico=user)
+        elif user.user_type == 'SECRETARIA':
+            try:
+                resumos = resumos.filter(clinica_id=user.perfil_secretaria.clinica_id)
+            except AttributeError:
+                resumos = resumos.none()
+        elif not (user.is_staff or user.user_type == 'ADMIN'):
+            return Response(
+                {"error": "Você não tem permissão para ver o relatório financeiro."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            ano = int(request.query_params.get('ano'))
+            mes = request.query_params.get('mes')
+            if mes:
+                mes = int(mes)
+                inicio = date(ano, mes, 1)
+                fim = date(ano + 1, 1, 1) if mes == 12 else date(ano, mes + 1, 1)
+            else:
+                inicio, fim = date(ano, 1, 1), date(ano + 1, 1, 1)
+            for filtro in ('clinica', 'medico'):
+                if request.query_params.get(filtro):
+                    resumos = resumos.filter(**{f'{filtro}_id': int(request.query_params[filtro])})
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Informe 'ano' (e opcionalmente 'mes', 'clinica' e 'medico') como números válidos."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        agrupar = request.query_params.get('agrupar') or ('dia' if mes else 'mes')
+        if agrupar not in AGRUPAMENTOS:
+            return Response(
+                {"error": f"Agrupamento inválido. Use um de: {', '.join(AGRUPAMENTOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        totais, grupos = relatorio(resumos, inicio, fim, agrupar)
+        return Response({
+            'inicio': inicio,
+            'fim': fim,
+            'agrupamento': agrupar,
+            'totais': totais,
+            'grupos': grupos,
+        }, status=status.HTTP_200_OK)
@@ -9,4 +9,10 @@ pip install -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Create the table used by the shared cache (no-op if it already exists)
+python manage.py createcachetable
+
+# Extend the availability grid (SlotAgenda); also schedule it daily (see README)
+python manage.py gerar_slots
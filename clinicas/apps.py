@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ClinicasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinicas'
+
+
+    def ready(self):
+        # Invalida o cache das tabelas de referência a cada escrita
+        import clinicas.signals
@@ -0,0 +1,74 @@
+# clinicas/cache.py
+"""
+Cache das tabelas de referência (Estado, Cidade, TipoClinica).
+
+Cada tabela tem uma versão guardada, sem expiração, no cache partilhado do
+Django (ver CACHES e medlink_core.cache.versao). As respostas já serializadas ficam num LRU em memória de cada
+processo, indexado pela versão: uma escrita incrementa a versão (sinais em
+clinicas.signals) e as entradas antigas deixam de ser encontradas nos outros
+workers. Se o cache for por processo (LocMem), a versão não chega aos demais:
+o LRU é ignorado e cada requisição recalcula a lista.
+
+O ETag é o hash da própria resposta, não da versão: um contador que volta a 1
+após um restart, ou que difere entre processos, não gera um 304 falso.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from medlink_core.cache import cache_partilhado, incrementar_versao, versao as versao_da_chave
+from medlink_core.renderers import dumps
+
+MAXIMO_ENTRADAS = 512
+
+_entradas = OrderedDict()
+_lock = threading.Lock()
+
+
+def _chave_da_versao(modelo):
+    return f'clinicas:referencia:versao:{modelo._meta.label_lower}'
+
+
+def versao(modelo):
+    return versao_da_chave(_chave_da_versao(modelo))
+
+
+def invalidar_referencias(*modelos):
+    for modelo in modelos:
+        incrementar_versao(_chave_da_versao(modelo))
+
+
+def etag_de(dados):
+    return f'"{hashlib.md5(dumps(dados)).hexdigest()}"'
+
+
+def obter(modelo, chave, calcular):
+    """
+    Retorna `(dados, etag)` da consulta identificada por `chave`, calculando
+    com `calcular()` apenas quando a versão da tabela mudou.
+    """
+    if not cache_partilhado():
+        dados = calcular()
+        return dados, etag_de(dados)
+
+    versao_atual = versao(modelo)
+    identificador = (modelo._meta.label_lower, chave)
+    with _lock:
+        entrada = _entradas.get(identificador)
+        if entrada is not None and entrada[0] == versao_atual:
+            _entradas.move_to_end(identificador)
+            return entrada[1], entrada[2]
+
+    dados = calcular()
+    etag = etag_de(dados)
+    with _lock:
+        _entradas[identificador] = (versao_atual, dados, etag)
+        _entradas.move_to_end(identificador)
+        while len(_entradas) > MAXIMO_ENTRADAS:
+            _entradas.popitem(last=False)
+    return dados, etag
+
+
+def limpar():
+    with _lock:
+        _entradas.clear()
@@ -1,60 +1,155 @@
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import requests
-from django.core.management.base import BaseCommand
-from clinicas.models import Estado, Cidade, Clinica
-from agendamentos.models import Consulta # <<<---- IMPORTE O MODELO CONSULTA
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from clinicas.cache import invalidar_referencias
+from clinicas.models import Estado, Cidade
+from medlink_core.texto import normalizar_texto
+
+# Snapshot completo (um JSON por linha, {"uf", "estado", "cidade"}), gerado com
+# `popular_localidades --ibge --salvar-snapshot clinicas/dados/localidades.jsonl.gz`.
+# Enquanto ele não existir, o comando busca os dados na API do IBGE.
+SNAPSHOT_PADRAO = Path(__file__).resolve().parents[2] / 'dados' / 'localidades.jsonl.gz'
+URL_ESTADOS = 'https://servicodados.ibge.gov.br/api/v1/localidades/estados?orderBy=nome'
+URL_CIDADES = 'https://servicodados.ibge.gov.br/api/v1/localidades/estados/{uf}/municipios'
+
 
 class Command(BaseCommand):
-    help = 'Popula o banco de dados com os estados e cidades do Brasil utilizando a API do IBGE.'
+    help = (
+        'Carrega estados e cidades do Brasil a partir do snapshot completo (se existir) ou da API do IBGE. '
+        'Só insere o que falta e atualiza nomes de estados alterados; nada é apagado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--arquivo', default=getattr(settings, 'LOCALIDADES_SNAPSHOT', None),
+            help='Snapshot JSON Lines (pode ser .gz). Padrão: o snapshot completo do projeto, se existir.'
+        )
+        parser.add_argument('--ibge', action='store_true', help='Busca os dados na API do IBGE.')
+        parser.add_argument('--concorrencia', type=int, default=8, help='Requisições simultâneas ao IBGE.')
+        parser.add_argument('--salvar-snapshot', help='Com --ibge, grava os dados obtidos neste arquivo.')
+        parser.add_argument('--lote', type=int, default=2000, help='Cidades por lote de inserção.')
 
     def handle(self, *args, **options):
         self.stdout.write(self.style.HTTP_INFO('Iniciando o processo de popular estados e cidades...'))
 
-        # Limpando dados existentes para evitar duplicatas
-        if Cidade.objects.exists() or Estado.objects.exists() or Clinica.objects.exists() or Consulta.objects.exists():
-            self.stdout.write(self.style.WARNING('Limpando tabelas de Consulta, Clinica, Cidade e Estado existentes...'))
-            
-            # A ORDEM IMPORTA:
-            Consulta.objects.all().delete() # 1. Apaga as consultas
-            Clinica.objects.all().delete()  # 2. Apaga as clínicas
-            Cidade.objects.all().delete()   # 3. Apaga as cidades
-            Estado.objects.all().delete()   # 4. Apaga os estados
-
-        # URL da API de estados do IBGE
-        url_estados = 'https://servicodados.ibge.gov.br/api/v1/localidades/estados?orderBy=nome'
-        
-        try:
-            # (O restante do código permanece exatamente o mesmo)
-            response_estados = requests.get(url_estados)
-            response_estados.raise_for_status()
-            estados = response_estados.json()
-
-            self.stdout.write(f'Encontrados {len(estados)} estados. Cadastrando...')
-
-            for estado_data in estados:
-                estado_obj, created = Estado.objects.get_or_create(
-                    uf=estado_data['sigla'],
-                    defaults={'nome': estado_data['nome']}
-                )
-                
-                if created:
-                    self.stdout.write(self.style.SUCCESS(f'Estado "{estado_obj.nome}" cadastrado.'))
-                
-                url_cidades = f'https://servicodados.ibge.gov.br/api/v1/localidades/estados/{estado_obj.uf}/municipios'
-                response_cidades = requests.get(url_cidades)
-                response_cidades.raise_for_status()
-                cidades = response_cidades.json()
-
-                cidades_para_criar = []
-                for cidade_data in cidades:
-                    cidades_para_criar.append(
-                        Cidade(nome=cidade_data['nome'], estado=estado_obj)
-                    )
-                
-                Cidade.objects.bulk_create(cidades_para_criar)
-                self.stdout.write(f'  -> {len(cidades)} cidades cadastradas para {estado_obj.uf}.')
-
-        except requests.RequestException as e:
-            self.stdout.write(self.style.ERROR(f'Erro ao acessar a API do IBGE: {e}'))
-            return
-
-        self.stdout.write(self.style.SUCCESS('Processo finalizado com sucesso!'))
\ No newline at end of file
+        arquivo = options['arquivo']
+        if arquivo is None and not options['ibge']:
+            if SNAPSHOT_PADRAO.exists():
+                arquivo = SNAPSHOT_PADRAO
+            else:
+                self.stdout.write(f'Snapshot {SNAPSHOT_PADRAO.name} não encontrado; usando a API do IBGE.')
+
+        if arquivo is None or options['ibge']:
+            try:
+                registros = self.buscar_no_ibge(options['concorrencia'])
+            except requests.RequestException as e:
+                raise CommandError(f'Erro ao acessar a API do IBGE: {e}')
+            if options['salvar_snapshot']:
+                self.salvar_snapshot(registros, options['salvar_snapshot'])
+        else:
+            registros = self.ler_snapshot(arquivo)
+
+        with transaction.atomic():
+            estados_criados, estados_atualizados, cidades_criadas, total = self.carregar(registros, options['lote'])
+        # bulk_create não dispara sinais: invalida o cache das tabelas de referência
+        invalidar_referencias(Estado, Cidade)
+
+        self.stdout.write(
+            f'{total} cidades lidas: {cidades_criadas} novas; '
+            f'{estados_criados} estados novos e {estados_atualizados} atualizados.'
+        )
+        self.stdout.write(self.style.SUCCESS('Processo finalizado com sucesso!'))
+
+    def ler_snapshot(self, caminho):
+        """ Lê o snapshot linha a linha, sem carregá-lo inteiro na memória. """
+        caminho = Path(caminho)
+        if not caminho.exists():
+            raise CommandError(f'Snapshot não encontrado: {caminho}')
+        abrir = gzip.open if caminho.suffix == '.gz' else open
+        with abrir(caminho, 'rt', encoding='utf-8') as arquivo:
+            for numero, linha in enumerate(arquivo, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                    yield registro['uf'], registro['estado'], registro['cidade']
+                except (ValueError, KeyError) as e:
+                    raise CommandError(f'Linha {numero} inválida em {caminho}: {e}')
+
+    def buscar_no_ibge(self, concorrencia):
+        """ Uma requisição para os estados e as dos municípios em paralelo. """
+        response = requests.get(URL_ESTADOS, timeout=30)
+        response.raise_for_status()
+        estados = [(estado['sigla'], estado['nome']) for estado in response.json()]
+        self.stdout.write(f'Encontrados {len(estados)} estados. Buscando municípios...')
+
+        def municipios(uf):
+            resposta = requests.get(URL_CIDADES.format(uf=uf), timeout=30)
+            resposta.raise_for_status()
+            return [cidade['nome'] for cidade in resposta.json()]
+
+        with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as executor:
+            por_estado = executor.map(municipios, [uf for uf, _ in estados])
+            return [
+                (uf, nome, cidade)
+                for (uf, nome), cidades in zip(estados, por_estado)
+                for cidade in cidades
+            ]
+
+    def salvar_snapshot(self, registros, caminho):
+        abrir = gzip.open if str(caminho).endswith('.gz') else open
+        with abrir(caminho, 'wt', encoding='utf-8') as arquivo:
+            for uf, estado, cidade in registros:
+                arquivo.write(json.dumps({'uf': uf, 'estado': estado, 'cidade': cidade}, ensure_ascii=False))
+                arquivo.write('\n')
+        self.stdout.write(f'Snapshot gravado em {caminho}.')
+
+    def carregar(self, registros, tamanho_lote):
+        """
+        Upsert incremental: estados por UF (o nome é atualizado se mudou) e
+        cidades por (nome, estado), inserindo só as que ainda não existem.
+        """
+        estados = {estado.uf: estado for estado in Estado.objects.all()}
+        estados_criados = estados_atualizados = cidades_criadas = total = 0
+
+        def resolver_estado(uf, nome):
+            nonlocal estados_criados, estados_atualizados
+            estado = estados.get(uf)
+            if estado is None:
+                estado = estados[uf] = Estado.objects.create(uf=uf, nome=nome)
+                estados_criados += 1
+            elif estado.nome != nome:
+                estado.nome = nome
+                estado.save(update_fields=['nome'])
+                estados_atualizados += 1
+            return estado
+
+        def gravar(lote):
+            # Uma query descobre quais cidades do lote já existem
+            existentes = set(Cidade.objects.filter(
+                estado_id__in={estado_id for _, estado_id in lote},
+                nome__in={nome for nome, _ in lote},
+            ).values_list('nome', 'estado_id'))
+            novas = [
+                Cidade(nome=nome, nome_normalizado=normalizar_texto(nome), estado_id=estado_id)
+                for nome, estado_id in dict.fromkeys(lote) if (nome, estado_id) not in existentes
+            ]
+            Cidade.objects.bulk_create(novas, ignore_conflicts=True)
+            return len(novas)
+
+        lote = []
+        for uf, nome_estado, cidade in registros:
+            total += 1
+            lote.append((cidade, resolver_estado(uf, nome_estado).pk))
+            if len(lote) >= tamanho_lote:
+                cidades_criadas += gravar(lote)
+                lote = []
+        if lote:
+            cidades_criadas += gravar(lote)
+        return estados_criados, estados_atualizados, cidades_criadas, total
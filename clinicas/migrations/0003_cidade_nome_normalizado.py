@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+from medlink_core.texto import normalizar_texto
+
+
+def preencher_nome_normalizado(apps, schema_editor):
+    Cidade = apps.get_model('clinicas', 'Cidade')
+    pendentes = []
+    for cidade in Cidade.objects.only('pk', 'nome').iterator(chunk_size=2000):
+        cidade.nome_normalizado = normalizar_texto(cidade.nome)
+        pendentes.append(cidade)
+        if len(pendentes) >= 2000:
+            Cidade.objects.bulk_update(pendentes, ['nome_normalizado'])
+            pendentes = []
+    if pendentes:
+        Cidade.objects.bulk_update(pendentes, ['nome_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicas', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cidade',
+            name='nome_normalizado',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(preencher_nome_normalizado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cidade',
+            index=models.Index(fields=['estado', 'nome_normalizado'], name='cidade_estado_busca_idx', opclasses=['', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='cidade',
+            index=models.Index(fields=['nome_normalizado'], name='cidade_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from users.models import User
+from medlink_core.texto import normalizar_texto
 
 class Estado(models.Model):
     """
@@ -21,12 +22,32 @@ class Cidade(models.Model):
     Tabela de referência para as cidades, vinculadas a um estado.
     """
     nome = models.CharField(max_length=100)
+    # Nome em minúsculas e sem acentos para a busca por prefixo (?q=sao -> São Paulo).
+    # Preenchido no save(); quem usa bulk_create deve preenchê-lo com normalizar_texto().
+    nome_normalizado = models.CharField(max_length=100, editable=False, default='')
     estado = models.ForeignKey(Estado, on_delete=models.RESTRICT, verbose_name=_("Estado"))
 
     class Meta:
         verbose_name = _("Cidade")
         verbose_name_plural = _("Cidades")
         unique_together = ('nome', 'estado') # Garante que não haja cidades com o mesmo nome no mesmo estado
+        indexes = [
+            # varchar_pattern_ops permite LIKE 'prefixo%' no PostgreSQL com qualquer collation
+            models.Index(
+                fields=['estado', 'nome_normalizado'], name='cidade_estado_busca_idx',
+                opclasses=['', 'varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['nome_normalizado'], name='cidade_busca_idx', opclasses=['varchar_pattern_ops'],
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.nome_normalizado = normalizar_texto(self.nome)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'nome_normalizado'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nome} - {self.estado.uf}"
@@ -9,7 +9,7 @@ class EstadoSerializer(serializers.ModelSerializer):
 class CidadeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cidade
-        fields = '__all__'
+        exclude = ['nome_normalizado']
 
 class TipoClinicaSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,20 @@
+# clinicas/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidar_referencias
+from .models import Estado, Cidade, TipoClinica
+
+
+@receiver(post_save, sender=Estado)
+@receiver(post_delete, sender=Estado)
+@receiver(post_save, sender=Cidade)
+@receiver(post_delete, sender=Cidade)
+@receiver(post_save, sender=TipoClinica)
+@receiver(post_delete, sender=TipoClinica)
+def invalidar_cache_de_referencia(sender, **kwargs):
+    """ Qualquer escrita numa tabela de referência muda a sua versão no cache. """
+    invalidar_referencias(sender)
+    if sender is Estado:
+        # As cidades são servidas com a UF do estado
+        invalidar_referencias(Cidade)
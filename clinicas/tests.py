@@ -1,3 +1,154 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from medlink_core.tests import cache_de_teste
+
+from . import cache as cache_referencias
+from .management.commands import popular_localidades
+
+from .models import Estado, Cidade, TipoClinica, Clinica
+
+
+@cache_de_teste()
+class PopularLocalidadesTests(TestCase):
+    CAPITAIS = str(Path(popular_localidades.__file__).resolve().parents[2] / 'dados' / 'capitais.jsonl')
+
+    def popular(self, *args):
+        call_command('popular_localidades', *args, stdout=StringIO())
+
+    def test_sem_snapshot_completo_busca_no_ibge(self):
+        registros = [('TO', 'Tocantins', 'Palmas'), ('TO', 'Tocantins', 'Araguaína')]
+        with mock.patch.object(popular_localidades, 'SNAPSHOT_PADRAO', Path('/nao/existe.jsonl.gz')), \
+                mock.patch.object(popular_localidades.Command, 'buscar_no_ibge', return_value=registros) as ibge:
+            self.popular()
+        ibge.assert_called_once()
+        self.assertEqual(Cidade.objects.filter(estado__uf='TO').count(), 2)
+
+    def test_snapshot_e_incremental_e_preserva_dados(self):
+        self.popular('--arquivo', self.CAPITAIS)
+        self.assertEqual(Estado.objects.count(), 27)
+        palmas = Cidade.objects.get(nome='Palmas', estado__uf='TO')
+        clinica = Clinica.objects.create(
+            nome_fantasia='Clínica Central', cnpj='11222333000181', cidade=palmas,
+            tipo_clinica=TipoClinica.objects.create(descricao='Consultório'),
+        )
+
+        self.popular('--arquivo', self.CAPITAIS)
+        self.assertEqual(Cidade.objects.filter(nome='Palmas').count(), 1)
+        self.assertTrue(Clinica.objects.filter(pk=clinica.pk, cidade=palmas).exists())
+
+    def test_insere_so_as_cidades_novas_e_atualiza_o_estado(self):
+        self.popular('--arquivo', self.CAPITAIS)
+        with tempfile.TemporaryDirectory() as pasta:
+            arquivo = Path(pasta) / 'localidades.jsonl'
+            arquivo.write_text('\n'.join(json.dumps(registro) for registro in [
+                {'uf': 'TO', 'estado': 'Estado do Tocantins', 'cidade': 'Palmas'},
+                {'uf': 'TO', 'estado': 'Estado do Tocantins', 'cidade': 'Araguaína'},
+            ]), encoding='utf-8')
+            with self.assertNumQueries(6):
+                # savepoint, estados, UPDATE do nome, cidades existentes, INSERT, release
+                self.popular('--arquivo', str(arquivo))
+
+        self.assertEqual(Estado.objects.get(uf='TO').nome, 'Estado do Tocantins')
+        self.assertEqual(Cidade.objects.filter(estado__uf='TO').count(), 2)
+        self.assertEqual(Cidade.objects.count(), 28)
+
+
+@cache_de_teste()
+class ReferenciasCacheadasTests(TestCase):
+    def setUp(self):
+        cache_referencias.limpar()
+        self.client = APIClient()
+        self.sp = Estado.objects.create(nome='São Paulo', uf='SP')
+        self.pr = Estado.objects.create(nome='Paraná', uf='PR')
+        for nome in ['São Paulo', 'São Carlos', 'Santos', 'Sorocaba']:
+            Cidade.objects.create(nome=nome, estado=self.sp)
+        Cidade.objects.create(nome='São José dos Pinhais', estado=self.pr)
+
+    def test_busca_por_prefixo_ignora_acentos_e_filtra_por_estado(self):
+        response = self.client.get('/api/clinicas/cidades/buscar/', {'q': 'SAO', 'estado': 'sp'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['nome'] for c in response.data], ['São Carlos', 'São Paulo'])
+        self.assertEqual(response.data[0]['uf'], 'SP')
+
+        response = self.client.get('/api/clinicas/cidades/buscar/', {'q': 'são', 'limit': 1})
+        self.assertEqual(len(response.data), 1)
+
+        response = self.client.get('/api/clinicas/cidades/buscar/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_lista_vem_do_cache_com_etag_e_e_invalidada_na_escrita(self):
+        response = self.client.get('/api/clinicas/cidades/', {'estado': 'SP'})
+        self.assertEqual(len(response.data), 4)
+        self.assertNotIn('nome_normalizado', response.data[0])
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/clinicas/cidades/', {'estado': 'SP'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Cidade.objects.create(nome='Campinas', estado=self.sp)
+        response = self.client.get('/api/clinicas/cidades/', {'estado': 'SP'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Campinas', [c['nome'] for c in response.data])
+
+    def test_etag_depende_dos_dados_e_nao_da_versao(self):
+        etag = self.client.get('/api/clinicas/estados/')['ETag']
+        # Versão zerada (restart, cache despejado): a mesma lista mantém o ETag
+        cache.clear()
+        cache_referencias.limpar()
+        self.assertEqual(self.client.get('/api/clinicas/estados/')['ETag'], etag)
+
+        # Escrita que não passou por este processo (sem sinal): o ETag não pode repetir
+        Estado.objects.filter(pk=self.pr.pk).update(nome='Estado do Paraná')
+        cache_referencias.limpar()
+        response = self.client.get('/api/clinicas/estados/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_por_processo_nao_serve_listas_antigas(self):
+        self.client.get('/api/clinicas/estados/')
+        # Outro worker gravou: este não recebe a nova versão, então não pode ter guardado a lista
+        Estado.objects.filter(pk=self.pr.pk).update(nome='Estado do Paraná')
+        nomes = [estado['nome'] for estado in self.client.get('/api/clinicas/estados/').data]
+        self.assertIn('Estado do Paraná', nomes)
+
+    def test_renomear_cidade_atualiza_o_nome_normalizado(self):
+        cidade = Cidade.objects.get(nome='Santos')
+        cidade.nome = 'Santo André'
+        cidade.save(update_fields=['nome'])
+        cidade.refresh_from_db()
+        self.assertEqual(cidade.nome_normalizado, 'santo andre')
+
+
+class VersaoDasReferenciasTests(TestCase):
+    """ Com o cache padrão (DatabaseCache), cujo incr regrava a chave com o timeout padrão. """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_versao_nao_expira_nem_recomeca(self):
+        antes = cache_referencias.versao(Estado)
+        cache_referencias.invalidar_referencias(Estado)
+        depois = cache_referencias.versao(Estado)
+        self.assertNotEqual(antes, depois)
+
+        daqui_a_uma_hora = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.core.cache.backends.db.tz_now', return_value=daqui_a_uma_hora):
+            self.assertEqual(cache_referencias.versao(Estado), depois)
+
+        # Despejada: a versão nova não coincide com nenhuma já vista
+        cache.clear()
+        self.assertNotIn(cache_referencias.versao(Estado), {antes, depois})
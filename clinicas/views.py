@@ -1,20 +1,100 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from agendamentos.condicional import aplicar_validadores, resposta_condicional
+from medlink_core.texto import normalizar_texto
+from . import cache as cache_referencias
 from .models import Clinica, Cidade, Estado, TipoClinica
 from .serializers import ClinicaSerializer, CidadeSerializer, EstadoSerializer, TipoClinicaSerializer
 
-class EstadoViewSet(viewsets.ModelViewSet):
+
+class ReferenciaCacheadaMixin:
+    """
+    Listagem servida do cache versionado das tabelas de referência, com ETag.
+    Subclasses podem sobrescrever `chave_da_listagem` para incluir filtros.
+    """
+
+    def chave_da_listagem(self, request):
+        return 'lista'
+
+    def responder_do_cache(self, request, chave, calcular):
+        dados, etag = cache_referencias.obter(self.queryset.model, chave, calcular)
+        nao_modificada = resposta_condicional(request, etag)
+        if nao_modificada is not None:
+            return nao_modificada
+        return aplicar_validadores(Response(dados), etag)
+
+    def list(self, request, *args, **kwargs):
+        def calcular():
+            queryset = self.filter_queryset(self.get_queryset())
+            return list(self.get_serializer(queryset, many=True).data)
+        return self.responder_do_cache(request, self.chave_da_listagem(request), calcular)
+
+
+class EstadoViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = Estado.objects.all()
     serializer_class = EstadoSerializer
 
-class CidadeViewSet(viewsets.ModelViewSet):
+class CidadeViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = Cidade.objects.all()
     serializer_class = CidadeSerializer
+    LIMITE_BUSCA_PADRAO = 20
+    LIMITE_BUSCA_MAXIMO = 100
+
+    @staticmethod
+    def filtrar_por_estado(queryset, estado):
+        """ `?estado=` aceita a UF (SP) ou o id do estado. """
+        if not estado:
+            return queryset
+        if estado.isdigit():
+            return queryset.filter(estado_id=int(estado))
+        return queryset.filter(estado__uf=estado.upper())
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = self.filtrar_por_estado(queryset, self.request.query_params.get('estado'))
+        return queryset.order_by('nome')
+
+    def chave_da_listagem(self, request):
+        return f"lista|{(request.query_params.get('estado') or '').upper()}"
+
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """
+        Busca por prefixo insensível a acentos: `?estado=SP&q=sao&limit=20`.
+        Usa o índice sobre (estado, nome_normalizado) e devolve as primeiras N cidades.
+        """
+        termo = normalizar_texto(request.query_params.get('q', ''))
+        if not termo:
+            return Response(
+                {"error": "O parâmetro 'q' é obrigatório."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limite = int(request.query_params.get('limit', self.LIMITE_BUSCA_PADRAO))
+        except ValueError:
+            limite = self.LIMITE_BUSCA_PADRAO
+        limite = max(1, min(limite, self.LIMITE_BUSCA_MAXIMO))
+        estado = (request.query_params.get('estado') or '').upper()
+
+        def calcular():
+            cidades = self.filtrar_por_estado(
+                Cidade.objects.filter(nome_normalizado__startswith=termo), estado
+            ).order_by('nome_normalizado', 'id')[:limite]
+            return [
+                {'id': cidade_id, 'nome': nome, 'estado': estado_id, 'uf': uf}
+                for cidade_id, nome, estado_id, uf in cidades.values_list('id', 'nome', 'estado_id', 'estado__uf')
+            ]
+
+        return self.responder_do_cache(request, f'buscar|{estado}|{termo}|{limite}', calcular)
 
-class TipoClinicaViewSet(viewsets.ModelViewSet):
+class TipoClinicaViewSet(ReferenciaCacheadaMixin, viewsets.ModelViewSet):
     queryset = TipoClinica.objects.all()
     serializer_class = TipoClinicaSerializer
 
 class ClinicaViewSet(viewsets.ModelViewSet):
     queryset = Clinica.objects.all()
     serializer_class = ClinicaSerializer
-    # Adicionar permissões aqui no futuro para restringir quem pode criar/editar
\ No newline at end of file
+    # Adicionar permissões aqui no futuro para restringir quem pode criar/editar
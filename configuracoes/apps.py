@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ConfiguracoesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'configuracoes'
+
+    def ready(self):
+        # Invalida o cache das configurações quando o singleton muda
+        import configuracoes.signals
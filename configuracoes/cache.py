@@ -0,0 +1,91 @@
+# configuracoes/cache.py
+"""
+Acesso em cache ao singleton SystemSettings.
+
+Cada processo guarda uma cópia das configurações junto com a versão em que
+ela foi lida. A versão vem do cache partilhado do Django (ver CACHES):
+salvar ou apagar o singleton a incrementa (sinais em configuracoes.signals)
+e todos os workers recarregam na próxima leitura. Com o cache quente, ler
+uma flag custa um `cache.get` e nenhuma query.
+
+Se o cache for por processo (LocMem), a versão não chega aos outros
+workers: o carimbo passa a ser o `updated_at` da linha, lido com uma query
+de uma coluna pela chave primária.
+"""
+import threading
+
+from django.db import transaction
+
+from medlink_core.cache import cache_partilhado, incrementar_versao, versao
+from .models import SystemSettings
+
+CHAVE_DA_VERSAO = 'configuracoes:system_settings:versao'
+
+_entrada = None  # (versao, configuracoes)
+_lock = threading.Lock()
+
+
+def _incrementar_versao():
+    incrementar_versao(CHAVE_DA_VERSAO)
+
+
+def versao_atual():
+    if cache_partilhado():
+        # Sem expiração; se despejada, volta com um valor que nenhuma cópia tem
+        return versao(CHAVE_DA_VERSAO)
+    return SystemSettings.objects.filter(pk=1).values_list('updated_at', flat=True).first()
+
+
+def invalidar():
+    """
+    Descarta a cópia deste processo e avisa os demais. A versão sobe de novo
+    no commit: um leitor que pegue a linha antiga antes disso não a guarda
+    com a versão final.
+    """
+    limpar()
+    _incrementar_versao()
+    transaction.on_commit(_incrementar_versao)
+
+
+def limpar():
+    global _entrada
+    with _lock:
+        _entrada = None
+
+
+def obter():
+    """
+    Retorna o SystemSettings em cache (criado com os valores padrão se ainda
+    não existir). A instância é partilhada: não a altere; para editar, leia
+    do banco.
+    """
+    global _entrada
+    versao = versao_atual()
+    with _lock:
+        entrada = _entrada
+    if entrada is not None and versao is not None and entrada[0] == versao:
+        return entrada[1]
+
+    configuracoes, criado = SystemSettings.objects.get_or_create(pk=1)
+    if criado:
+        # A criação acabou de subir a versão (sinal de post_save)
+        versao = versao_atual()
+    with _lock:
+        _entrada = (versao, configuracoes)
+    return configuracoes
+
+
+def auto_scheduling() -> bool:
+    return obter().auto_scheduling
+
+
+def email_notifications() -> bool:
+    return obter().email_notifications
+
+
+def two_factor_auth() -> bool:
+    return obter().two_factor_auth
+
+
+def reminder_hours_before() -> int:
+    return obter().reminder_hours_before
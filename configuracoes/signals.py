@@ -0,0 +1,13 @@
+# configuracoes/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidar
+from .models import SystemSettings
+
+
+@receiver(post_save, sender=SystemSettings)
+@receiver(post_delete, sender=SystemSettings)
+def invalidar_configuracoes(sender, **kwargs):
+    """ O singleton mudou: todos os processos devem recarregá-lo. """
+    invalidar()
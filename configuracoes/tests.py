@@ -1,3 +1,99 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from medlink_core.tests import cache_de_teste
+from users.models import User
+from . import cache as configuracoes
+from .models import SystemSettings
+
+
+@cache_de_teste()
+class ConfiguracoesEmCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        configuracoes.limpar()
+
+    def test_leitura_quente_sem_queries(self):
+        self.assertEqual(configuracoes.reminder_hours_before(), 24)
+        self.assertTrue(SystemSettings.objects.filter(pk=1).exists())
+        with self.assertNumQueries(0):
+            self.assertTrue(configuracoes.email_notifications())
+            self.assertFalse(configuracoes.auto_scheduling())
+
+    def test_salvar_invalida(self):
+        self.assertEqual(configuracoes.reminder_hours_before(), 24)
+        obj = SystemSettings.objects.get(pk=1)
+        obj.reminder_hours_before = 48
+        with self.captureOnCommitCallbacks(execute=True):
+            obj.save()
+        self.assertEqual(configuracoes.reminder_hours_before(), 48)
+
+    def test_versao_de_outro_processo_recarrega(self):
+        self.assertFalse(configuracoes.two_factor_auth())
+        # Outro processo gravou sem passar por este (a versão partilhada mudou)
+        SystemSettings.objects.filter(pk=1).update(two_factor_auth=True)
+        self.assertFalse(configuracoes.two_factor_auth())
+        cache.incr(configuracoes.CHAVE_DA_VERSAO)
+        self.assertTrue(configuracoes.two_factor_auth())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_sem_cache_partilhado_o_carimbo_vem_do_banco(self):
+        self.assertFalse(configuracoes.two_factor_auth())
+        # Outro worker salvou: a versão dele não chega aqui, mas o updated_at muda
+        atualizado = SystemSettings.objects.get(pk=1).updated_at.replace(year=2099)
+        SystemSettings.objects.filter(pk=1).update(two_factor_auth=True, updated_at=atualizado)
+        with self.assertNumQueries(2):
+            self.assertTrue(configuracoes.two_factor_auth())
+        # Sem mudança, uma query de carimbo e nenhuma recarga
+        with self.assertNumQueries(1):
+            self.assertTrue(configuracoes.two_factor_auth())
+
+    def test_api_le_do_cache_e_edita_no_banco(self):
+        admin = User.objects.create_user(
+            cpf='33333333333', email='admin@medlink.com', password='x', user_type='ADMIN', is_staff=True,
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        url = reverse('system_settings')
+        self.assertEqual(client.get(url).data['reminder_hours_before'], 24)
+
+        response = client.patch(url, {'reminder_hours_before': 12}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get(url).data['reminder_hours_before'], 12)
+
+
+class VersaoNoCachePadraoTests(TestCase):
+    """ Com o DatabaseCache padrão, cujo incr regrava a chave com o timeout padrão. """
+
+    def setUp(self):
+        cache.clear()
+        configuracoes.limpar()
+
+    def salvar_em_outro_worker(self, **campos):
+        # O save invalida a cópia deste processo; a de outro worker continua em memória
+        copia_do_outro_worker = configuracoes._entrada
+        obj = SystemSettings.objects.get(pk=1)
+        for campo, valor in campos.items():
+            setattr(obj, campo, valor)
+        obj.save()
+        configuracoes._entrada = copia_do_outro_worker
+
+    def test_versao_nao_expira_depois_de_salvar(self):
+        self.assertFalse(configuracoes.two_factor_auth())
+        self.salvar_em_outro_worker(two_factor_auth=True)
+
+        daqui_a_uma_hora = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.core.cache.backends.db.tz_now', return_value=daqui_a_uma_hora):
+            self.assertTrue(configuracoes.two_factor_auth())
+
+    def test_versao_despejada_nao_reaproveita_a_copia(self):
+        self.assertFalse(configuracoes.two_factor_auth())
+        self.salvar_em_outro_worker(two_factor_auth=True)
+        cache.delete(configuracoes.CHAVE_DA_VERSAO)
+        self.assertTrue(configuracoes.two_factor_auth())
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from . import cache as configuracoes_em_cache
 from .models import SystemSettings
 from .serializers import SystemSettingsSerializer
 from users.permissions import IsAdminOrReadOnly
@@ -14,7 +15,8 @@ class SystemSettingsView(APIView):
         return obj
 
     def get(self, request):
-        obj = self.get_object()
+        # Leitura pelo cache; a edição abaixo parte sempre do banco
+        obj = configuracoes_em_cache.obter()
         return Response(SystemSettingsSerializer(obj).data)
 
     def patch(self, request):
@@ -5,10 +5,14 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.utils import timezone
+from datetime import datetime
 
 from agendamentos.models import Consulta, ConsultaStatusLog
 from agendamentos.serializers import ConsultaSerializer
 from agendamentos.consts import STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO # <-- Importação corrigida
+from agendamentos.services import TransicaoInvalida, mudar_status
+from agendamentos.condicional import aplicar_validadores, calcular_validadores, resposta_condicional
 from users.permissions import IsMedicoUser
 from .models import Medico
 from .serializers import MedicoSerializer
@@ -35,12 +39,31 @@ class MedicoAgendaAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Filtra as consultas do médico para o mês e ano especificados
+        # Intervalo [início do mês, início do mês seguinte) sobre data_hora,
+        # que usa o índice (medico, data_hora) ao contrário de __year/__month
+        try:
+            inicio_mes = timezone.make_aware(datetime(year, month, 1))
+            fim_mes = timezone.make_aware(
+                datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+            )
+        except ValueError:
+            return Response(
+                {"error": "Os parâmetros 'year' e 'month' não formam uma data válida."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         consultas_do_mes = Consulta.objects.filter(
             medico=medico,
-            data_hora__year=year,
-            data_hora__month=month
-        ).select_related('paciente__user').order_by('data_hora')
+            data_hora__gte=inicio_mes,
+            data_hora__lt=fim_mes,
+        )
+
+        # Calendário inalterado: 304 sem carregar as consultas
+        etag = calcular_validadores(consultas_do_mes, chave=medico.pk)
+        nao_modificada = resposta_condicional(request, etag)
+        if nao_modificada is not None:
+            return nao_modificada
+
+        consultas_do_mes = consultas_do_mes.select_related('paciente__user').order_by('data_hora')
 
         # Agrupa as consultas por dia
         agenda_formatada = {}
@@ -56,7 +79,7 @@ class MedicoAgendaAPIView(APIView):
                 'paciente': consulta.paciente.nome_completo, # Acessa a property do modelo
             })
             
-        return Response(agenda_formatada, status=status.HTTP_200_OK)
+        return aplicar_validadores(Response(agenda_formatada, status=status.HTTP_200_OK), etag)
 
 
 # --- O RESTO DO FICHEIRO CONTINUA IGUAL ---
@@ -81,19 +104,12 @@ class SolicitarReagendamentoAPIView(UpdateAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        novo_status = STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO
-
-        # Altera o status da consulta
-        consulta.status_atual = novo_status
-        consulta.save()
+        # Altera o status da consulta e cria o registo no histórico para auditoria
+        try:
+            mudar_status(consulta, STATUS_CONSULTA_REAGENDAMENTO_SOLICITADO, request.user)
+        except TransicaoInvalida as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Cria um registo no histórico de status para auditoria
-        ConsultaStatusLog.objects.create(
-            consulta=consulta,
-            status_novo=novo_status,
-            pessoa=request.user
-        )
-        
         serializer = self.get_serializer(consulta)
         return Response(serializer.data)
 
@@ -141,8 +141,12 @@ class ApiService {
     );
 
     if (response.statusCode == 200) {
-      final List<dynamic> body = jsonDecode(utf8.decode(response.bodyBytes));
-      return body
+      // A API devolve a primeira página (mais recentes) em 'results'
+      final Map<String, dynamic> body = jsonDecode(
+        utf8.decode(response.bodyBytes),
+      );
+      final List<dynamic> results = body['results'];
+      return results
           .map((json) => consultas_model.Consulta.fromJson(json))
           .toList();
     } else {
@@ -450,23 +454,28 @@ class ApiService {
 
   // ✅ PACIENTES e MÉDICOS
   Future<List<Patient>> getPatients(String accessToken) async {
-    final url = Uri.parse("$baseUrl/api/pacientes/");
-    final response = await http.get(
-      url,
-      headers: {'Authorization': 'Bearer $accessToken'},
-    );
+    // A lista é paginada por cursor: segue o link 'next' até a última página
+    final List<Patient> patients = [];
+    Uri? url = Uri.parse("$baseUrl/api/pacientes/");
+    while (url != null) {
+      final response = await http.get(
+        url,
+        headers: {'Authorization': 'Bearer $accessToken'},
+      );
 
-    if (response.statusCode == 200) {
-      if (response.body.isEmpty || response.body == "[]") return [];
-      final List<dynamic> jsonList = json.decode(
+      if (response.statusCode != 200) {
+        throw Exception(
+          'Falha ao carregar pacientes (Status: ${response.statusCode})',
+        );
+      }
+      final Map<String, dynamic> body = json.decode(
         utf8.decode(response.bodyBytes),
       );
-      return jsonList.map((json) => Patient.fromJson(json)).toList();
-    } else {
-      throw Exception(
-        'Falha ao carregar pacientes (Status: ${response.statusCode})',
-      );
+      final List<dynamic> jsonList = body['results'];
+      patients.addAll(jsonList.map((json) => Patient.fromJson(json)));
+      url = body['next'] != null ? Uri.parse(body['next']) : null;
     }
+    return patients;
   }
 
   Future<List<Doctor>> getDoctors(String accessToken) async {
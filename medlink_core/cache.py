@@ -0,0 +1,45 @@
+# medlink_core/cache.py
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_partilhado(alias='default'):
+    """
+    Indica se o cache é visto por todos os processos. LocMem e Dummy vivem
+    na memória de cada worker: uma versão incrementada num deles não chega
+    aos outros, então quem depende disso para invalidar deve falhar fechado.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+def versao(chave):
+    """
+    Versão guardada em `chave`, usada para invalidar cópias em memória de
+    cada processo. Se a chave não existe (nunca criada ou despejada), semeia
+    um valor novo em vez de recomeçar de um número fixo: uma versão ausente
+    nunca coincide com uma que algum worker já tenha guardado.
+    """
+    atual = cache.get(chave)
+    if atual is None:
+        semente = time.time_ns()
+        cache.add(chave, semente, timeout=None)
+        atual = cache.get(chave)
+        if atual is None:
+            # DummyCache: cada leitura é uma versão nova, nada é reaproveitado
+            return semente
+    return atual
+
+
+def incrementar_versao(chave):
+    """ Muda a versão em `chave`; a chave nunca expira. """
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, time.time_ns(), timeout=None)
+    else:
+        # O incr do BaseCache (DatabaseCache, FileBasedCache) regrava a chave
+        # com o timeout padrão de 300s; sem isto a versão expiraria
+        cache.touch(chave, None)
@@ -0,0 +1,60 @@
+# medlink_core/renderers.py
+"""
+Renderer e parser JSON baseados no orjson.
+
+A saída é a mesma do JSONRenderer do DRF: datas, Decimal, UUID e textos
+traduzíveis passam pelo mesmo encoder (`encoders.JSONEncoder.default`),
+só que a serialização do resto corre em C. Sem o orjson instalado, ou
+quando o cliente pede indentação (`application/json; indent=4`, API
+navegável), usa a implementação padrão do DRF.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    # Datas passam pelo encoder do DRF para manter o formato ('Z', milissegundos)
+    OPCOES_ORJSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(dados):
+    """ Serializa `dados` em bytes JSON compactos, no mesmo formato do DRF. """
+    if orjson is None:
+        return JSONRenderer().render(dados)
+    saida = orjson.dumps(dados, default=_encoder.default, option=OPCOES_ORJSON)
+    # Como o DRF, escapa U+2028/U+2029 para a saída ser JavaScript válido
+    return saida.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class JSONRapidoRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # NaN/Infinity viram null em vez de erro (STRICT_JSON): a API não produz floats desses
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return dumps(data)
+
+
+class JSONRapidoParser(JSONParser):
+    renderer_class = JSONRapidoRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
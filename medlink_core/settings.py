@@ -60,9 +60,11 @@ INSTALLED_APPS = [
     'clinicas',
     'administrador',
     'configuracoes',
+    'notificacoes',
 ]
 
 MIDDLEWARE = [
+    'administrador.metricas.MetricasMiddleware', # Tempo por view (e Server-Timing para staff)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # Para servir ficheiros estáticos em produção
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -106,6 +108,19 @@ DATABASES = {
 }
 
 
+# Cache partilhado entre todos os workers: guarda as versões usadas para
+# invalidar os caches em memória de cada processo (referências, autenticação,
+# configurações) e as estatísticas do painel. O padrão é uma tabela no próprio
+# banco (`manage.py createcachetable`, rodado pelo build.sh); em produção pode
+# apontar para Memcached/Redis com CACHE_BACKEND e CACHE_LOCATION.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('CACHE_LOCATION', default='medlink_cache'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -163,9 +178,19 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
-    
+        # JWT com o usuário em cache: sem query por requisição (ver users/autenticacao.py)
+        'users.autenticacao.JWTAutenticacaoComCache',
+    ),
+    # JSON via orjson, com a mesma saída do renderer padrão (ver medlink_core/renderers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'medlink_core.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'medlink_core.renderers.JSONRapidoParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 # importa a classe timedelta do modulo datetime para definir duracao dos tokens JWT
 from datetime import timedelta
@@ -173,6 +198,13 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
+# Segundos que um usuário autenticado fica no cache em memória de cada processo.
+# As revogações chegam aos outros workers pelo cache partilhado (CACHES); sem ele
+# o TTL efetivo cai para 5 segundos (users.autenticacao.TTL_SEM_CACHE_PARTILHADO).
+# Cada requisição autenticada lê uma versão no cache: com o DatabaseCache padrão
+# isso é uma query em medlink_cache; para autenticar sem tocar no banco, use
+# Redis ou Memcached em CACHE_BACKEND.
+AUTENTICACAO_CACHE_TTL = config('AUTENTICACAO_CACHE_TTL', default=300, cast=int)
 
 
 EMAIL_BACKEND = config('EMAIL_BACKEND')
@@ -182,6 +214,27 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
+# Envia cada e-mail da caixa de saída logo após o commit da requisição. Deixe
+# ligado enquanto o worker `enviar_emails --continuo` não estiver implantado;
+# com ele rodando, desligue para tirar o SMTP do tempo de resposta.
+NOTIFICACOES_ENVIO_IMEDIATO = config('NOTIFICACOES_ENVIO_IMEDIATO', default=True, cast=bool)
 
 # Configuração do CORS
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Contadores diários por clínica para o dashboard das secretárias.
+# Ao ativar numa base existente, rode `python manage.py recalcular_contadores`.
+DASHBOARD_CONTADORES_ATIVOS = config('DASHBOARD_CONTADORES_ATIVOS', default=False, cast=bool)
+
+# Registros de auditoria (LogEntry, ConsultaStatusLog).
+# 'buffer': acumulados em memória e gravados em bulk por uma thread, a cada
+# AUDITORIA_TAMANHO_LOTE registros ou AUDITORIA_INTERVALO segundos.
+# 'transacional': cada registro é gravado na hora, na transação da alteração.
+AUDITORIA_MODO = config('AUDITORIA_MODO', default='buffer')
+AUDITORIA_TAMANHO_LOTE = config('AUDITORIA_TAMANHO_LOTE', default=100, cast=int)
+AUDITORIA_INTERVALO = config('AUDITORIA_INTERVALO', default=2.0, cast=float)
+
+# Instrumentação por requisição (histogramas em /api/admin/metricas/)
+METRICAS_ATIVAS = config('METRICAS_ATIVAS', default=True, cast=bool)
+# Cabeçalho Server-Timing para qualquer cliente; desligado, só usuários staff o recebem
+METRICAS_SERVER_TIMING = config('METRICAS_SERVER_TIMING', default=False, cast=bool)
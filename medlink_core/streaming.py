@@ -0,0 +1,69 @@
+# medlink_core/streaming.py
+"""
+Listagens em streaming: o queryset é lido em lotes (`iterator(chunk_size)`)
+e o array JSON é escrito à medida que cada lote é serializado, então a
+memória fica constante independentemente do número de linhas.
+
+Como o status e os cabeçalhos já foram enviados quando o corpo começa,
+erros no meio da iteração só aparecem como um JSON truncado.
+"""
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+TAMANHO_LOTE = 500
+
+PARAMETRO_STREAMING = 'stream'
+
+
+def streaming_pedido(request):
+    """ `?stream=1` (ou true) pede a listagem completa em streaming, sem paginação. """
+    return request.query_params.get(PARAMETRO_STREAMING, '').lower() in ('1', 'true')
+
+
+def gerar_array_json(queryset, serializer_class, contexto=None, tamanho_lote=TAMANHO_LOTE, **kwargs):
+    """ Gera os bytes de um array JSON com os objetos de `queryset` serializados. """
+    yield b'['
+    primeiro = True
+    lote = []
+
+    def escrever(objetos):
+        dados = serializer_class(objetos, many=True, context=contexto or {}, **kwargs).data
+        # Tira os colchetes do lote para emendá-lo no array único
+        return dumps(dados)[1:-1]
+
+    for objeto in queryset.iterator(chunk_size=tamanho_lote):
+        lote.append(objeto)
+        if len(lote) >= tamanho_lote:
+            yield (b'' if primeiro else b',') + escrever(lote)
+            primeiro = False
+            lote = []
+    if lote:
+        yield (b'' if primeiro else b',') + escrever(lote)
+    yield b']'
+
+
+def resposta_em_streaming(queryset, serializer_class, contexto=None, tamanho_lote=TAMANHO_LOTE, **kwargs):
+    """ StreamingHttpResponse com o array JSON de `queryset`. """
+    return StreamingHttpResponse(
+        gerar_array_json(queryset, serializer_class, contexto, tamanho_lote, **kwargs),
+        content_type='application/json',
+    )
+
+
+class ListaEmStreamingMixin:
+    """
+    Para views genéricas: com `?stream=1`, list() devolve todos os objetos
+    filtrados como um array JSON em streaming, em vez da página materializada.
+    """
+    tamanho_lote_streaming = TAMANHO_LOTE
+
+    def list(self, request, *args, **kwargs):
+        if not streaming_pedido(request):
+            return super().list(request, *args, **kwargs)
+        return resposta_em_streaming(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            self.tamanho_lote_streaming,
+        )
@@ -0,0 +1,57 @@
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.renderers import JSONRenderer
+
+from .cache import cache_partilhado
+from .renderers import JSONRapidoParser, JSONRapidoRenderer
+
+_DIRETORIO_DO_CACHE = tempfile.mkdtemp(prefix='medlink-cache-')
+
+
+def cache_de_teste():
+    """
+    Cache partilhado entre processos que não passa pelo banco. Os testes com
+    orçamento de queries o usam para medir só as queries da aplicação (com o
+    DatabaseCache padrão cada leitura do cache também é uma query).
+    """
+    return override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': _DIRETORIO_DO_CACHE,
+    }})
+
+
+class JSONRapidoTests(SimpleTestCase):
+    def test_saida_igual_a_do_renderer_padrao(self):
+        dados = {
+            'quando': datetime(2025, 3, 1, 14, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'dia': datetime(2025, 3, 1).date(),
+            'valor': Decimal('150.00'),
+            'rotulo': _('Paciente'),
+            'texto': 'Consulta às 9h retorno',
+            1: ['a', None, True, 2.5],
+        }
+        self.assertEqual(JSONRapidoRenderer().render(dados), JSONRenderer().render(dados))
+
+    def test_indentacao_pedida_usa_o_renderer_padrao(self):
+        saida = JSONRapidoRenderer().render({'a': 1}, 'application/json; indent=2')
+        self.assertEqual(saida, b'{\n  "a": 1\n}')
+
+    def test_parser(self):
+        self.assertEqual(JSONRapidoParser().parse(BytesIO('{"nome": "José"}'.encode())), {'nome': 'José'})
+        with self.assertRaises(Exception):
+            JSONRapidoParser().parse(BytesIO(b'{"nome": '))
+
+
+class CachePartilhadoTests(SimpleTestCase):
+    def test_backends_por_processo_nao_sao_partilhados(self):
+        self.assertTrue(cache_partilhado())
+        for backend in ('locmem.LocMemCache', 'dummy.DummyCache'):
+            with override_settings(CACHES={'default': {'BACKEND': f'django.core.cache.backends.{backend}'}}):
+                self.assertFalse(cache_partilhado())
+        with cache_de_teste():
+            self.assertTrue(cache_partilhado())
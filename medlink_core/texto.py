@@ -0,0 +1,11 @@
+# medlink_core/texto.py
+import unicodedata
+
+
+def normalizar_texto(texto):
+    """
+    Minúsculas e sem acentos ("São Paulo" -> "sao paulo"), usado nas colunas
+    normalizadas que servem às buscas por prefixo insensíveis a acento.
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).casefold().strip()
@@ -0,0 +1,11 @@
+# notificacoes/admin.py
+from django.contrib import admin
+from .models import EmailPendente
+
+
+@admin.register(EmailPendente)
+class EmailPendenteAdmin(admin.ModelAdmin):
+    list_display = ('id', 'assunto', 'status', 'tentativas', 'proxima_tentativa', 'criado_em', 'enviado_em')
+    list_filter = ('status',)
+    search_fields = ('assunto', 'destinatarios')
+    readonly_fields = ('criado_em', 'enviado_em', 'ultimo_erro')
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificacoes.outbox import MAXIMO_TENTATIVAS, TAMANHO_LOTE, enviar_pendentes
+
+
+class Command(BaseCommand):
+    help = (
+        'Entrega os e-mails da caixa de saída em lotes, com uma conexão SMTP por lote '
+        'e novas tentativas com backoff. Com --continuo, fica em execução como worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='E-mails por conexão SMTP.')
+        parser.add_argument('--max-tentativas', type=int, default=MAXIMO_TENTATIVAS)
+        parser.add_argument('--continuo', action='store_true', help='Não termina quando a fila esvazia.')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera com a fila vazia.')
+
+    def handle(self, *args, **options):
+        total_enviados = total_falhas = 0
+        while True:
+            enviados, falhas = enviar_pendentes(options['lote'], options['max_tentativas'])
+            total_enviados += enviados
+            total_falhas += falhas
+            if enviados or falhas:
+                self.stdout.write(f'{enviados} enviados, {falhas} com falha.')
+            if enviados + falhas < options['lote']:
+                # Fila vazia (ou só com falhas reagendadas)
+                if not options['continuo']:
+                    break
+                time.sleep(options['intervalo'])
+        self.stdout.write(self.style.SUCCESS(f'{total_enviados} e-mails enviados, {total_falhas} falhas.'))
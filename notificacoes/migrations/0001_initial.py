@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assunto', models.CharField(max_length=255, verbose_name='Assunto')),
+                ('corpo', models.TextField(verbose_name='Corpo')),
+                ('remetente', models.CharField(max_length=254, verbose_name='Remetente')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Destinatários')),
+                ('chave', models.CharField(blank=True, max_length=120, null=True, unique=True)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENVIADO', 'Enviado'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=10)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima Tentativa')),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'E-mail Pendente',
+                'verbose_name_plural': 'E-mails Pendentes',
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDENTE')), fields=['proxima_tentativa', 'id'], name='email_pendente_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# notificacoes/models.py
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+class EmailPendente(models.Model):
+    """
+    Caixa de saída de e-mails. As views gravam a mensagem na mesma transação
+    da requisição (ver notificacoes.outbox) e o comando `enviar_emails`
+    entrega em lotes, fora do ciclo da requisição.
+    """
+    class Status(models.TextChoices):
+        PENDENTE = 'PENDENTE', _('Pendente')
+        ENVIADO = 'ENVIADO', _('Enviado')
+        FALHOU = 'FALHOU', _('Falhou')
+
+    assunto = models.CharField(_('Assunto'), max_length=255)
+    corpo = models.TextField(_('Corpo'))
+    remetente = models.CharField(_('Remetente'), max_length=254)
+    destinatarios = models.JSONField(_('Destinatários'), default=list)
+    # Evita enfileirar a mesma mensagem duas vezes (ex.: lembretes)
+    chave = models.CharField(max_length=120, null=True, blank=True, unique=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(_('Próxima Tentativa'), default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('E-mail Pendente')
+        verbose_name_plural = _('E-mails Pendentes')
+        indexes = [
+            # O worker só lê os pendentes já vencidos, em ordem
+            models.Index(
+                fields=['proxima_tentativa', 'id'], name='email_pendente_fila_idx',
+                condition=models.Q(status='PENDENTE'),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.assunto} -> {', '.join(self.destinatarios)} ({self.status})"
@@ -0,0 +1,176 @@
+# notificacoes/outbox.py
+"""
+Caixa de saída transacional de e-mails.
+
+`enfileirar` grava a mensagem na transação corrente: se a requisição for
+desfeita, o e-mail some junto. `enviar_pendentes` é chamado pelo comando
+`enviar_emails`: reserva um lote (SELECT ... FOR UPDATE SKIP LOCKED no
+PostgreSQL, para vários workers em paralelo), envia tudo por uma única
+conexão SMTP e reagenda as falhas com backoff exponencial.
+
+Com NOTIFICACOES_ENVIO_IMEDIATO ligado (padrão), cada e-mail enfileirado
+também é enviado logo após o commit, no próprio processo: o sistema entrega
+mesmo sem o worker rodando, e o worker só repete as falhas. Com o worker
+implantado, desligue-o para tirar o SMTP do caminho da requisição.
+"""
+import logging
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import EmailPendente
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 50
+MAXIMO_TENTATIVAS = 6
+# Espera antes da tentativa n: BACKOFF_INICIAL * 2^(n-1), até BACKOFF_MAXIMO
+BACKOFF_INICIAL = timedelta(minutes=1)
+BACKOFF_MAXIMO = timedelta(hours=6)
+# Tempo que um lote fica reservado para o worker que o pegou
+RESERVA = timedelta(minutes=10)
+
+
+def enfileirar(assunto, corpo, destinatarios, remetente=None, chave=None):
+    """
+    Grava um e-mail na caixa de saída. Com `chave`, uma mensagem já
+    enfileirada com a mesma chave não é repetida (retorna None).
+    """
+    email = EmailPendente(
+        assunto=assunto[:255],
+        corpo=corpo,
+        remetente=remetente or settings.DEFAULT_FROM_EMAIL,
+        destinatarios=list(destinatarios),
+        chave=chave,
+    )
+    if chave is None:
+        email.save()
+    else:
+        try:
+            with transaction.atomic():
+                email.save()
+        except IntegrityError:
+            return None
+    if settings.NOTIFICACOES_ENVIO_IMEDIATO:
+        transaction.on_commit(partial(enviar_agora, [email.pk]))
+    return email
+
+
+def enviar_agora(ids):
+    """
+    Tenta entregar já os e-mails `ids` ainda pendentes. Nunca levanta: o que
+    falhar fica reagendado na caixa de saída para o worker.
+    """
+    try:
+        return enviar_pendentes(tamanho_lote=len(ids), ids=ids)
+    except Exception:
+        logger.exception('Falha no envio imediato dos e-mails %s', ids)
+        return 0, 0
+
+
+def enfileirar_em_lote(mensagens, remetente=None):
+    """
+    Grava vários e-mails com um bulk insert. `mensagens` são tuplas
+    `(assunto, corpo, destinatarios, chave)`; chaves já enfileiradas são ignoradas.
+    """
+    remetente = remetente or settings.DEFAULT_FROM_EMAIL
+    EmailPendente.objects.bulk_create(
+        [
+            EmailPendente(
+                assunto=assunto[:255], corpo=corpo, remetente=remetente,
+                destinatarios=list(destinatarios), chave=chave,
+            )
+            for assunto, corpo, destinatarios, chave in mensagens
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+def espera_para(tentativas):
+    return min(BACKOFF_INICIAL * (2 ** max(tentativas - 1, 0)), BACKOFF_MAXIMO)
+
+
+def reservar_lote(tamanho_lote=TAMANHO_LOTE, ids=None):
+    """
+    Pega os pendentes vencidos (só entre `ids`, se informados) e adia a
+    próxima tentativa pelo tempo da reserva.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        pendentes = EmailPendente.objects.filter(
+            status=EmailPendente.Status.PENDENTE, proxima_tentativa__lte=agora
+        ).order_by('proxima_tentativa', 'id')
+        if ids is not None:
+            pendentes = pendentes.filter(pk__in=ids)
+        if connection.features.has_select_for_update_skip_locked:
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        lote = list(pendentes[:tamanho_lote])
+        if lote:
+            EmailPendente.objects.filter(pk__in=[email.pk for email in lote]).update(
+                proxima_tentativa=agora + RESERVA
+            )
+    return lote
+
+
+def esvaziar(tamanho_lote=TAMANHO_LOTE):
+    """ Envia lotes até a fila de vencidos acabar. Retorna `(enviados, falhas)`. """
+    total_enviados = total_falhas = 0
+    while True:
+        enviados, falhas = enviar_pendentes(tamanho_lote)
+        total_enviados += enviados
+        total_falhas += falhas
+        if enviados + falhas < tamanho_lote:
+            return total_enviados, total_falhas
+
+
+def enviar_pendentes(tamanho_lote=TAMANHO_LOTE, maximo_tentativas=MAXIMO_TENTATIVAS, conexao=None, ids=None):
+    """
+    Envia um lote da caixa de saída. Retorna `(enviados, falhas)`.
+    Uma falha ao abrir a conexão reagenda o lote inteiro.
+    """
+    lote = reservar_lote(tamanho_lote, ids)
+    if not lote:
+        return 0, 0
+
+    conexao = conexao or get_connection(fail_silently=False)
+    enviados, falhas = [], []
+    try:
+        conexao.open()
+    except Exception as e:
+        falhas = [(email, e) for email in lote]
+    else:
+        try:
+            for email in lote:
+                mensagem = EmailMessage(
+                    email.assunto, email.corpo, email.remetente, email.destinatarios, connection=conexao
+                )
+                try:
+                    conexao.send_messages([mensagem])
+                except Exception as e:
+                    falhas.append((email, e))
+                else:
+                    enviados.append(email.pk)
+        finally:
+            conexao.close()
+
+    agora = timezone.now()
+    if enviados:
+        EmailPendente.objects.filter(pk__in=enviados).update(
+            status=EmailPendente.Status.ENVIADO, enviado_em=agora, ultimo_erro=''
+        )
+    for email, erro in falhas:
+        email.tentativas += 1
+        email.ultimo_erro = f'{type(erro).__name__}: {erro}'
+        if email.tentativas >= maximo_tentativas:
+            email.status = EmailPendente.Status.FALHOU
+        email.proxima_tentativa = agora + espera_para(email.tentativas)
+    if falhas:
+        EmailPendente.objects.bulk_update(
+            [email for email, _ in falhas], ['tentativas', 'ultimo_erro', 'status', 'proxima_tentativa']
+        )
+    return len(enviados), len(falhas)
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from . import outbox
+from .models import EmailPendente
+
+
+class ConexaoQueFalha(EmailBackend):
+    """ Backend de teste: recusa as mensagens para certos destinatários. """
+    recusados = {'falha@medlink.com'}
+
+    def send_messages(self, messages):
+        for mensagem in messages:
+            if set(mensagem.to) & self.recusados:
+                raise ConnectionError('recusado pelo servidor')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', NOTIFICACOES_ENVIO_IMEDIATO=False
+)
+class CaixaDeSaidaTests(TestCase):
+    def test_requisicao_so_enfileira(self):
+        User.objects.create_user(
+            cpf='11122233344', email='ana@medlink.com', password='x', first_name='Ana', last_name='Lima'
+        )
+        response = APIClient().post(reverse('users:request-password-reset'), {'email': 'ana@medlink.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        email = EmailPendente.objects.get()
+        self.assertEqual(email.destinatarios, ['ana@medlink.com'])
+        self.assertEqual(email.status, EmailPendente.Status.PENDENTE)
+
+        call_command('enviar_emails', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['ana@medlink.com'])
+        email.refresh_from_db()
+        self.assertEqual(email.status, EmailPendente.Status.ENVIADO)
+        self.assertIsNotNone(email.enviado_em)
+
+    def test_lote_com_queries_constantes(self):
+        for i in range(5):
+            outbox.enfileirar('Assunto', 'Corpo', [f'p{i}@medlink.com'])
+        # Reserva (SELECT + UPDATE num savepoint) e a marcação dos enviados (UPDATE)
+        with self.assertNumQueries(5):
+            self.assertEqual(outbox.enviar_pendentes(tamanho_lote=10), (5, 0))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(outbox.enviar_pendentes(), (0, 0))
+
+    def test_falha_reagenda_com_backoff_ate_desistir(self):
+        outbox.enfileirar('Assunto', 'Corpo', ['ok@medlink.com'])
+        falha = outbox.enfileirar('Assunto', 'Corpo', ['falha@medlink.com'])
+
+        self.assertEqual(outbox.enviar_pendentes(conexao=ConexaoQueFalha()), (1, 1))
+        falha.refresh_from_db()
+        self.assertEqual(falha.tentativas, 1)
+        self.assertEqual(falha.status, EmailPendente.Status.PENDENTE)
+        self.assertIn('recusado', falha.ultimo_erro)
+        self.assertGreater(falha.proxima_tentativa, timezone.now() + outbox.espera_para(1) - timedelta(seconds=5))
+
+        # Ainda não venceu: o worker não pega de novo
+        self.assertEqual(outbox.enviar_pendentes(conexao=ConexaoQueFalha()), (0, 0))
+
+        EmailPendente.objects.filter(pk=falha.pk).update(proxima_tentativa=timezone.now(), tentativas=2)
+        self.assertEqual(outbox.enviar_pendentes(maximo_tentativas=3, conexao=ConexaoQueFalha()), (0, 1))
+        falha.refresh_from_db()
+        self.assertEqual(falha.status, EmailPendente.Status.FALHOU)
+        self.assertEqual(outbox.espera_para(30), outbox.BACKOFF_MAXIMO)
+
+    def test_chave_evita_duplicados(self):
+        self.assertIsNotNone(outbox.enfileirar('A', 'B', ['x@medlink.com'], chave='lembrete:1'))
+        self.assertIsNone(outbox.enfileirar('A', 'B', ['x@medlink.com'], chave='lembrete:1'))
+        self.assertEqual(EmailPendente.objects.count(), 1)
+
+    @override_settings(NOTIFICACOES_ENVIO_IMEDIATO=True)
+    def test_envio_imediato_sem_worker(self):
+        User.objects.create_user(
+            cpf='11122233344', email='ana@medlink.com', password='x', first_name='Ana', last_name='Lima'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            APIClient().post(reverse('users:request-password-reset'), {'email': 'ana@medlink.com'})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailPendente.objects.get().status, EmailPendente.Status.ENVIADO)
+
+    @override_settings(
+        NOTIFICACOES_ENVIO_IMEDIATO=True, EMAIL_BACKEND='notificacoes.tests.ConexaoQueFalha'
+    )
+    def test_falha_no_envio_imediato_fica_para_o_worker(self):
+        outbox.enfileirar('Assunto', 'Corpo', ['ok@medlink.com'])
+        with self.captureOnCommitCallbacks(execute=True):
+            falha = outbox.enfileirar('Assunto', 'Corpo', ['falha@medlink.com'])
+        falha.refresh_from_db()
+        self.assertEqual((falha.status, falha.tentativas), (EmailPendente.Status.PENDENTE, 1))
+        # Só o e-mail do callback foi tentado; o outro continua na fila
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailPendente.objects.filter(enviado_em__isnull=True).count(), 2)
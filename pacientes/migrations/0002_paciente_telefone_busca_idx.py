@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pacientes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paciente',
+            index=models.Index(fields=['telefone'], name='paciente_telefone_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
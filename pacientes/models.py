@@ -28,4 +28,7 @@ class Paciente(models.Model):
 
     class Meta:
         verbose_name = 'Paciente'
-        verbose_name_plural = 'Pacientes'
\ No newline at end of file
+        verbose_name_plural = 'Pacientes'
+        indexes = [
+            models.Index(fields=['telefone'], name='paciente_telefone_busca_idx', opclasses=['varchar_pattern_ops']),
+        ]
\ No newline at end of file
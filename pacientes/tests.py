@@ -1,3 +1,103 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from agendamentos.models import Consulta, ConsultaStatusLog, Pagamento
+from agendamentos.tests import AgendamentosTestMixin
+from users.models import User
+from .models import Paciente
+
+
+class BuscaPacientesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            cpf='99999999999', email='secretaria@medlink.local', user_type='SECRETARIA'
+        ))
+        pessoas = [
+            ('12345678901', 'José', 'Antônio', '63999990001'),
+            ('12399999999', 'Joana', 'Silva', '63988880002'),
+            ('45678901234', 'Maria', 'José Souza', '11977770003'),
+            ('78901234567', 'Ana', 'Lima', '63999990004'),
+        ]
+        for cpf, nome, sobrenome, telefone in pessoas:
+            user = User.objects.create_user(
+                cpf=cpf, email=f'{nome.lower()}@medlink.local', first_name=nome, last_name=sobrenome,
+                user_type='PACIENTE'
+            )
+            Paciente.objects.create(user=user, telefone=telefone)
+
+    def buscar(self, termo, **params):
+        response = self.client.get('/api/pacientes/', {'search': termo, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['next'])
+        return [paciente['nome_completo'] for paciente in response.data['results']]
+
+    def test_nome_sem_acentos_com_prefixo_antes_do_sobrenome(self):
+        self.assertEqual(self.buscar('JOSE'), ['José Antônio', 'Maria José Souza'])
+        self.assertEqual(self.buscar('jos'), ['José Antônio', 'Maria José Souza'])
+        self.assertEqual(self.buscar('jo', limit=1), ['Joana Silva'])
+        # Com menos de 3 letras só os prefixos do nome (o índice de trigramas não ajudaria)
+        self.assertEqual(self.buscar('jo'), ['Joana Silva', 'José Antônio'])
+
+    def test_email_por_prefixo_sem_upper(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.buscar('ANA@MED'), ['Ana Lima'])
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        self.assertIn('LOWER("USERS_USER"."EMAIL")', sql)
+        self.assertNotIn('UPPER(', sql)
+
+    def test_cpf_e_telefone_por_prefixo(self):
+        self.assertEqual(self.buscar('123.'), ['José Antônio', 'Joana Silva'])
+        self.assertEqual(self.buscar('(63) 9999'), ['José Antônio', 'Ana Lima'])
+
+    def test_renomear_atualiza_o_nome_de_busca(self):
+        user = User.objects.get(cpf='78901234567')
+        user.first_name = 'Ângela'
+        user.save(update_fields=['first_name'])
+        self.assertEqual(self.buscar('angela'), ['Ângela Lima'])
+
+
+class PacienteTimelineTests(AgendamentosTestMixin, TestCase):
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.paciente = self.criar_paciente(0)
+
+    def agendar(self, quantidade):
+        for _ in range(quantidade):
+            consulta = Consulta.objects.create(
+                paciente=self.paciente, medico=self.medico, clinica=self.clinica,
+                data_hora=self.inicio + timedelta(hours=Consulta.objects.count()), valor=Decimal('150.00'),
+            )
+            Pagamento.objects.create(consulta=consulta, valor_pago=consulta.valor)
+            ConsultaStatusLog.objects.create(consulta=consulta, status_novo='PENDENTE', pessoa=self.secretaria)
+            ConsultaStatusLog.objects.create(consulta=consulta, status_novo='CONFIRMADA', pessoa=self.secretaria)
+
+    def queries_da_timeline(self):
+        self.client.force_authenticate(user=User.objects.get(pk=self.secretaria.pk))
+        url = reverse('paciente-timeline', args=[self.paciente.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.json()['results']
+
+    def test_numero_fixo_de_queries_com_eventos_em_ordem(self):
+        self.agendar(2)
+        poucas, _ = self.queries_da_timeline()
+        self.agendar(10)
+        muitas, resultados = self.queries_da_timeline()
+        self.assertEqual(poucas, muitas)
 
-# Create your tests here.
+        self.assertEqual(len(resultados), 12)
+        mais_recente = resultados[0]
+        self.assertGreater(mais_recente['data_hora'], resultados[-1]['data_hora'])
+        self.assertEqual([e['status_novo'] for e in mais_recente['eventos']], ['PENDENTE', 'CONFIRMADA'])
+        self.assertEqual(mais_recente['eventos'][0]['pessoa_nome'], 'Bia Lima')
+        self.assertEqual(mais_recente['pagamento']['status'], 'PENDENTE')
+        self.assertIsNone(mais_recente['anotacao'])
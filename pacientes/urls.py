@@ -2,7 +2,7 @@
 
 from django.urls import path
 # 1. Importe a nova view que vamos criar
-from .views import PacienteCreateView, PacienteListView, PacientesDoDiaAPIView, HistoricoPacienteAPIView 
+from .views import PacienteCreateView, PacienteListView, PacientesDoDiaAPIView, HistoricoPacienteAPIView, PacienteTimelineAPIView
 
 urlpatterns = [
     path('register/', PacienteCreateView.as_view(), name='paciente-register'),
@@ -11,4 +11,5 @@ urlpatterns = [
 
     # 2. Adicione esta nova rota para o histórico
     path('<int:pk>/historico/', HistoricoPacienteAPIView.as_view(), name='paciente-historico'),
+    path('<int:pk>/timeline/', PacienteTimelineAPIView.as_view(), name='paciente-timeline'),
 ]
\ No newline at end of file
@@ -7,9 +7,13 @@ from rest_framework.response import Response
 from django.utils import timezone
 from .models import Paciente
 from agendamentos.models import Consulta
+from agendamentos.views import consultas_do_usuario
+from medlink_core.streaming import ListaEmStreamingMixin
+from users.busca import buscar, ler_limite
 from users.permissions import IsMedicoOrSecretaria
 from .serializers import PacienteCreateSerializer
-from agendamentos.serializers import ConsultaSerializer
+from agendamentos.serializers import ConsultaSerializer, ConsultaTimelineSerializer
+from agendamentos.pagination import KeysetPagination, HistoricoKeysetPagination, filtrar_janela_de_datas
 
 # View para CRIAR pacientes (sem alterações)
 class PacienteCreateView(generics.CreateAPIView):
@@ -17,11 +21,31 @@ class PacienteCreateView(generics.CreateAPIView):
     serializer_class = PacienteCreateSerializer
     permission_classes = [AllowAny]
 
-# View para LISTAR todos os pacientes (sem alterações)
-class PacienteListView(generics.ListAPIView):
+class PacienteKeysetPagination(KeysetPagination):
+    """ Pacientes paginados pela chave primária (o id do User). """
+    ordering = ('user_id',)
+
+
+# View para LISTAR os pacientes, paginada por cursor
+class PacienteListView(ListaEmStreamingMixin, generics.ListAPIView):
     queryset = Paciente.objects.select_related('user').all()
     serializer_class = PacienteCreateSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PacienteKeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        """
+        Com `?search=` devolve só os primeiros `?limit=` pacientes por relevância
+        (nome sem acentos, CPF, telefone ou e-mail por prefixo), sem próxima página.
+        """
+        termo = request.query_params.get('search', '').strip()
+        if not termo:
+            return super().list(request, *args, **kwargs)
+        pacientes = buscar(
+            self.get_queryset(), termo, ler_limite(request.query_params.get('limit')),
+            prefixo='user__', campo_telefone='telefone',
+        )
+        return Response({'next': None, 'results': self.get_serializer(pacientes, many=True).data})
 
 # View para os PACIENTES DO DIA (sem alterações)
 class PacientesDoDiaAPIView(APIView):
@@ -60,16 +84,42 @@ class HistoricoPacienteAPIView(APIView):
 
     def get(self, request, pk, *args, **kwargs):
         medico = request.user
+        try:
+            campos = ConsultaSerializer.campos_da_requisicao(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # CORREÇÃO: O filtro deve ser feito em 'paciente__user_id' porque o 'pk' que
         # recebemos é o ID do User, e o modelo Paciente tem a sua chave primária
         # ligada ao User.
-        historico_consultas = Consulta.objects.filter(
-            paciente__user_id=pk,
-            medico=medico
-        ).select_related(
-            'paciente__user', 'medico__perfil_medico'
-        ).order_by('-data_hora')
+        historico_consultas = ConsultaSerializer.setup_eager_loading(
+            Consulta.objects.filter(paciente__user_id=pk, medico=medico), campos
+        )
+        historico_consultas = filtrar_janela_de_datas(historico_consultas, request)
+
+        paginator = HistoricoKeysetPagination()
+        pagina = paginator.paginate_queryset(historico_consultas, request, view=self)
+        serializer = ConsultaSerializer(pagina, many=True, campos=campos)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class PacienteTimelineAPIView(APIView):
+    """
+    Linha do tempo de um paciente (do mais recente para o mais antigo):
+    consultas com anotação, pagamento e eventos de status, paginadas por
+    cursor e com janela opcional `?from=&to=`. Médicos veem as suas
+    consultas com o paciente; secretárias, as da sua clínica.
+    O número de queries por página é fixo, qualquer que seja o histórico.
+    """
+    permission_classes = [IsAuthenticated, IsMedicoOrSecretaria]
+
+    def get(self, request, pk, *args, **kwargs):
+        consultas = ConsultaTimelineSerializer.setup_eager_loading(
+            consultas_do_usuario(request.user).filter(paciente_id=pk)
+        )
+        consultas = filtrar_janela_de_datas(consultas, request)
 
-        serializer = ConsultaSerializer(historico_consultas, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        paginator = HistoricoKeysetPagination()
+        pagina = paginator.paginate_queryset(consultas, request, view=self)
+        serializer = ConsultaTimelineSerializer(pagina, many=True)
+        return paginator.get_paginated_response(serializer.data)
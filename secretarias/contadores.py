@@ -0,0 +1,125 @@
+# secretarias/contadores.py
+"""
+Manutenção incremental dos contadores diários por clínica (ResumoDiarioClinica).
+
+Os contadores são opcionais: só são mantidos e usados pelo dashboard quando
+`DASHBOARD_CONTADORES_ATIVOS` está ligado. Ao ativá-los numa base existente,
+rode `manage.py recalcular_contadores` uma vez.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from agendamentos.consts import (
+    STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CONFIRMADA,
+    STATUS_CONSULTA_CANCELADA, STATUS_CONSULTA_CONCLUIDA,
+)
+from agendamentos.models import Consulta
+from .models import ResumoDiarioClinica
+
+# Coluna do resumo incrementada para cada status (além de `total`)
+COLUNA_POR_STATUS = {
+    STATUS_CONSULTA_PENDENTE: 'pendentes',
+    STATUS_CONSULTA_CONFIRMADA: 'confirmadas',
+    STATUS_CONSULTA_CANCELADA: 'canceladas',
+    STATUS_CONSULTA_CONCLUIDA: 'concluidas',
+}
+
+
+def contadores_ativos():
+    return getattr(settings, 'DASHBOARD_CONTADORES_ATIVOS', False)
+
+
+def chave_da_consulta(clinica_id, data_hora, status_atual):
+    """ Identifica o balde (clínica, dia local, status) de uma consulta. """
+    return clinica_id, timezone.localtime(data_hora).date(), status_atual
+
+
+def aplicar_deltas(deltas):
+    """
+    Aplica `{(clinica_id, dia, status): delta}` aos contadores com UPDATEs
+    atômicos (F()), criando as linhas que ainda não existem.
+    """
+    por_linha = defaultdict(lambda: defaultdict(int))
+    for (clinica_id, dia, status_atual), delta in deltas.items():
+        if not delta:
+            continue
+        colunas = por_linha[(clinica_id, dia)]
+        colunas['total'] += delta
+        coluna = COLUNA_POR_STATUS.get(status_atual)
+        if coluna:
+            colunas[coluna] += delta
+
+    with transaction.atomic():
+        for (clinica_id, dia), colunas in por_linha.items():
+            ResumoDiarioClinica.objects.get_or_create(clinica_id=clinica_id, dia=dia)
+            ResumoDiarioClinica.objects.filter(clinica_id=clinica_id, dia=dia).update(
+                **{coluna: F(coluna) + delta for coluna, delta in colunas.items() if delta}
+            )
+
+
+def registrar_consultas_criadas(consultas):
+    """ Conta consultas criadas fora do post_save (ex.: bulk_create). """
+    if not contadores_ativos():
+        return
+    deltas = defaultdict(int)
+    for consulta in consultas:
+        deltas[chave_da_consulta(consulta.clinica_id, consulta.data_hora, consulta.status_atual)] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_mudanca(anterior, atual):
+    """
+    Move uma consulta entre baldes. `anterior` e `atual` são tuplas
+    `(clinica_id, data_hora, status_atual)` ou None (criação/remoção).
+    """
+    deltas = defaultdict(int)
+    if anterior:
+        deltas[chave_da_consulta(*anterior)] -= 1
+    if atual:
+        deltas[chave_da_consulta(*atual)] += 1
+    aplicar_deltas(deltas)
+
+
+def registrar_mudancas_de_status(linhas, status_novo):
+    """
+    Conta mudanças de status feitas com `QuerySet.update()` (sem post_save).
+    `linhas` são tuplas `(clinica_id, data_hora, status_anterior)`.
+    """
+    if not contadores_ativos():
+        return
+    deltas = defaultdict(int)
+    for clinica_id, data_hora, status_anterior in linhas:
+        deltas[chave_da_consulta(clinica_id, data_hora, status_anterior)] -= 1
+        deltas[chave_da_consulta(clinica_id, data_hora, status_novo)] += 1
+    aplicar_deltas(deltas)
+
+
+def recalcular(clinica_id=None):
+    """ Reconstrói os contadores a partir da tabela de consultas (um GROUP BY). """
+    consultas = Consulta.objects.all()
+    resumos = ResumoDiarioClinica.objects.all()
+    if clinica_id is not None:
+        consultas = consultas.filter(clinica_id=clinica_id)
+        resumos = resumos.filter(clinica_id=clinica_id)
+
+    agregados = {
+        coluna: Count('id', filter=Q(status_atual=status_atual))
+        for status_atual, coluna in COLUNA_POR_STATUS.items()
+    }
+    linhas = (
+        consultas.annotate(dia=TruncDate('data_hora', tzinfo=timezone.get_current_timezone()))
+        .values('clinica_id', 'dia')
+        .annotate(total=Count('id'), **agregados)
+        .order_by()
+    )
+    with transaction.atomic():
+        resumos.delete()
+        ResumoDiarioClinica.objects.bulk_create(
+            [ResumoDiarioClinica(**linha) for linha in linhas],
+            batch_size=1000,
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from secretarias.contadores import recalcular
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os contadores diários do dashboard das secretárias a partir das consultas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clinica', type=int, help='Recalcula apenas uma clínica.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.HTTP_INFO('Recalculando contadores do dashboard...'))
+        recalcular(clinica_id=options['clinica'])
+        self.stdout.write(self.style.SUCCESS('Contadores recalculados com sucesso!'))
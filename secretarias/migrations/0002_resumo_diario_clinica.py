@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinicas', '0002_initial'),
+        ('secretarias', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioClinica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('total', models.IntegerField(default=0)),
+                ('pendentes', models.IntegerField(default=0)),
+                ('confirmadas', models.IntegerField(default=0)),
+                ('canceladas', models.IntegerField(default=0)),
+                ('concluidas', models.IntegerField(default=0)),
+                ('clinica', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios', to='clinicas.clinica')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário da Clínica',
+                'verbose_name_plural': 'Resumos Diários das Clínicas',
+                'constraints': [models.UniqueConstraint(fields=('clinica', 'dia'), name='resumo_diario_clinica_dia_unico')],
+            },
+        ),
+    ]
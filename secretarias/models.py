@@ -42,4 +42,32 @@ class SecretariaUser(User):
     class Meta:
         proxy = True
         verbose_name = 'Secretária (Utilizador)'
-        verbose_name_plural = 'Secretárias (Utilizadores)'
\ No newline at end of file
+        verbose_name_plural = 'Secretárias (Utilizadores)'
+
+class ResumoDiarioClinica(models.Model):
+    """
+    Contadores de consultas por clínica e por dia, mantidos de forma
+    incremental (ver secretarias.contadores). Com eles o dashboard da
+    secretária lê uma linha por dia em vez de contar a tabela de consultas.
+    """
+    clinica = models.ForeignKey(
+        Clinica,
+        on_delete=models.CASCADE,
+        related_name='resumos_diarios'
+    )
+    dia = models.DateField(_("Dia"))
+    total = models.IntegerField(default=0)
+    pendentes = models.IntegerField(default=0)
+    confirmadas = models.IntegerField(default=0)
+    canceladas = models.IntegerField(default=0)
+    concluidas = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Diário da Clínica"
+        verbose_name_plural = "Resumos Diários das Clínicas"
+        constraints = [
+            models.UniqueConstraint(fields=['clinica', 'dia'], name='resumo_diario_clinica_dia_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.clinica} - {self.dia:%d/%m/%Y}: {self.total}"
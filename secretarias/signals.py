@@ -0,0 +1,38 @@
+# secretarias/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from agendamentos.models import Consulta
+from .contadores import contadores_ativos, registrar_mudanca
+
+
+def _estado(consulta):
+    return consulta.clinica_id, consulta.data_hora, consulta.status_atual
+
+
+@receiver(pre_save, sender=Consulta)
+def guardar_estado_anterior(sender, instance, raw=False, **kwargs):
+    """ Guarda clínica, data e status antigos para mover a consulta de balde. """
+    instance._estado_contadores = None
+    if raw or not instance.pk or not contadores_ativos():
+        return
+    instance._estado_contadores = (
+        Consulta.objects.filter(pk=instance.pk)
+        .values_list('clinica_id', 'data_hora', 'status_atual')
+        .first()
+    )
+
+
+@receiver(post_save, sender=Consulta)
+def atualizar_contadores(sender, instance, created, raw=False, **kwargs):
+    if raw or not contadores_ativos():
+        return
+    anterior = None if created else getattr(instance, '_estado_contadores', None)
+    if anterior != _estado(instance):
+        registrar_mudanca(anterior, _estado(instance))
+
+
+@receiver(post_delete, sender=Consulta)
+def descontar_consulta_removida(sender, instance, **kwargs):
+    if contadores_ativos():
+        registrar_mudanca(_estado(instance), None)
@@ -1,3 +1,74 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agendamentos.models import Consulta
+from agendamentos.tests import AgendamentosTestMixin
+from clinicas.models import Clinica
+from users.models import User
+from .contadores import recalcular
+from .models import ResumoDiarioClinica
+
+
+class DashboardStatsTests(AgendamentosTestMixin, TestCase):
+    """
+    Estatísticas do dashboard: escopo por clínica, aggregate único e contadores.
+    """
+
+    def setUp(self):
+        self.criar_base()
+        self.client = APIClient()
+        self.url = reverse('dashboard-stats')
+        self.agora = timezone.localtime().replace(minute=0, second=0, microsecond=0)
+        outra = Clinica.objects.create(
+            nome_fantasia='Outra Clínica', cnpj='99888777000166',
+            cidade=self.clinica.cidade, tipo_clinica=self.clinica.tipo_clinica,
+        )
+        # Consulta de outra clínica não pode aparecer no dashboard
+        self.agendar(0, clinica=outra)
+        self.agendar(1)
+        self.agendar(2, status_atual='CONFIRMADA')
+
+    def agendar(self, indice, **extra):
+        dados = {
+            'paciente': self.criar_paciente(indice), 'medico': self.medico, 'clinica': self.clinica,
+            'data_hora': self.agora.replace(hour=indice), 'valor': Decimal('100.00'),
+        }
+        dados.update(extra)
+        return Consulta.objects.create(**dados)
+
+    def stats(self, queries):
+        self.client.force_authenticate(user=User.objects.get(pk=self.secretaria.pk))
+        with self.assertNumQueries(queries):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stats_da_clinica_com_um_aggregate(self):
+        # Uma query para o perfil da secretária e uma para o aggregate
+        stats = self.stats(2)
+        self.assertEqual(stats, {'today': 2, 'confirmed': 1, 'pending': 1, 'totalMonth': 2})
+
+    @override_settings(DASHBOARD_CONTADORES_ATIVOS=True)
+    def test_contadores_incrementais(self):
+        recalcular()
+        self.assertEqual(self.stats(2), {'today': 2, 'confirmed': 1, 'pending': 1, 'totalMonth': 2})
+
+        consulta = self.agendar(3)
+        consulta.status_atual = 'CONFIRMADA'
+        consulta.save()
+        consulta_antiga = self.agendar(4)
+        consulta_antiga.delete()
+        self.assertEqual(self.stats(2), {'today': 3, 'confirmed': 2, 'pending': 1, 'totalMonth': 3})
+
+        # Os contadores incrementais batem com a reconstrução completa
+        incrementais = list(ResumoDiarioClinica.objects.order_by('clinica', 'dia').values())
+        recalcular()
+        recalculados = list(ResumoDiarioClinica.objects.order_by('clinica', 'dia').values())
+        self.assertEqual(
+            [{k: v for k, v in r.items() if k != 'id'} for r in incrementais],
+            [{k: v for k, v in r.items() if k != 'id'} for r in recalculados],
+        )
@@ -1,6 +1,8 @@
 # secretarias/views.py
 
-from datetime import date
+from datetime import date, datetime, time, timedelta
+from django.db.models import Count, Q
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.generics import ListAPIView
 from rest_framework.response import Response
@@ -10,11 +12,13 @@ from rest_framework.permissions import IsAuthenticated
 # Importando os modelos e serializers necessários
 from agendamentos.models import Consulta, ConsultaStatusLog
 from .serializers import DashboardStatsSerializer, ConsultaHojeSerializer
-from .serializers import DashboardStatsSerializer, ConsultaHojeSerializer
+from .models import Secretaria, ResumoDiarioClinica
+from .contadores import contadores_ativos
 from users.permissions import HasRole
 
 # 1. IMPORTE AS CONSTANTES DE STATUS DO SEU APP DE AGENDAMENTOS
-from agendamentos.consts import STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_PENDENTE
+from agendamentos.consts import STATUS_CONSULTA_CONFIRMADA, STATUS_CONSULTA_PENDENTE, STATUS_CONSULTA_CANCELADA
+from agendamentos.services import TransicaoInvalida, mudar_status
 
 
 # ATENÇÃO: Verifique se sua classe de permissão está neste local e com este nome.
@@ -23,33 +27,68 @@ from users.permissions import HasRole
 
 class DashboardStatsView(APIView):
     """
-    Fornece os dados para os cards de estatísticas do dashboard.
+    Fornece os dados para os cards de estatísticas do dashboard,
+    restritos à clínica da secretária logada.
     """
     permission_classes = [IsAuthenticated, HasRole]
     required_roles = ['SECRETARIA']
 
     def get(self, request):
-        today = date.today()
-        
-        # O filtro por clínica virá no futuro, por enquanto busca todas do dia
-        consultas_do_dia = Consulta.objects.filter(data_hora__date=today)
-        consultas_do_mes = Consulta.objects.filter(data_hora__year=today.year, data_hora__month=today.month)
-
-        # Contagens
-        stats_data = {
-            'today': consultas_do_dia.count(),
-            
-            # 👇 CORREÇÃO: USANDO AS CONSTANTES PARA GARANTIR CONSISTÊNCIA 👇
-            'confirmed': consultas_do_dia.filter(status_atual=STATUS_CONSULTA_CONFIRMADA).count(),
-            'pending': consultas_do_dia.filter(status_atual=STATUS_CONSULTA_PENDENTE).count(),
-            
-            'totalMonth': consultas_do_mes.count(),
-        }
+        try:
+            clinica_id = request.user.perfil_secretaria.clinica_id
+        except Secretaria.DoesNotExist:
+            clinica_id = None
+
+        if clinica_id is None:
+            stats_data = {'today': 0, 'confirmed': 0, 'pending': 0, 'totalMonth': 0}
+        elif contadores_ativos():
+            stats_data = self.stats_dos_contadores(clinica_id)
+        else:
+            stats_data = self.stats_das_consultas(clinica_id)
 
         serializer = DashboardStatsSerializer(data=stats_data)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.data)
 
+    @staticmethod
+    def limites():
+        """ Início de hoje, de amanhã, do mês e do próximo mês no fuso local. """
+        hoje = timezone.localdate()
+        inicio_mes = hoje.replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        return hoje, hoje + timedelta(days=1), inicio_mes, proximo_mes
+
+    def stats_das_consultas(self, clinica_id):
+        # Um único aggregate condicional sobre o intervalo do mês, que usa o
+        # índice (clinica, data_hora) em vez de __date/__year/__month.
+        hoje, amanha, inicio_mes, proximo_mes = [
+            timezone.make_aware(datetime.combine(dia, time.min)) for dia in self.limites()
+        ]
+        do_dia = Q(data_hora__gte=hoje, data_hora__lt=amanha)
+        return Consulta.objects.filter(
+            clinica_id=clinica_id,
+            data_hora__gte=inicio_mes,
+            data_hora__lt=proximo_mes,
+        ).aggregate(
+            today=Count('id', filter=do_dia),
+            confirmed=Count('id', filter=do_dia & Q(status_atual=STATUS_CONSULTA_CONFIRMADA)),
+            pending=Count('id', filter=do_dia & Q(status_atual=STATUS_CONSULTA_PENDENTE)),
+            totalMonth=Count('id'),
+        )
+
+    def stats_dos_contadores(self, clinica_id):
+        # Lê as linhas do mês na chave única (clinica, dia) dos contadores
+        hoje, _, inicio_mes, proximo_mes = self.limites()
+        stats_data = {'today': 0, 'confirmed': 0, 'pending': 0, 'totalMonth': 0}
+        resumos = ResumoDiarioClinica.objects.filter(
+            clinica_id=clinica_id, dia__gte=inicio_mes, dia__lt=proximo_mes
+        ).values_list('dia', 'total', 'confirmadas', 'pendentes')
+        for dia, total, confirmadas, pendentes in resumos:
+            stats_data['totalMonth'] += total
+            if dia == hoje:
+                stats_data.update(today=total, confirmed=confirmadas, pending=pendentes)
+        return stats_data
+
 class ConsultasHojeView(ListAPIView):
     """
     Fornece a lista de consultas agendadas para o dia de hoje.
@@ -75,18 +114,13 @@ class ConfirmarConsultaView(APIView):
     def patch(self, request, pk):
         try:
             consulta = Consulta.objects.get(pk=pk)
-            consulta.status_atual = 'CONFIRMADA'
-            consulta.save()
-
-            # Cria um registro no log de auditoria
-            ConsultaStatusLog.objects.create(
-                status_novo='CONFIRMADA',
-                consulta=consulta,
-                pessoa=request.user
-            )
+            # Muda o status e cria o registro no log de auditoria
+            mudar_status(consulta, STATUS_CONSULTA_CONFIRMADA, request.user)
             return Response({'message': 'Consulta confirmada com sucesso!'}, status=status.HTTP_200_OK)
         except Consulta.DoesNotExist:
             return Response({'error': 'Consulta não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        except TransicaoInvalida as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class CancelarConsultaView(APIView):
@@ -101,15 +135,13 @@ class CancelarConsultaView(APIView):
         motivo = request.data.get('motivo', 'Cancelado pela secretaria')
         try:
             consulta = Consulta.objects.get(pk=pk)
-            consulta.status_atual = 'CANCELADA'
-            consulta.save()
-            
-            # Cria um registro no log de auditoria
-            ConsultaStatusLog.objects.create(
-                status_novo=f'CANCELADA - Motivo: {motivo}',
-                consulta=consulta,
-                pessoa=request.user
+            # Muda o status e registra o motivo no log de auditoria
+            mudar_status(
+                consulta, STATUS_CONSULTA_CANCELADA, request.user,
+                descricao=f'{STATUS_CONSULTA_CANCELADA} - Motivo: {motivo}'
             )
             return Response({'message': 'Consulta cancelada com sucesso!'}, status=status.HTTP_200_OK)
         except Consulta.DoesNotExist:
-            return Response({'error': 'Consulta não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+            return Response({'error': 'Consulta não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        except TransicaoInvalida as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
@@ -0,0 +1,145 @@
+# users/autenticacao.py
+"""
+Autenticação JWT sem carregar o usuário do banco a cada requisição.
+
+O token leva o escopo do usuário (`clinica_id`) e um `carimbo` derivado da
+senha, do estado ativo e da clínica. O usuário, já com o perfil de médico
+ou secretária, fica num cache LRU em memória de cada processo por até
+AUTENTICACAO_CACHE_TTL segundos. Com o cache quente, cada requisição só lê
+a versão do usuário no cache partilhado: com Redis/Memcached a autenticação
+não toca no banco; com o DatabaseCache padrão é uma leitura por chave
+primária em `medlink_cache`, no lugar do SELECT do usuário com os perfis.
+
+Sinais (users.signals) descartam a entrada quando o usuário ou o seu perfil
+muda e incrementam uma versão no cache partilhado do Django (ver CACHES),
+que os outros processos comparam a cada requisição. Se o cache for por
+processo (LocMem), a versão não chega aos outros workers e a entrada vive no
+máximo TTL_SEM_CACHE_PARTILHADO segundos. Desativar o usuário, trocar a senha
+ou mudar a clínica altera o carimbo, e os tokens emitidos antes passam a ser
+recusados.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from medlink_core.cache import cache_partilhado, incrementar_versao, versao as versao_da_chave
+from .models import User
+
+CLAIM_CLINICA = 'clinica_id'
+CLAIM_CARIMBO = 'carimbo'
+MAXIMO_USUARIOS = 1024
+# Sem cache partilhado, é o atraso máximo para uma revogação valer em todos os workers
+TTL_SEM_CACHE_PARTILHADO = 5
+
+_usuarios = OrderedDict()
+_lock = threading.Lock()
+
+
+def tempo_de_vida():
+    ttl = getattr(settings, 'AUTENTICACAO_CACHE_TTL', 300)
+    return ttl if cache_partilhado() else min(ttl, TTL_SEM_CACHE_PARTILHADO)
+
+
+def clinica_do_usuario(user):
+    """ Clínica a que o médico ou a secretária pertence (None para os demais). """
+    for perfil in ('perfil_secretaria', 'perfil_medico'):
+        try:
+            return getattr(user, perfil).clinica_id
+        except AttributeError:
+            continue
+    return None
+
+
+def carimbo_do_usuario(user, clinica_id):
+    """ Muda quando a senha, o estado ativo ou a clínica do usuário mudam. """
+    valor = f'{user.pk}|{user.password}|{user.is_active}|{clinica_id}'
+    return salted_hmac('users.autenticacao', valor).hexdigest()[:20]
+
+
+def _chave_da_versao(user_id):
+    return f'users:autenticacao:versao:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    """ Descarta o usuário do cache deste processo e avisa os demais. """
+    with _lock:
+        _usuarios.pop(user_id, None)
+    incrementar_versao(_chave_da_versao(user_id))
+
+
+def limpar():
+    with _lock:
+        _usuarios.clear()
+
+
+def obter_usuario(user_id):
+    """
+    Retorna `(user, clinica_id, carimbo)` do cache ou, na falta, com uma
+    query (perfis incluídos). Retorna None se o usuário não existir.
+    """
+    versao = versao_da_chave(_chave_da_versao(user_id))
+    agora = time.monotonic()
+    with _lock:
+        entrada = _usuarios.get(user_id)
+        if entrada is not None and entrada[0] > agora and entrada[1] == versao:
+            _usuarios.move_to_end(user_id)
+            return entrada[2]
+
+    user = User.objects.select_related('perfil_secretaria', 'perfil_medico').filter(pk=user_id).first()
+    if user is None:
+        return None
+    clinica_id = clinica_do_usuario(user)
+    dados = (user, clinica_id, carimbo_do_usuario(user, clinica_id))
+    with _lock:
+        _usuarios[user_id] = (agora + tempo_de_vida(), versao, dados)
+        _usuarios.move_to_end(user_id)
+        while len(_usuarios) > MAXIMO_USUARIOS:
+            _usuarios.popitem(last=False)
+    return dados
+
+
+def adicionar_claims(token, user):
+    """ Escopo e carimbo gravados no token no login. """
+    clinica_id = clinica_do_usuario(user)
+    token[CLAIM_CLINICA] = clinica_id
+    token[CLAIM_CARIMBO] = carimbo_do_usuario(user, clinica_id)
+    return token
+
+
+class JWTAutenticacaoComCache(JWTAuthentication):
+    """
+    JWTAuthentication que resolve o usuário pelo cache em memória e confere
+    o carimbo do token. `request.user` é uma cópia do usuário em cache, com
+    `clinica_escopo` vindo do token.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        dados = obter_usuario(user_id)
+        if dados is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        user, clinica_id, carimbo = dados
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        # Tokens anteriores a este esquema não têm carimbo e continuam válidos até expirar
+        carimbo_do_token = validated_token.get(CLAIM_CARIMBO)
+        if carimbo_do_token is not None and not constant_time_compare(carimbo_do_token, carimbo):
+            raise AuthenticationFailed('O token foi revogado. Faça login novamente.', code='token_revoked')
+
+        # Cópia por requisição: alterações feitas pela view não vazam para o cache
+        principal = copy.copy(user)
+        principal.clinica_escopo = validated_token.get(CLAIM_CLINICA, clinica_id)
+        return principal
@@ -0,0 +1,78 @@
+# users/busca.py
+"""
+Busca de pessoas (usuários e pacientes) para typeahead.
+
+O termo é classificado como numérico (CPF/telefone) ou texto (nome/e-mail).
+Cada nível de relevância é uma query com LIMIT servida por um índice no
+PostgreSQL: prefixos pelos índices varchar/text_pattern_ops (o e-mail por
+LOWER(email)) e palavras dentro do nome pelo índice de trigramas de
+nome_busca (ver users/migrations/0003_indices_de_busca_postgres.py). Os níveis
+são consultados em ordem e a busca para quando o limite é atingido, então o
+custo depende do limite e não do tamanho da base.
+"""
+import re
+
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import StartsWith
+
+from medlink_core.texto import normalizar_texto
+
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 50
+# Termos mais curtos geram trigramas comuns demais para o índice filtrar algo
+MINIMO_PALAVRA_NO_NOME = 3
+
+# Pontuação aceita num CPF ou telefone digitado ("123.456", "(63) 9")
+_FORMATACAO_NUMERICA = re.compile(r'[\s.\-/()+]')
+
+
+def ler_limite(valor, padrao=LIMITE_PADRAO):
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return padrao
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+def niveis_de_busca(termo, prefixo='', campo_telefone=None):
+    """
+    Lista de `(filtro, ordenacao)` do nível mais relevante para o menos.
+    `prefixo` aponta para o User a partir do modelo buscado (ex.: 'user__').
+    """
+    termo = termo.strip()
+    if not termo:
+        return []
+    if _FORMATACAO_NUMERICA.sub('', termo).isdigit():
+        digitos = re.sub(r'\D', '', termo)
+        niveis = [(Q(**{f'{prefixo}cpf__startswith': digitos}), f'{prefixo}cpf')]
+        if campo_telefone:
+            niveis.append((Q(**{f'{campo_telefone}__startswith': digitos}), campo_telefone))
+        return niveis
+
+    nome = ' '.join(normalizar_texto(termo).split())
+    niveis = [(Q(**{f'{prefixo}nome_busca__startswith': nome}), f'{prefixo}nome_busca')]
+    if len(nome) >= MINIMO_PALAVRA_NO_NOME:
+        # Sobrenome ou nome do meio ('% termo%'), pelo índice de trigramas
+        niveis.append((Q(**{f'{prefixo}nome_busca__contains': f' {nome}'}), f'{prefixo}nome_busca'))
+    # LOWER(email) LIKE 'termo%' usa o índice de expressão; istartswith (UPPER) não usaria
+    email = Lower(f'{prefixo}email')
+    niveis.append((StartsWith(email, termo.lower()), email))
+    return niveis
+
+
+def buscar(queryset, termo, limite=LIMITE_PADRAO, prefixo='', campo_telefone=None):
+    """ Até `limite` objetos de `queryset`, ordenados por relevância e sem repetição. """
+    resultados = []
+    encontrados = set()
+    for filtro, ordenacao in niveis_de_busca(termo, prefixo, campo_telefone):
+        faltam = limite - len(resultados)
+        if faltam <= 0:
+            break
+        nivel = queryset.filter(filtro).order_by(ordenacao, 'pk')
+        if encontrados:
+            nivel = nivel.exclude(pk__in=encontrados)
+        for objeto in nivel[:faltam]:
+            resultados.append(objeto)
+            encontrados.add(objeto.pk)
+    return resultados
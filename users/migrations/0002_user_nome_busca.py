@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:17
+
+from django.db import migrations, models
+
+from medlink_core.texto import normalizar_texto
+
+
+def preencher_nome_busca(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    pendentes = []
+    for user in User.objects.only('pk', 'first_name', 'last_name').iterator(chunk_size=2000):
+        user.nome_busca = ' '.join(normalizar_texto(f'{user.first_name} {user.last_name}').split())
+        pendentes.append(user)
+        if len(pendentes) >= 2000:
+            User.objects.bulk_update(pendentes, ['nome_busca'])
+            pendentes = []
+    if pendentes:
+        User.objects.bulk_update(pendentes, ['nome_busca'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='nome_busca',
+            field=models.CharField(default='', editable=False, max_length=301),
+        ),
+        migrations.RunPython(preencher_nome_busca, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['nome_busca'], name='user_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['cpf'], name='user_cpf_busca_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+# Índices que o ORM não expressa de forma portável (opclass em expressão e
+# GIN de trigramas): só existem no PostgreSQL; nos demais bancos a busca
+# funciona sem eles. pg_trgm é uma extensão "trusted" a partir do PostgreSQL
+# 13, então o dono do banco pode criá-la.
+CRIAR = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS user_email_busca_idx ON users_user (LOWER(email) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS user_nome_busca_trgm_idx ON users_user USING gin (nome_busca gin_trgm_ops)',
+]
+REMOVER = [
+    'DROP INDEX IF EXISTS user_email_busca_idx',
+    'DROP INDEX IF EXISTS user_nome_busca_trgm_idx',
+]
+
+
+def executar(comandos):
+    def operacao(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in comandos:
+            schema_editor.execute(sql)
+    return operacao
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_nome_busca'),
+    ]
+
+    operations = [
+        migrations.RunPython(executar(CRIAR), executar(REMOVER)),
+    ]
@@ -4,6 +4,13 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from medlink_core.texto import normalizar_texto
+
+
+def nome_de_busca(first_name, last_name):
+    """ Nome completo sem acentos, em minúsculas e com espaços simples (ver users.busca). """
+    return ' '.join(normalizar_texto(f"{first_name} {last_name}").split())
+
 class CustomUserManager(BaseUserManager):
     """
     Manager customizado para o nosso modelo de User onde o CPF é o identificador
@@ -55,6 +62,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(_('endereço de email'), unique=True)
     first_name = models.CharField(_('primeiro nome'), max_length=150, blank=True)
     last_name = models.CharField(_('último nome'), max_length=150, blank=True)
+    # Nome normalizado para a busca por prefixo (preenchido no save)
+    nome_busca = models.CharField(max_length=301, editable=False, default='')
     user_type = models.CharField(max_length=20, choices=UserType.choices)
 
     # Campos de controle do Django
@@ -68,6 +77,21 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops permite LIKE 'prefixo%' pelo índice no PostgreSQL
+            models.Index(fields=['nome_busca'], name='user_nome_busca_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['cpf'], name='user_cpf_busca_idx', opclasses=['varchar_pattern_ops']),
+            # LOWER(email) e trigramas de nome_busca: criados só no PostgreSQL pela migração 0003
+        ]
+
+    def save(self, *args, **kwargs):
+        self.nome_busca = nome_de_busca(self.first_name, self.last_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'nome_busca'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.get_full_name() or self.cpf
 
@@ -1,6 +1,8 @@
 # users/serializers.py
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
+from .autenticacao import adicionar_claims
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
@@ -13,5 +15,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['full_name'] = user.get_full_name()
         token['email'] = user.email
 
+        # Escopo (clínica) e carimbo usados pela autenticação sem query (users.autenticacao)
+        adicionar_claims(token, user)
+
         return token
     
\ No newline at end of file
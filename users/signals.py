@@ -1,8 +1,10 @@
 # users/signals.py
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django_rest_passwordreset.signals import reset_password_token_created
-from django.core.mail import send_mail
-from django.conf import settings
+from notificacoes.outbox import enfileirar as enfileirar_email
+
+from .autenticacao import invalidar_usuario
 
 @receiver(reset_password_token_created)
 def password_reset_token_created_handler(sender, instance, reset_password_token, *args, **kwargs):
@@ -26,16 +28,22 @@ def password_reset_token_created_handler(sender, instance, reset_password_token,
         f"Atenciosamente,\nEquipe MedLink"
     )
 
-    print("\n\n=======================================================")
-    print(f"  A TENTAR ENVIAR EMAIL DE RECUPERAÇÃO REAL")
-    print(f"  Para: {reset_password_token.user.email}")
-    print(f"  Token: {reset_password_token.key}")
-    print("=======================================================\n\n")
-
-    # Envia o email usando a função do Django que já testámos
-    send_mail(
-        subject=email_subject,
-        message=email_body,
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[reset_password_token.user.email]
-    )
\ No newline at end of file
+    enfileirar_email(email_subject, email_body, [reset_password_token.user.email])
+
+
+@receiver(post_save, sender='users.User')
+@receiver(post_delete, sender='users.User')
+def invalidar_usuario_autenticado(sender, instance, update_fields=None, **kwargs):
+    """ Senha, estado ativo ou dados do usuário mudaram: descarta o cache da autenticação. """
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender='secretarias.Secretaria')
+@receiver(post_delete, sender='secretarias.Secretaria')
+@receiver(post_save, sender='medicos.Medico')
+@receiver(post_delete, sender='medicos.Medico')
+def invalidar_perfil_autenticado(sender, instance, **kwargs):
+    """ O perfil define a clínica (escopo) do usuário autenticado. """
+    invalidar_usuario(instance.user_id)
@@ -1,3 +1,108 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from agendamentos.tests import AgendamentosTestMixin
+from clinicas.models import Clinica
+from medlink_core.tests import cache_de_teste
+from . import autenticacao
+
+
+@cache_de_teste()
+class AutenticacaoComCacheTests(AgendamentosTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        autenticacao.limpar()
+        self.criar_base()
+        self.criar_consultas(2)
+        self.client = APIClient()
+        self.url = reverse('agendamentos-list-create')
+
+    def entrar(self, user):
+        response = self.client.post(reverse('token_obtain_pair'), {'cpf': user.cpf, 'password': 'senha-forte-123'})
+        self.assertEqual(response.status_code, 200)
+        return {'HTTP_AUTHORIZATION': f"Bearer {response.data['access']}"}
+
+    def test_requisicao_autenticada_sem_queries_de_usuario(self):
+        cabecalhos = self.entrar(self.secretaria)
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 200)
+        # Só as queries da view: validadores (ETag) e a página
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, **cabecalhos)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_senha_desativacao_e_troca_de_clinica_revogam_o_token(self):
+        cabecalhos = self.entrar(self.secretaria)
+        perfil = self.secretaria.perfil_secretaria
+        perfil.clinica = Clinica.objects.create(
+            nome_fantasia='Outra', cnpj='99888777000166', cidade=self.clinica.cidade,
+            tipo_clinica=self.clinica.tipo_clinica,
+        )
+        perfil.save()
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 401)
+
+        cabecalhos = self.entrar(self.secretaria)
+        self.secretaria.set_password('nova-senha-456')
+        self.secretaria.save()
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 401)
+
+        cabecalhos = self.entrar(self.medico)
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 200)
+        self.medico.is_active = False
+        self.medico.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 401)
+
+    def test_desativacao_vale_no_worker_que_ja_tinha_o_usuario(self):
+        cabecalhos = self.entrar(self.medico)
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 200)
+        # Memória de outro worker, que autenticou o médico antes da desativação
+        outro_worker = dict(autenticacao._usuarios)
+        self.assertIn(self.medico.pk, outro_worker)
+
+        self.medico.is_active = False
+        self.medico.save(update_fields=['is_active'])
+        autenticacao._usuarios.update(outro_worker)
+        # A versão no cache partilhado mudou: a entrada antiga não é usada
+        self.assertEqual(self.client.get(self.url, **cabecalhos).status_code, 401)
+
+    def test_sem_cache_partilhado_o_ttl_e_curto(self):
+        self.assertEqual(autenticacao.tempo_de_vida(), 300)
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertEqual(autenticacao.tempo_de_vida(), autenticacao.TTL_SEM_CACHE_PARTILHADO)
+
+
+class AutenticacaoNoCachePadraoTests(AgendamentosTestMixin, TestCase):
+    """ Mesmo fluxo com o cache configurado em settings (DatabaseCache). """
+
+    def setUp(self):
+        cache.clear()
+        autenticacao.limpar()
+        self.criar_base()
+        self.criar_consultas(2)
+        self.client = APIClient()
+        self.url = reverse('agendamentos-list-create')
+        response = self.client.post(reverse('token_obtain_pair'), {'cpf': self.medico.cpf, 'password': 'senha-forte-123'})
+        self.cabecalhos = {'HTTP_AUTHORIZATION': f"Bearer {response.data['access']}"}
+
+    def test_orcamento_de_queries(self):
+        self.assertEqual(self.client.get(self.url, **self.cabecalhos).status_code, 200)
+        # A versão do usuário em medlink_cache e as queries da view (ETag e página)
+        with self.assertNumQueries(3):
+            self.client.get(self.url, **self.cabecalhos)
+
+    def test_revogacao_sobrevive_ao_timeout_padrao_do_cache(self):
+        self.assertEqual(self.client.get(self.url, **self.cabecalhos).status_code, 200)
+        outro_worker = dict(autenticacao._usuarios)
+        self.medico.is_active = False
+        self.medico.save(update_fields=['is_active'])
+        autenticacao._usuarios.update(outro_worker)
+
+        # Depois do timeout padrão (300s) a versão continua lá e a entrada antiga segue inválida
+        daqui_a_uma_hora = timezone.now() + timedelta(hours=1)
+        with mock.patch('django.core.cache.backends.db.tz_now', return_value=daqui_a_uma_hora):
+            self.assertEqual(self.client.get(self.url, **self.cabecalhos).status_code, 401)
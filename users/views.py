@@ -9,8 +9,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
-from django.conf import settings
+from notificacoes.outbox import enfileirar as enfileirar_email
 
 User = get_user_model()
 
@@ -48,19 +47,13 @@ class PasswordResetRequestView(APIView):
         # Se o seu Flutter roda na 8080, mude para:
         # reset_url = f'http://localhost:8080/reset-password?uid={uid}&token={token}'
 
-        # Enviar o e-mail
-        try:
-            send_mail(
-                'Recuperação de Senha - MedLink',
-                f'Olá,\n\nVocê solicitou a recuperação de senha. Clique no link abaixo para criar uma nova senha:\n\n{reset_url}\n\nSe você não solicitou isso, ignore este e-mail.',
-                settings.DEFAULT_FROM_EMAIL,
-                [user.email],
-                fail_silently=False,
-            )
-            return Response({'message': 'Email de recuperação enviado.'}, status=status.HTTP_200_OK)
-        except Exception as e:
-            print(f"Erro ao enviar email: {e}")
-            return Response({'error': 'Erro ao enviar o e-mail.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        # O e-mail vai para a caixa de saída e é entregue pelo worker `enviar_emails`
+        enfileirar_email(
+            'Recuperação de Senha - MedLink',
+            f'Olá,\n\nVocê solicitou a recuperação de senha. Clique no link abaixo para criar uma nova senha:\n\n{reset_url}\n\nSe você não solicitou isso, ignore este e-mail.',
+            [user.email],
+        )
+        return Response({'message': 'Email de recuperação enviado.'}, status=status.HTTP_200_OK)
 
 class PasswordResetConfirmView(APIView):
     """